@@ -0,0 +1,100 @@
+import argparse
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from engines import available_engines, create_engine, get_engine_class, load_catalog, CAP_CATALOG
+
+
+class EngineCache:
+    """每种引擎只创建一次，食物数据库在需要时加载一次"""
+
+    def __init__(self, catalog=None):
+        self.catalog = catalog
+        self._engines = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str):
+        with self._lock:
+            if name not in self._engines:
+                catalog = None
+                if CAP_CATALOG in get_engine_class(name).capabilities:
+                    if self.catalog is None:
+                        self.catalog = load_catalog()
+                    catalog = self.catalog
+                self._engines[name] = create_engine(name, catalog)
+            return self._engines[name]
+
+
+class DietRequestHandler(BaseHTTPRequestHandler):
+    """简单的JSON接口
+
+    GET  /health    健康检查
+    GET  /engines   可用引擎
+    POST /generate  {"engine": "enhanced", "profile": {...}, "days": 7, "seed": 1}
+    """
+    engines = None  # 由 make_server 设置
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif self.path == "/engines":
+            self._send_json(200, {"engines": available_engines()})
+        else:
+            self._send_json(404, {"error": f"未知路径: {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/generate":
+            self._send_json(404, {"error": f"未知路径: {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(request, dict) or not isinstance(request.get("profile"), dict):
+                raise ValueError("请求体必须是包含 profile 对象的JSON对象")
+            engine = self.engines.get(request.get("engine", "enhanced"))
+            seed = request.get("seed")
+            menu = engine.generate(
+                request["profile"],
+                days=int(request.get("days", 7)),
+                rng=random.Random(seed) if seed is not None else None
+            )
+            self._send_json(200, {"menu": menu, "summary": engine.summarize(request["profile"])})
+        except (KeyError, ValueError) as e:
+            self._send_json(400, {"error": f"请求参数错误: {str(e)}"})
+        except Exception as e:
+            self._send_json(500, {"error": f"生成食谱时出错: {str(e)}"})
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # 压测时访问日志会成为瓶颈，默认关闭
+        pass
+
+
+def make_server(host: str = "127.0.0.1", port: int = 8000, catalog=None) -> ThreadingHTTPServer:
+    handler = type("BoundDietRequestHandler", (DietRequestHandler,), {"engines": EngineCache(catalog)})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="中医食疗推荐系统HTTP接口")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port)
+    print(f"接口已启动: http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -1,11 +1,59 @@
 import streamlit as st
 import json
-from main import medicinal_foods, seasonal_ingredients
-from enhanced_diet_generator import EnhancedDietGenerator
+import random
+import time
+from main import medicinal_foods, seasonal_ingredients, disease_options, cuisine_options
+from metabolism import activity_levels
+from engines import available_engines, create_engine, get_engine_class, load_catalog, CAP_CATALOG, CAP_DIET_TIPS
+from menu_service import MenuService
+from plan_export import available_export_formats, export_bytes, export_mime_types
 
 # 设置页面标题
 st.set_page_config(page_title="中医食疗推荐系统", layout="wide")
 
+# ---------- 跨会话共享的资源 ----------
+@st.cache_resource(show_spinner="正在加载食物数据库...")
+def get_catalog():
+    """食物数据库只加载一次，所有会话共享"""
+    return load_catalog()
+
+@st.cache_resource
+def get_engine(name: str):
+    """每种引擎只创建一次"""
+    catalog = get_catalog() if CAP_CATALOG in get_engine_class(name).capabilities else None
+    return create_engine(name, catalog)
+
+@st.cache_resource
+def get_menu_service():
+    """后台生成菜谱的线程池"""
+    return MenuService()
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def get_menu(engine_name: str, user_data: dict, seed: int):
+    """按输入缓存生成结果，相同输入不会重复生成"""
+    return get_menu_service().submit(get_engine(engine_name), user_data, seed).result()
+
+@st.cache_data(max_entries=1024, show_spinner=False)
+def get_summary(engine_name: str, user_data: dict):
+    return get_engine(engine_name).summarize(user_data)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def get_export(engine_name: str, user_data: dict, seed: int, fmt: str) -> bytes:
+    """把当前菜单导出为文件内容"""
+    menu = get_menu(engine_name, user_data, seed)
+    return export_bytes([("膳食计划", user_data, menu, get_summary(engine_name, user_data))], fmt)
+
+def wait_for_menu(engine_name: str, user_data: dict, seed: int):
+    """在后台线程中生成菜谱，前台显示进度"""
+    job = get_menu_service().submit(get_engine(engine_name), user_data, seed)
+    if not job.done():
+        progress_bar = st.progress(0.0, text="正在生成膳食计划...")
+        while not job.done():
+            progress_bar.progress(job.fraction, text=f"正在生成膳食计划（{job.done_days}/{job.total_days}天）...")
+            time.sleep(0.05)
+        progress_bar.empty()
+    return get_menu(engine_name, user_data, seed)
+
 st.title("中医食疗推荐系统")
 st.write("根据您的体质特征，生成个性化的一周膳食计划")
 
@@ -37,21 +85,21 @@ with st.sidebar:
     # 活动量选择
     activity = st.selectbox(
         "日常活动量",
-        options=["轻体力", "中等体力", "重体力"],
+        options=list(activity_levels.keys()),
         index=1
     )
     
     # 疾病信息
     diseases = st.multiselect(
         "基础疾病(可多选)",
-        options=["高血压", "糖尿病", "高血脂", "痛风", "无"],
+        options=disease_options,
         default=["无"]
     )
     
     # 饮食偏好
     preferred_cuisine = st.selectbox(
         "饮食偏好",
-        options=["粤菜", "川菜", "湘菜", "鲁菜", "苏菜", "浙菜", "闽菜", "徽菜"],
+        options=cuisine_options,
         index=0
     )
     
@@ -63,10 +111,12 @@ with st.sidebar:
     )
     
     # 选择生成器
-    generator_type = st.radio(
+    engine_names = available_engines()
+    engine_name = st.radio(
         "选择生成器",
-        ["基础版", "增强版(包含菜系、多样性和营养均衡)"],
-        index=1
+        engine_names,
+        index=engine_names.index("enhanced"),
+        format_func=lambda name: get_engine_class(name).label
     )
     
     # 生成按钮
@@ -74,8 +124,8 @@ with st.sidebar:
 
 # 主内容区域
 if generate_button:
-    # 收集用户数据
-    user_data = {
+    # 收集用户数据，保存在会话中，切换选项卡等操作重新运行脚本时结果不会消失
+    st.session_state["request"] = (engine_name, {
         "main_type": main_type,
         "sub_type": sub_type,
         "gender": gender,
@@ -86,42 +136,43 @@ if generate_button:
         "diseases": diseases,
         "preferred_cuisine": preferred_cuisine,
         "season": season
-    }
+    })
+    # 只修改参数时沿用原来的种子，预取的其他季节菜谱才能命中；「换一批」才换新的种子
+    if "seed" not in st.session_state:
+        st.session_state["seed"] = random.randrange(2 ** 31)
+
+if "request" in st.session_state:
+    engine_name, user_data = st.session_state["request"]
+    diseases = user_data["diseases"]
     
     try:
-        # 根据用户选择的生成器类型实例化生成器
-        if generator_type == "基础版":
-            from main import DietGenerator
-            generator = DietGenerator(user_data)
-        else:
-            generator = EnhancedDietGenerator(user_data)
-            
-        weekly_menu = generator.generate_weekly_menu()
+        engine = get_engine(engine_name)
+        weekly_menu = wait_for_menu(engine_name, user_data, st.session_state["seed"])
+        summary = get_summary(engine_name, user_data)
         
         # 计算BMI和每日所需热量
         st.subheader("身体指标")
         col1, col2 = st.columns(2)
         with col1:
-            st.metric("BMI指数", f"{generator.bmi:.1f}")
-            if generator.bmi < 18.5:
+            st.metric("BMI指数", f"{summary['bmi']:.1f}")
+            if summary['bmi'] < 18.5:
                 st.info("体重偏低")
-            elif generator.bmi < 24:
+            elif summary['bmi'] < 24:
                 st.success("体重正常")
-            elif generator.bmi < 28:
+            elif summary['bmi'] < 28:
                 st.warning("超重")
             else:
                 st.error("肥胖")
         
         with col2:
-            st.metric("每日基础热量需求", f"{generator.calorie_needs:.0f} 千卡")
+            st.metric("每日基础热量需求", f"{summary['calorie_needs']:.0f} 千卡")
         
         # 显示推荐的药食同源食材
         st.subheader("推荐的药食同源食材")
-        medicinals = generator._select_medicinal()
-        st.write(", ".join(medicinals))
+        st.write(", ".join(summary['medicinals']))
         
-        # 添加饮食提示信息（仅增强版显示）
-        if generator_type != "基础版":
+        # 添加饮食提示信息（仅支持的引擎显示）
+        if engine.has_capability(CAP_DIET_TIPS):
             st.subheader("饮食提示")
             # 显示根据用户情况的饮食建议
             if "糖尿病" in diseases:
@@ -135,6 +186,9 @@ if generate_button:
         
         # 显示一周菜单
         st.subheader("一周膳食计划")
+        if st.button("换一批"):
+            st.session_state["seed"] = random.randrange(2 ** 31)
+            st.rerun()
         
         # 使用选项卡显示每天的菜单
         tabs = st.tabs([f"第{i+1}天" for i in range(7)])
@@ -156,9 +210,24 @@ if generate_button:
                         st.write(f"**营养素比例**: {meal['营养素']}")
                     
                     st.divider()
+        
+        # 下载打印版或表格
+        export_labels = {"html": "下载打印版(HTML)", "csv": "下载表格(CSV)", "xlsx": "下载表格(Excel)"}
+        download_columns = st.columns(len(available_export_formats()))
+        for column, fmt in zip(download_columns, available_export_formats()):
+            with column:
+                st.download_button(
+                    export_labels[fmt],
+                    data=get_export(engine_name, user_data, st.session_state["seed"], fmt),
+                    file_name=f"膳食计划.{fmt}",
+                    mime=export_mime_types[fmt]
+                )
+        
+        # 用户阅读结果时，在后台预先生成其他季节的菜谱
+        get_menu_service().prefetch(engine, user_data, st.session_state["seed"])
     except Exception as e:
         st.error(f"生成食谱时出错: {str(e)}")
-        st.info("如果您选择了增强版生成器，请确保已运行 process_food_data.py 脚本。")
+        st.info("如果您选择的生成器依赖食物数据库，请确保已运行 process_food_data.py 脚本。")
 else:
     st.info("请在左侧填写您的个人信息，然后点击「生成食疗推荐」按钮获取个性化的膳食计划。")
     
@@ -198,4 +267,47 @@ else:
         
         st.write("**气郁血瘀**")
         st.write("表现：胸胁胀满、情绪不稳、经期不调")
-        st.write("宜食：理气活血食物如玫瑰花、桃仁、当归") 
\ No newline at end of file
+        st.write("宜食：理气活血食物如玫瑰花、桃仁、当归") 
+
+# ---------- 食材营养查询 ----------
+with st.expander("按营养素查找食材"):
+    try:
+        food_catalog = get_engine("enhanced").foods
+        nutrient_index = food_catalog.index
+        query_col1, query_col2 = st.columns(2)
+        with query_col1:
+            query_types = st.multiselect("食物类别", options=sorted(food_catalog.by_type.keys()), default=["蔬菜"])
+            max_nutrient = st.selectbox("上限营养素", options=food_catalog.nutrient_names,
+                                        index=food_catalog.nutrient_names.index("钠"))
+            max_value = st.number_input("上限（每100克，不含）", min_value=0.0, value=50.0)
+            min_nutrient = st.selectbox("下限营养素", options=food_catalog.nutrient_names,
+                                        index=food_catalog.nutrient_names.index("钾"))
+            min_value = st.number_input("下限（每100克）", min_value=0.0, value=300.0)
+        with query_col2:
+            sort_nutrient = st.selectbox("排序依据", options=food_catalog.nutrient_names,
+                                         index=food_catalog.nutrient_names.index("蛋白质"))
+            per_kcal = st.checkbox("按每千卡含量排序", value=True)
+            query_k = st.slider("显示数量", 5, 50, 10)
+
+        ranges = {max_nutrient: (None, max_value)}
+        # 上下限为同一种营养素时合并为一个区间
+        ranges[min_nutrient] = (min_value, ranges.get(min_nutrient, (None, None))[1])
+        results = nutrient_index.query(
+            types=query_types or None,
+            ranges=ranges,
+            sort_by=(sort_nutrient, "能量") if per_kcal else sort_nutrient,
+            top_k=query_k
+        )
+        if results:
+            st.dataframe([{
+                "食物": food.name,
+                "类别": food.type,
+                sort_nutrient: float(food_catalog.column(sort_nutrient)[food.id]),
+                max_nutrient: float(food_catalog.column(max_nutrient)[food.id]),
+                min_nutrient: float(food_catalog.column(min_nutrient)[food.id]),
+                "能量": food.energy
+            } for food in results])
+        else:
+            st.write("没有符合条件的食材")
+    except Exception as e:
+        st.error(f"查询食材时出错: {str(e)}")
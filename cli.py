@@ -0,0 +1,129 @@
+import argparse
+import json
+import random
+import sys
+
+from engines import available_engines, create_engine, get_engine_class
+from plan_export import export_formats, export_menus, generate_cohort
+
+# 默认示例用户（与各生成器的测试代码一致）
+sample_profile = {
+    "main_type": "痰湿内盛",
+    "sub_type": "脾虚不运",
+    "gender": "女",
+    "age": 35,
+    "height": 165,
+    "weight": 70,
+    "activity": "中等体力",
+    "diseases": ["高血压"],
+    "preferred_cuisine": "粤菜",
+    "season": "夏季"
+}
+
+
+def load_profile(path):
+    """从JSON文件读取用户信息，未指定时使用示例用户"""
+    if not path:
+        return dict(sample_profile)
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def cmd_engines(args):
+    """列出已注册的生成引擎"""
+    for name in available_engines():
+        engine_cls = get_engine_class(name)
+        print(f"{name}\t{engine_cls.label}\t{', '.join(sorted(engine_cls.capabilities))}")
+
+
+def cmd_generate(args):
+    """为单个用户生成菜谱"""
+    profile = load_profile(args.profile)
+    engine = create_engine(args.engine)
+    rng = random.Random(args.seed) if args.seed is not None else None
+    menu = engine.generate(profile, days=args.days, rng=rng)
+    print(json.dumps(menu, ensure_ascii=False, indent=2))
+
+
+def cmd_household(args):
+    """为一家人生成共用主食和蛋白质的菜谱"""
+    profiles = [load_profile(path) for path in args.profile]
+    engine = create_engine(args.engine)
+    rng = random.Random(args.seed) if args.seed is not None else None
+    result = engine.generate_household(profiles, days=args.days, rng=rng)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+def iter_profiles(args):
+    """导出时的用户来源：JSONL文件（逐行读取）、随机用户，或 --profile 指定的文件"""
+    if args.profiles:
+        with open(args.profiles, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif args.random:
+        from loadtest import random_profile
+        rng = random.Random(args.seed)
+        for _ in range(args.random):
+            yield random_profile(rng)
+    else:
+        for path in args.profile or [None]:
+            yield load_profile(path)
+
+
+def cmd_export(args):
+    """批量生成菜谱并逐个用户写入CSV/Excel/HTML"""
+    engine = create_engine(args.engine)
+    items = generate_cohort(engine, iter_profiles(args), days=args.days, seed=args.seed)
+    count = export_menus(items, args.format, args.output)
+    print(f"已导出 {count} 个用户的膳食计划到 {args.output}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="中医食疗推荐系统命令行工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    engines_parser = subparsers.add_parser("engines", help="列出可用的生成引擎")
+    engines_parser.set_defaults(func=cmd_engines)
+
+    generate_parser = subparsers.add_parser("generate", help="生成菜谱")
+    generate_parser.add_argument("--engine", default="enhanced", choices=available_engines())
+    generate_parser.add_argument("--profile", help="用户信息JSON文件路径")
+    generate_parser.add_argument("--days", type=int, default=7)
+    generate_parser.add_argument("--seed", type=int, help="随机种子，便于复现")
+    generate_parser.set_defaults(func=cmd_generate)
+
+    household_parser = subparsers.add_parser("household", help="为家庭成员生成共用食材的菜谱")
+    household_parser.add_argument("--engine", default="enhanced", choices=available_engines())
+    household_parser.add_argument("--profile", action="append", required=True,
+                                  help="成员信息JSON文件路径，每位成员指定一次")
+    household_parser.add_argument("--days", type=int, default=7)
+    household_parser.add_argument("--seed", type=int, help="随机种子，便于复现")
+    household_parser.set_defaults(func=cmd_household)
+
+    export_parser = subparsers.add_parser("export", help="批量生成并导出为CSV/Excel/HTML")
+    export_parser.add_argument("--engine", default="enhanced", choices=available_engines())
+    export_parser.add_argument("--format", default="csv", choices=export_formats)
+    export_parser.add_argument("--output", required=True, help="导出文件路径")
+    export_parser.add_argument("--profile", action="append", help="用户信息JSON文件路径，可指定多次")
+    export_parser.add_argument("--profiles", help="每行一个用户信息的JSONL文件")
+    export_parser.add_argument("--random", type=int, help="改为导出指定数量的随机用户")
+    export_parser.add_argument("--days", type=int, default=7)
+    export_parser.add_argument("--seed", type=int, help="随机种子，便于复现")
+    export_parser.set_defaults(func=cmd_export)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        args.func(args)
+    except Exception as e:
+        print(f"执行命令时出错: {str(e)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
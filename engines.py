@@ -0,0 +1,196 @@
+import random
+from typing import Dict, List, Optional
+
+from enhanced_diet_generator import EnhancedDietGenerator, load_diet_helper_data, render_plan
+from food_catalog import FoodCatalog
+from household_planner import HouseholdPlanner
+from main import DietGenerator, select_medicinals
+from meal_templates import load_template_library
+from metabolism import user_metabolics
+from portion_solver import PortionSolver, macro_targets
+
+
+# ---------- 引擎能力标识 ----------
+CAP_CATALOG = "catalog"          # 使用食物数据库
+CAP_CUISINE = "cuisine"          # 支持菜系偏好
+CAP_DIVERSITY = "diversity"      # 一周内避免重复
+CAP_DISEASE = "disease"          # 按基础疾病调整食材
+CAP_SEASONAL = "seasonal"        # 时令食材
+CAP_DIET_TIPS = "diet_tips"      # 显示饮食提示
+CAP_TEMPLATES = "templates"      # 使用预生成的餐次模板
+CAP_REPLAN = "replan"            # 支持结构化计划的局部重新规划
+CAP_HOUSEHOLD = "household"      # 支持家庭成员共用食材的协调规划
+
+
+# ---------- 引擎注册表 ----------
+_ENGINES = {}
+
+
+def register_engine(engine_cls):
+    """注册食谱生成引擎（可作为类装饰器使用）"""
+    if not engine_cls.name:
+        raise ValueError(f"{engine_cls.__name__} 未设置引擎名称")
+    _ENGINES[engine_cls.name] = engine_cls
+    return engine_cls
+
+
+def available_engines() -> List[str]:
+    """返回所有已注册的引擎名称（按注册顺序）"""
+    return list(_ENGINES)
+
+
+def get_engine_class(name: str):
+    """按名称获取引擎类"""
+    try:
+        return _ENGINES[name]
+    except KeyError:
+        raise ValueError(f"未知的生成引擎: {name}，可选: {', '.join(_ENGINES)}")
+
+
+def create_engine(name: str, catalog: Optional[Dict] = None):
+    """按名称创建引擎实例，需要食物数据库的引擎在未传入时自动加载"""
+    engine_cls = get_engine_class(name)
+    if catalog is None and CAP_CATALOG in engine_cls.capabilities:
+        catalog = load_catalog()
+    return engine_cls(catalog)
+
+
+def load_catalog() -> Dict:
+    """加载所有引擎共享的食物数据库"""
+    catalog = load_diet_helper_data()
+    if not catalog:
+        raise ValueError("无法加载食物数据库，请确保已经运行 process_food_data.py")
+    return catalog
+
+
+# ---------- 引擎接口 ----------
+class DietEngine:
+    """食谱生成引擎的公共接口
+
+    引擎由共享的食物数据库构造，之后可以为任意用户反复调用 generate。
+    """
+    name = ""
+    label = ""
+    capabilities = frozenset()
+    calorie_strategy = "banded"
+
+    def __init__(self, catalog: Optional[Dict] = None):
+        self.catalog = catalog
+
+    def generate(self, profile: Dict, days: int = 7, rng: random.Random = None, progress=None) -> Dict:
+        """为用户生成若干天的菜谱，progress(已完成天数, 总天数) 用于汇报进度"""
+        raise NotImplementedError
+
+    def summarize(self, profile: Dict) -> Dict:
+        """返回用户的身体指标和推荐药材"""
+        bmi, calorie_needs = user_metabolics(profile, strategy=self.calorie_strategy)
+        return {
+            "bmi": bmi,
+            "calorie_needs": calorie_needs,
+            "medicinals": select_medicinals(profile),
+        }
+
+    def generate_plan(self, profile: Dict, days: int = 7, rng: random.Random = None, progress=None) -> Dict:
+        """生成结构化计划（需要 replan 能力）"""
+        raise NotImplementedError(f"{self.label} 不支持结构化计划")
+
+    def replan(self, profile: Dict, plan: Dict, day: str, meal_type: str = None, slot=None,
+               rng: random.Random = None) -> Dict:
+        """局部重新生成结构化计划中的一天、一餐或一道菜（需要 replan 能力）"""
+        raise NotImplementedError(f"{self.label} 不支持局部重新规划")
+
+    def render(self, plan: Dict) -> Dict:
+        """将结构化计划渲染为菜单格式"""
+        raise NotImplementedError(f"{self.label} 不支持结构化计划")
+
+    def generate_household(self, profiles: List[Dict], days: int = 7, rng: random.Random = None,
+                           progress=None) -> Dict:
+        """为一家人生成共用主食和蛋白质的菜谱（需要 household 能力）"""
+        raise NotImplementedError(f"{self.label} 不支持家庭规划")
+
+    def has_capability(self, capability: str) -> bool:
+        return capability in self.capabilities
+
+
+@register_engine
+class BasicEngine(DietEngine):
+    """基础版：固定食材列表，不依赖食物数据库"""
+    name = "basic"
+    label = "基础版"
+    capabilities = frozenset({CAP_SEASONAL, CAP_DISEASE})
+    calorie_strategy = "flat"
+
+    def _make_generator(self, profile, rng):
+        return DietGenerator(profile, rng=rng)
+
+    def generate(self, profile, days=7, rng=None, progress=None):
+        return self._make_generator(profile, rng).generate_weekly_menu(days, progress=progress)
+
+
+@register_engine
+class EnhancedEngine(DietEngine):
+    """增强版：基于食物数据库，支持菜系、多样性和营养均衡"""
+    name = "enhanced"
+    label = "增强版(包含菜系、多样性和营养均衡)"
+    capabilities = frozenset({CAP_CATALOG, CAP_CUISINE, CAP_DIVERSITY,
+                              CAP_DISEASE, CAP_SEASONAL, CAP_DIET_TIPS, CAP_REPLAN, CAP_HOUSEHOLD})
+
+    def __init__(self, catalog=None):
+        super().__init__(catalog)
+        # 紧凑的食物记录与候选集缓存，由该引擎生成的所有计划共享
+        self.foods = FoodCatalog.from_helper_data(catalog) if catalog else None
+
+    def _make_generator(self, profile, rng):
+        return EnhancedDietGenerator(profile, diet_helper_data=self.catalog, rng=rng, foods=self.foods)
+
+    def generate(self, profile, days=7, rng=None, progress=None):
+        return self._make_generator(profile, rng).generate_weekly_menu(days, progress=progress)
+
+    def generate_plan(self, profile, days=7, rng=None, progress=None):
+        return self._make_generator(profile, rng).generate_weekly_plan(days, progress=progress)
+
+    def replan(self, profile, plan, day, meal_type=None, slot=None, rng=None):
+        return self._make_generator(profile, rng).replan(plan, day, meal_type=meal_type, slot=slot)
+
+    def render(self, plan):
+        return render_plan(plan, self.foods)
+
+    def generate_household(self, profiles, days=7, rng=None, progress=None):
+        planner = HouseholdPlanner(profiles, diet_helper_data=self.catalog, rng=rng, foods=self.foods)
+        plans = planner.generate_weekly_plans(days, progress=progress)
+        return {
+            "menus": {name: render_plan(plan, self.foods) for name, plan in plans.items()},
+            "shared": planner.shared_summary(plans),
+        }
+
+
+@register_engine
+class TemplateEngine(EnhancedEngine):
+    """模板版：从预先生成的餐次模板库中抽样组装，分桶缺失时退回增强版生成
+
+    组装后按用户的热量需求和供能比例求解克数（与增强版相同）。
+    模板库在创建引擎时加载，并在引擎的 FoodCatalog 上解析好食物，第一次请求不再读盘。
+    replan 对模板组装的计划同样有效，替换的菜品由增强版生成器挑选；
+    generate_household 不使用模板，直接由增强版的家庭规划生成。
+    """
+    name = "template"
+    label = "模板版(预生成模板，快速组装)"
+    capabilities = EnhancedEngine.capabilities | {CAP_TEMPLATES}
+
+    def __init__(self, catalog=None, library=None):
+        super().__init__(catalog)
+        self.portions = PortionSolver(self.foods)
+        self.library = library if library is not None else load_template_library()
+        if self.library is not None and self.foods is not None:
+            self.library.bind(self.foods)
+
+    def generate(self, profile, days=7, rng=None, progress=None):
+        return self.render(self.generate_plan(profile, days=days, rng=rng, progress=progress))
+
+    def generate_plan(self, profile, days=7, rng=None, progress=None):
+        library = self.library
+        if library is None or profile not in library:
+            return super().generate_plan(profile, days=days, rng=rng, progress=progress)
+        plan = library.assemble_plan(profile, self.foods, days=days, rng=rng, progress=progress)
+        calorie_needs = user_metabolics(profile, strategy="banded")[1]
+        return self.portions.solve_plan(plan, calorie_needs, macro_targets(profile["diseases"]))
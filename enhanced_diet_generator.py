@@ -1,7 +1,16 @@
 import json
 import random
+from itertools import accumulate
 from typing import Dict, List
 
+import numpy as np
+
+from main import disease_priority, select_medicinals
+from food_catalog import (Dish, Food, FoodCatalog, Meal, default_staple_names, dessert_options, fallback_foods,
+                          soup_options)
+from metabolism import user_metabolics
+from portion_solver import PortionSolver, macro_targets
+
 # 加载处理好的食物数据
 def load_diet_helper_data():
     try:
@@ -11,16 +20,98 @@ def load_diet_helper_data():
         print(f"加载食物数据时出错: {str(e)}")
         return None
 
+meal_types = ["早餐", "午餐", "晚餐"]
+
+# 各餐主食的参考生重（克），用于计算热量，不在菜单中显示
+staple_grams = {"早餐": 60, "午餐": 80, "晚餐": 70}
+
+# 各类菜品的克数范围
+slot_gram_ranges = {
+    "蔬菜": (150, 250),
+    "蛋白质": (80, 150),
+    "时令蔬菜": (100, 200),
+    "水果": (80, 150)
+}
+
+# 各疾病对蔬菜和蛋白质食材的营养素限制（每100克，上限不包含），营养数据缺失的食物不受限制
+disease_nutrient_limits = {
+    "高血压": {"钠": (None, 200)},
+    "糖尿病": {"碳水化合物": (None, 20)},
+    "高血脂": {"脂肪": (None, 15), "胆固醇": (None, 200)}
+}
+
+# 按体质评分抽样：蔬菜只在评分最高的若干种中挑选，评分越高被选中的概率越大（权重 exp(β·评分)）
+constitution_top_vegetables = 30
+constitution_temperature = 2.0
+
+protein_cooking_methods = ["煮", "蒸", "炖", "烤", "煎"]
+
+# 简化的季节蔬菜、水果对应关系（名称关键词）
+seasonal_vegetable_names = {
+    "春季": ["春笋", "荠菜", "韭菜", "菠菜", "豌豆"],
+    "夏季": ["冬瓜", "丝瓜", "茄子", "黄瓜", "苦瓜"],
+    "秋季": ["白萝卜", "胡萝卜", "山药", "莲藕", "南瓜"],
+    "冬季": ["白菜", "芹菜", "菠菜", "大葱", "花椰菜"]
+}
+seasonal_fruit_names = {
+    "春季": ["草莓", "樱桃", "枇杷", "杨梅"],
+    "夏季": ["西瓜", "桃子", "荔枝", "葡萄", "杏"],
+    "秋季": ["苹果", "梨", "柿子", "猕猴桃", "柚子"],
+    "冬季": ["橙子", "橘子", "柚子", "香蕉", "火龙果"]
+}
+
+def effective_disease(diseases: List[str]) -> str:
+    """影响食材选择的疾病档位：只取优先级最高的一种（没有时为"无"）"""
+    return next((d for d in disease_priority if d in diseases), "无")
+
+def make_dish(slot: str, food: Food, grams: int, method: str = "", flavor: str = "", medicinal: str = "",
+              unit: str = "g") -> Dish:
+    """构造结构化菜品，只记录食物id"""
+    return Dish(slot, food.id, grams, unit, method, flavor, medicinal)
+
+def render_dish(dish: Dish, foods: FoodCatalog) -> str:
+    """将结构化菜品渲染为菜单中的文字"""
+    name = foods[dish.food_id].name
+    amount = f"{dish.grams}{dish.unit}"
+    if dish.slot == "蔬菜":
+        return f"{dish.method}{name}（{amount}，{dish.flavor}味）"
+    if dish.slot == "蛋白质":
+        return f"{dish.method}{name}（{amount}，药材：{dish.medicinal} 适量）"
+    if dish.slot == "水果":
+        return f"水果：{name}（{amount}）"
+    return f"{dish.method}{name}（{amount}）"
+
+def render_meal(meal: Meal, foods: FoodCatalog) -> Dict:
+    """将结构化餐次渲染为菜单格式"""
+    carbs, protein, fat = meal.ratios
+    return {
+        "主食": f"{foods[meal.staple.food_id].name or '未知主食'}（{meal.staple.grams}{meal.staple.unit}）",
+        "菜品": [render_dish(dish, foods) for dish in meal.dishes],
+        "热量": f"{meal.calorie}kcal",
+        "营养素": f"碳水{carbs}% 蛋白{protein}% 脂肪{fat}%"
+    }
+
+def render_plan(plan: Dict, foods: FoodCatalog) -> Dict:
+    """将结构化的一周计划渲染为菜单格式"""
+    return {day: {meal_type: render_meal(meal, foods) for meal_type, meal in meals.items()}
+            for day, meals in plan.items()}
+
 class EnhancedDietGenerator:
-    def __init__(self, user_data: Dict):
+    def __init__(self, user_data: Dict, diet_helper_data: Dict = None, rng: random.Random = None,
+                 foods: FoodCatalog = None):
         self.user_data = user_data
-        self.bmi = user_data["weight"] / (user_data["height"]/100)**2
-        self.calorie_needs = self._calculate_calorie()
+        self.rng = rng or random
+        self.bmi, self.calorie_needs = user_metabolics(user_data, strategy="banded")
         
-        # 加载食物数据库
-        self.diet_helper_data = load_diet_helper_data()
+        # 加载食物数据库（可由调用方传入共享的数据，避免重复加载）
+        self.diet_helper_data = diet_helper_data or load_diet_helper_data()
         if not self.diet_helper_data:
             raise ValueError("无法加载食物数据库，请确保已经运行 process_food_data.py")
+        # 紧凑的食物记录和候选集缓存，多个生成器可共享同一个 FoodCatalog
+        self.foods = foods or FoodCatalog.from_helper_data(self.diet_helper_data)
+        # 按热量需求和供能比例求解每天各道菜的克数
+        self.portions = PortionSolver(self.foods)
+        self.macro_targets = macro_targets(user_data["diseases"])
         
         # 确保用一周内不会重复相同的主食和蛋白质
         self.used_staples = set()  # 已使用的主食
@@ -30,31 +121,12 @@ class EnhancedDietGenerator:
         self.weekly_record = {f"Day{i+1}": {"主食": [], "蛋白质": [], "蔬菜": [], "水果": []} for i in range(7)}
         
     def _calculate_calorie(self) -> float:
-        """根据Harris-Benedict公式计算基础代谢"""
-        if self.user_data["gender"] == "男":
-            bmr = 88.362 + 13.397*self.user_data["weight"] + 4.799*self.user_data["height"] - 5.677*self.user_data["age"]
-        else:
-            bmr = 447.593 + 9.247*self.user_data["weight"] + 3.098*self.user_data["height"] - 4.330*self.user_data["age"]
-        
-        # 根据活动量调整
-        activity_level = {"轻体力":1.2, "中等体力":1.55, "重体力":1.9}
-        
-        # 根据BMI调整热量
-        bmi_adjustment = 1.0
-        if self.bmi > 28:  # 肥胖
-            bmi_adjustment = 0.8
-        elif self.bmi > 24:  # 超重
-            bmi_adjustment = 0.85
-        elif self.bmi < 18.5:  # 偏瘦
-            bmi_adjustment = 1.1
-        
-        return round(bmr * activity_level[self.user_data["activity"]] * bmi_adjustment, 0)
+        """根据Harris-Benedict公式计算基础代谢（按BMI分段调整）"""
+        return user_metabolics(self.user_data, strategy="banded")[1]
 
     def _select_medicinal(self) -> List[str]:
         """选择药食同源药材"""
-        from main import medicinal_foods
-        main_type = self.user_data["main_type"]
-        return medicinal_foods.get(main_type, []) + medicinal_foods.get(self.user_data["sub_type"], [])
+        return select_medicinals(self.user_data)
 
     def _select_ingredients_by_cuisine(self, food_type):
         """根据用户偏好的菜系选择食材和烹饪方法"""
@@ -70,8 +142,8 @@ class EnhancedDietGenerator:
             cuisine_flavors = ["鲜", "香", "咸", "甜"]
         
         # 随机选择烹饪方法和口味
-        cooking_method = random.choice(cuisine_methods)
-        flavor = random.choice(cuisine_flavors)
+        cooking_method = self.rng.choice(cuisine_methods)
+        flavor = self.rng.choice(cuisine_flavors)
         
         return cooking_method, flavor
 
@@ -81,22 +153,14 @@ class EnhancedDietGenerator:
         seasonal_fruits = []
         
         # 从食物数据库中筛选出水果类
-        all_fruits = self.diet_helper_data['food_by_type'].get('水果', [])
-        
-        # 简化的季节水果对应关系
-        season_mapping = {
-            "春季": ["草莓", "樱桃", "枇杷", "杨梅"],
-            "夏季": ["西瓜", "桃子", "荔枝", "葡萄", "杏"],
-            "秋季": ["苹果", "梨", "柿子", "猕猴桃", "柚子"],
-            "冬季": ["橙子", "橘子", "柚子", "香蕉", "火龙果"]
-        }
+        all_fruits = self.foods.by_type.get('水果', ())
         
         # 获取当季水果
-        seasonal_names = season_mapping.get(season, [])
+        seasonal_names = seasonal_fruit_names.get(season, [])
         
         # 筛选存在于数据库中的当季水果
         for fruit in all_fruits:
-            fruit_name = fruit.get('name', '')
+            fruit_name = fruit.name
             for seasonal_name in seasonal_names:
                 if seasonal_name in fruit_name:
                     seasonal_fruits.append(fruit)
@@ -105,7 +169,7 @@ class EnhancedDietGenerator:
         common_fruits = ["苹果", "香蕉", "橙子"]
         if len(seasonal_fruits) < 3:
             for fruit in all_fruits:
-                fruit_name = fruit.get('name', '')
+                fruit_name = fruit.name
                 for common_name in common_fruits:
                     if common_name in fruit_name and fruit not in seasonal_fruits:
                         seasonal_fruits.append(fruit)
@@ -117,11 +181,11 @@ class EnhancedDietGenerator:
         return seasonal_fruits or all_fruits[:5]  # 确保至少有一些水果可选
     
     def _avoid_repetition(self, food_list, used_items, day, meal_type, max_attempts=10):
-        """尝试避免一周内重复食材"""
+        """尝试避免一周内重复食材（按标准名称比较，别名不同的同一种食物也算重复）"""
         attempts = 0
         while attempts < max_attempts:
-            item = random.choice(food_list)
-            item_name = item.get('name', '')
+            item = self.rng.choice(food_list)
+            item_name = self.foods.canonical(item.name)
             
             # 检查是否已经在本周使用过
             if item_name not in used_items:
@@ -133,98 +197,205 @@ class EnhancedDietGenerator:
             attempts += 1
         
         # 如果尝试多次仍无法避免重复，则接受重复
-        item = random.choice(food_list)
-        item_name = item.get('name', '')
+        item = self.rng.choice(food_list)
+        item_name = self.foods.canonical(item.name)
         self.weekly_record[day][meal_type].append(item_name)
         return item
 
-    def generate_weekly_menu(self) -> Dict:
-        """生成一周菜谱"""
-        menu = {}
-        for day in range(1, 8):
+    def generate_weekly_menu(self, days: int = 7, progress=None) -> Dict:
+        """生成一周菜谱，progress(已完成天数, 总天数) 用于汇报进度"""
+        return render_plan(self.generate_weekly_plan(days, progress=progress), self.foods)
+
+    def generate_weekly_plan(self, days: int = 7, progress=None) -> Dict:
+        """生成结构化的一周计划，可用 render_plan 渲染，或用 replan 局部调整"""
+        plan = {}
+        for day in range(1, days + 1):
             day_key = f"Day{day}"
-            menu[day_key] = {
-                "早餐": self._generate_meal("早餐", day_key),
-                "午餐": self._generate_meal("午餐", day_key),
-                "晚餐": self._generate_meal("晚餐", day_key)
-            }
-        return menu
+            self.weekly_record.setdefault(day_key, {"主食": [], "蛋白质": [], "蔬菜": [], "水果": []})
+            plan[day_key] = {meal_type: self._compose_meal(meal_type, day_key) for meal_type in meal_types}
+            if progress:
+                progress(day, days)
+        # 整周的克数一次批量求解
+        return self.portions.solve_plan(plan, self.calorie_needs, self.macro_targets)
+
+    # ---------- 局部重新规划 ----------
+    def replan(self, plan: Dict, day: str, meal_type: str = None, slot=None) -> Dict:
+        """只重新生成计划中的一天、一餐或一道菜，其余部分保持不变
+
+        slot 为 "主食" 或菜品在该餐 dishes 中的下标。新内容会避开本周其他餐次已用的主食、
+        同一天内已用的食材；重新生成的餐次按热量需求重新求解克数，当天其余餐次保持原克数。
+        返回新的计划，原计划不会被修改。
+        """
+        if day not in plan:
+            raise ValueError(f"计划中没有 {day}")
+        if meal_type is not None and meal_type not in plan[day]:
+            raise ValueError(f"{day} 中没有 {meal_type}")
+        if slot is not None and meal_type is None:
+            raise ValueError("重新生成单道菜时必须指定餐次")
+
+        targets = [meal_type] if meal_type else list(plan[day].keys())
+        excluded = set() if slot is not None else {(day, target) for target in targets}
+        self._restore_state(plan, excluded)
+
+        new_plan = {day_key: dict(meals) for day_key, meals in plan.items()}
+        if slot is not None:
+            new_plan[day][meal_type] = self._replan_slot(plan[day][meal_type], day, slot)
+        else:
+            for target in targets:
+                new_plan[day][target] = self._compose_meal(target, day)
+        # 重新求解克数，当天未重新生成的餐次保持原克数
+        frozen = {(day, other) for other in plan[day] if other not in targets}
+        return self.portions.solve_plan(new_plan, self.calorie_needs, self.macro_targets, days=[day], frozen=frozen)
+
+    def _restore_state(self, plan: Dict, excluded: set):
+        """根据已有计划重建多样性记录（跳过将要重新生成的餐次）"""
+        self.used_staples = set()
+        self.weekly_record = {}
+        for day_key, meals in plan.items():
+            record = self.weekly_record.setdefault(day_key, {"主食": [], "蛋白质": [], "蔬菜": [], "水果": []})
+            for meal_type, meal in meals.items():
+                if (day_key, meal_type) in excluded:
+                    continue
+                staple_name = self.foods.canonical(self.foods[meal.staple.food_id].name)
+                self.used_staples.add(staple_name)
+                record["主食"].append(staple_name)
+                for dish in meal.dishes:
+                    category = "蔬菜" if dish.slot == "时令蔬菜" else dish.slot
+                    if category in record:
+                        record[category].append(self.foods.canonical(self.foods[dish.food_id].name))
+
+    def _replan_slot(self, meal: Meal, day: str, slot, max_attempts: int = 10) -> Meal:
+        """替换一餐中的单道菜（克数暂用原菜的克数，之后由 replan 统一求解）"""
+        if slot == "主食":
+            food = self._avoid_repetition(self._get_staples(meal.meal_type), self.used_staples, day, "主食")
+            return meal._replace(staple=meal.staple._replace(food_id=food.id))
+
+        if not isinstance(slot, int) or not 0 <= slot < len(meal.dishes):
+            raise ValueError(f"无效的菜品位置: {slot}")
+        old = meal.dishes[slot]
+        # 避开同一天内已经出现过的食材（包括被替换的这道菜）
+        used_today = {name for names in self.weekly_record[day].values() for name in names}
+        food = None
+        for _ in range(max_attempts):
+            food = self._select_for_slot(old.slot)
+            if self.foods.canonical(food.name) not in used_today:
+                break
+
+        dishes = list(meal.dishes)
+        dishes[slot] = old._replace(food_id=food.id)
+        return meal._replace(dishes=tuple(dishes))
+
+    def _select_for_slot(self, slot: str) -> Food:
+        """按菜品类别选择一种食材"""
+        if slot == "蔬菜":
+            return self._select_vegetable_by_condition()
+        if slot == "蛋白质":
+            return self._select_protein_by_condition()
+        if slot == "时令蔬菜":
+            return self._select_seasonal_vegetable()
+        if slot == "水果":
+            return self._select_fruit()
+        if slot == "汤":
+            return self.foods.intern(self.rng.choice(soup_options))
+        return self.foods.intern(self.rng.choice(dessert_options))
 
     def _generate_meal(self, meal_type: str, day: str) -> Dict:
         """生成单餐数据（结合食物数据库）"""
+        return render_meal(self._compose_meal(meal_type, day), self.foods)
+
+    def _compose_meal(self, meal_type: str, day: str, shared: Dict[str, Dish] = None) -> Meal:
+        """生成单餐的结构化数据，每道菜记录食材、克数和烹饪方法
+
+        shared 为家庭共用的菜品（"主食"/"蛋白质" -> Dish），给出时直接使用，不再单独挑选。
+        """
+        shared = shared or {}
         # 根据餐点类型调整主食和热量
+        main_food_options = self._get_staples(meal_type)
         if meal_type == "早餐":
-            main_food_options = self._get_breakfast_staples()
-            calorie = f"{random.randint(350, 450)}kcal"
+            calorie = self.rng.randint(350, 450)
             fruit_included = True  # 早餐包含水果
         elif meal_type == "午餐":
-            main_food_options = self._get_lunch_staples()
-            calorie = f"{random.randint(500, 600)}kcal"
+            calorie = self.rng.randint(500, 600)
             fruit_included = False  # 午餐不一定包含水果
         else:  # 晚餐
-            main_food_options = self._get_dinner_staples()
-            calorie = f"{random.randint(400, 500)}kcal"
-            fruit_included = random.choice([True, False])  # 晚餐有50%概率包含水果
+            calorie = self.rng.randint(400, 500)
+            fruit_included = self.rng.choice([True, False])  # 晚餐有50%概率包含水果
         
         # 随机选择主食，避免重复
-        main_food = self._avoid_repetition(main_food_options, self.used_staples, day, "主食")
-        main_food_name = main_food.get('name', '未知主食')
+        if "主食" in shared:
+            staple = shared["主食"]
+            staple_name = self.foods.canonical(self.foods[staple.food_id].name)
+            self.used_staples.add(staple_name)
+            self.weekly_record[day]["主食"].append(staple_name)
+        else:
+            main_food = self._avoid_repetition(main_food_options, self.used_staples, day, "主食")
+            staple = make_dish("主食", main_food, staple_grams[meal_type])
         
         # 随机选择1-3种药材
         medicinals = self._select_medicinal()
-        selected_medicinals = random.sample(medicinals, min(random.randint(1, 3), len(medicinals)))
+        selected_medicinals = self.rng.sample(medicinals, min(self.rng.randint(1, 3), len(medicinals)))
         
         # 根据用户饮食偏好选择烹饪方法
-        cooking_method, flavor = self._select_ingredients_by_cuisine(main_food.get('type', ''))
+        cooking_method, flavor = self._select_ingredients_by_cuisine(self.foods[staple.food_id].type)
         
         # 随机生成2-4道菜品
-        dish_count = random.randint(2, 4)
+        dish_count = self.rng.randint(2, 4)
         dishes = []
         
         # 第一道菜总是蔬菜
         vegetable = self._select_vegetable_by_condition()
         veg_cooking_methods = ["清炒", "凉拌", "爆炒", "蒸", "炖"]
-        veg_method = cooking_method if cooking_method in veg_cooking_methods else random.choice(veg_cooking_methods)
-        dishes.append(f"{veg_method}{vegetable.get('name', '')}（{random.randint(150, 250)}g，{flavor}味）")
+        veg_method = cooking_method if cooking_method in veg_cooking_methods else self.rng.choice(veg_cooking_methods)
+        dishes.append(make_dish("蔬菜", vegetable, self.rng.randint(*slot_gram_ranges["蔬菜"]),
+                                method=veg_method, flavor=flavor))
         
         # 第二道菜总是蛋白质
-        protein = self._select_protein_by_condition()
-        protein_cooking_methods = ["煮", "蒸", "炖", "烤", "煎"]
-        protein_method = cooking_method if cooking_method in protein_cooking_methods else random.choice(protein_cooking_methods)
-        dishes.append(f"{protein_method}{protein.get('name', '')}（{random.randint(80, 150)}g，药材：{', '.join(selected_medicinals[:1])} 适量）")
+        if "蛋白质" in shared:
+            dishes.append(shared["蛋白质"]._replace(medicinal=', '.join(selected_medicinals[:1])))
+        else:
+            protein = self._select_protein_by_condition()
+            protein_method = cooking_method if cooking_method in protein_cooking_methods else self.rng.choice(protein_cooking_methods)
+            dishes.append(make_dish("蛋白质", protein, self.rng.randint(*slot_gram_ranges["蛋白质"]), method=protein_method,
+                                    medicinal=', '.join(selected_medicinals[:1])))
         
         # 可能的第三道菜 - 当季蔬菜或其他菜品
         if dish_count >= 3:
             seasonal_veg = self._select_seasonal_vegetable()
             seasonal_cooking_methods = ["炒", "炖", "煮", "凉拌"]
-            seasonal_method = random.choice(seasonal_cooking_methods)
-            dishes.append(f"{seasonal_method}{seasonal_veg.get('name', '')}（{random.randint(100, 200)}g）")
+            seasonal_method = self.rng.choice(seasonal_cooking_methods)
+            dishes.append(make_dish("时令蔬菜", seasonal_veg, self.rng.randint(*slot_gram_ranges["时令蔬菜"]),
+                                    method=seasonal_method))
         
         # 可能的第四道菜 - 汤或甜点
         if dish_count >= 4:
-            if random.choice([True, False]):  # 50%概率是汤
-                soup_base = random.choice(["清汤", "番茄汤", "紫菜汤", "鸡汤", "排骨汤", "蘑菇汤"])
-                dishes.append(f"{soup_base}（250ml）")
+            if self.rng.choice([True, False]):  # 50%概率是汤
+                soup_base = self.rng.choice(soup_options)
+                dishes.append(make_dish("汤", self.foods.intern(soup_base), 250, unit="ml"))
             else:  # 50%概率是甜点
-                dessert = random.choice(["水果沙拉", "酸奶", "坚果", "红豆糕", "水果拼盘"])
-                dishes.append(f"{dessert}（100g）")
+                dessert = self.rng.choice(dessert_options)
+                dishes.append(make_dish("甜点", self.foods.intern(dessert), 100))
         
         # 如果包含水果，添加水果
         if fruit_included:
             fruit = self._select_fruit()
-            dishes.append(f"水果：{fruit.get('name', '')}（{random.randint(80, 150)}g）")
+            dishes.append(make_dish("水果", fruit, self.rng.randint(*slot_gram_ranges["水果"])))
         
         # 随机调整营养素比例
-        carbs = random.randint(40, 55)
-        protein = random.randint(20, 30)
+        carbs = self.rng.randint(40, 55)
+        protein = self.rng.randint(20, 30)
         fat = 100 - carbs - protein
         
-        return {
-            "主食": main_food_name,
-            "菜品": dishes,
-            "热量": calorie,
-            "营养素": f"碳水{carbs}% 蛋白{protein}% 脂肪{fat}%"
-        }
+        return Meal(meal_type, staple, tuple(dishes), calorie, (carbs, protein, fat))
+
+    def _get_staples(self, meal_type: str):
+        """获取对应餐次的主食选项（候选集在食物数据库上只构建一次）"""
+        if meal_type == "早餐":
+            build = self._get_breakfast_staples
+        elif meal_type == "午餐":
+            build = self._get_lunch_staples
+        else:
+            build = self._get_dinner_staples
+        return self.foods.pool(("主食", meal_type), build)
 
     def _get_breakfast_staples(self):
         """获取早餐主食选项"""
@@ -234,22 +405,16 @@ class EnhancedDietGenerator:
         staple_types = ['谷类', '薯类']
         
         for food_type in staple_types:
-            foods = self.diet_helper_data['food_by_type'].get(food_type, [])
+            foods = self.foods.by_type.get(food_type, ())
             # 筛选适合早餐的食物
             for food in foods:
-                name = food.get('name', '').lower()
+                name = food.name.lower()
                 if any(item in name for item in ["粥", "面包", "馒头", "包子", "花卷", "饼", "三明治", "燕麦"]):
                     breakfast_options.append(food)
         
         # 如果没有找到足够的选项，添加一些固定选项
         if len(breakfast_options) < 5:
-            default_options = [
-                {"name": "全麦面包", "type": "谷类"},
-                {"name": "燕麦粥", "type": "谷类"},
-                {"name": "杂粮粥", "type": "谷类"},
-                {"name": "小米粥", "type": "谷类"},
-                {"name": "馒头", "type": "谷类"}
-            ]
+            default_options = [self.foods.find(name, "谷类") for name in default_staple_names["早餐"]]
             for option in default_options:
                 if option not in breakfast_options:
                     breakfast_options.append(option)
@@ -264,22 +429,16 @@ class EnhancedDietGenerator:
         staple_types = ['谷类', '薯类']
         
         for food_type in staple_types:
-            foods = self.diet_helper_data['food_by_type'].get(food_type, [])
+            foods = self.foods.by_type.get(food_type, ())
             # 筛选适合午餐的食物
             for food in foods:
-                name = food.get('name', '').lower()
+                name = food.name.lower()
                 if any(item in name for item in ["米饭", "面条", "米粉", "意面", "通心粉", "面", "饭"]):
                     lunch_options.append(food)
         
         # 如果没有找到足够的选项，添加一些固定选项
         if len(lunch_options) < 5:
-            default_options = [
-                {"name": "杂粮饭", "type": "谷类"},
-                {"name": "糙米饭", "type": "谷类"},
-                {"name": "全麦面条", "type": "谷类"},
-                {"name": "米粉", "type": "谷类"},
-                {"name": "荞麦面", "type": "谷类"}
-            ]
+            default_options = [self.foods.find(name, "谷类") for name in default_staple_names["午餐"]]
             for option in default_options:
                 if option not in lunch_options:
                     lunch_options.append(option)
@@ -294,22 +453,16 @@ class EnhancedDietGenerator:
         staple_types = ['谷类', '薯类']
         
         for food_type in staple_types:
-            foods = self.diet_helper_data['food_by_type'].get(food_type, [])
+            foods = self.foods.by_type.get(food_type, ())
             # 筛选适合晚餐的食物
             for food in foods:
-                name = food.get('name', '').lower()
+                name = food.name.lower()
                 if any(item in name for item in ["米饭", "粥", "饭", "薯", "地瓜", "红薯"]):
                     dinner_options.append(food)
         
         # 如果没有找到足够的选项，添加一些固定选项
         if len(dinner_options) < 5:
-            default_options = [
-                {"name": "小米饭", "type": "谷类"},
-                {"name": "糙米饭", "type": "谷类"},
-                {"name": "薏米饭", "type": "谷类"},
-                {"name": "藜麦饭", "type": "谷类"},
-                {"name": "紫米饭", "type": "谷类"}
-            ]
+            default_options = [self.foods.find(name, "谷类") for name in default_staple_names["晚餐"]]
             for option in default_options:
                 if option not in dinner_options:
                     dinner_options.append(option)
@@ -318,6 +471,50 @@ class EnhancedDietGenerator:
 
     def _select_vegetable_by_condition(self):
         """根据用户体质和疾病选择适合的蔬菜"""
+        restriction = self._disease_restriction()
+        if self.foods.has_tcm:
+            return self._weighted_choice(
+                ("体质蔬菜", restriction), restriction, self.foods.dish_foods('蔬菜'),
+                top=constitution_top_vegetables
+            ) or self.foods.find(*fallback_foods["蔬菜"])
+
+        recommended_veggies = self.foods.pool(
+            ("体质蔬菜", self.user_data["main_type"], restriction),
+            lambda: self._filter_by_nutrients(self._get_recommended_vegetables(), restriction)
+        )
+        
+        # 随机选择一种蔬菜
+        return self.rng.choice(recommended_veggies) if recommended_veggies else self.foods.find(*fallback_foods["蔬菜"])
+
+    def _weighted_choice(self, key: tuple, restriction: str, candidates, top: int = None):
+        """按体质评分加权抽取一种食材
+
+        候选集经疾病营养素过滤后，用 食物属性矩阵·体质权重 一次算出所有候选的评分；
+        (候选, 累积权重) 按体质组合缓存，之后每次抽样只是一次二分查找。
+        """
+        main_type, sub_type = self.user_data["main_type"], self.user_data["sub_type"]
+
+        def build():
+            filtered = self._filter_by_nutrients(list(candidates), restriction)
+            if not filtered:
+                return (), ()
+            scores = self.foods.constitution_scores(main_type, sub_type)[[food.id for food in filtered]]
+            order = np.argsort(-scores, kind="stable")
+            if top is not None:
+                # 只保留评分为正的前 top 种，全部不为正时退回前 top 种
+                positive = int(np.count_nonzero(scores > 0))
+                order = order[:min(top, positive) or top]
+            chosen = scores[order]
+            weights = np.exp(constitution_temperature * (chosen - chosen.max()))
+            return tuple(filtered[i] for i in order.tolist()), tuple(accumulate(weights.tolist()))
+
+        foods, cum_weights = self.foods.memo(key + (main_type, sub_type), build)
+        if not foods:
+            return None
+        return self.rng.choices(foods, cum_weights=cum_weights)[0]
+
+    def _get_recommended_vegetables(self):
+        """获取适合用户体质的蔬菜（食物数据没有性味向量时使用的名称列表）"""
         # 获取用户的体质类型
         body_type = self.user_data["main_type"]
         
@@ -331,7 +528,7 @@ class EnhancedDietGenerator:
         }
         
         # 从数据库中获取蔬菜类别的食物
-        veggies = self.diet_helper_data['food_by_type'].get('蔬菜', [])
+        veggies = self.foods.dish_foods('蔬菜')
         
         # 根据体质推荐的蔬菜名称
         recommended_names = type_map.get(body_type, ["菠菜", "西红柿", "青菜"])
@@ -340,81 +537,95 @@ class EnhancedDietGenerator:
         recommended_veggies = []
         
         for veggie in veggies:
-            veggie_name = veggie.get('name', '')
+            veggie_name = veggie.name
             for rec_name in recommended_names:
                 if rec_name in veggie_name:
                     recommended_veggies.append(veggie)
                     break
         
         # 如果找不到匹配的蔬菜，使用所有蔬菜
-        if not recommended_veggies:
-            recommended_veggies = veggies
-        
-        # 随机选择一种蔬菜
-        return random.choice(recommended_veggies) if recommended_veggies else {"name": "时令蔬菜", "type": "蔬菜"}
+        return recommended_veggies or veggies
 
     def _select_seasonal_vegetable(self):
         """选择当季蔬菜"""
+        seasonal_veggies = self.foods.pool(("时令蔬菜", self.user_data["season"]), self._get_seasonal_vegetables)
+        
+        # 随机选择一种当季蔬菜
+        return self.rng.choice(seasonal_veggies) if seasonal_veggies else self.foods.find(*fallback_foods["蔬菜"])
+
+    def _get_seasonal_vegetables(self):
+        """获取当季蔬菜"""
         season = self.user_data["season"]
         
         # 从食物数据库中筛选出蔬菜类
-        all_veggies = self.diet_helper_data['food_by_type'].get('蔬菜', [])
-        
-        # 简化的季节蔬菜对应关系
-        season_mapping = {
-            "春季": ["春笋", "荠菜", "韭菜", "菠菜", "豌豆"],
-            "夏季": ["冬瓜", "丝瓜", "茄子", "黄瓜", "苦瓜"],
-            "秋季": ["白萝卜", "胡萝卜", "山药", "莲藕", "南瓜"],
-            "冬季": ["白菜", "芹菜", "菠菜", "大葱", "花椰菜"]
-        }
+        all_veggies = self.foods.dish_foods('蔬菜')
         
         # 获取当季蔬菜
-        seasonal_names = season_mapping.get(season, [])
+        seasonal_names = seasonal_vegetable_names.get(season, [])
         
         # 筛选存在于数据库中的当季蔬菜
         seasonal_veggies = []
         
         for veggie in all_veggies:
-            veggie_name = veggie.get('name', '')
+            veggie_name = veggie.name
             for seasonal_name in seasonal_names:
                 if seasonal_name in veggie_name:
                     seasonal_veggies.append(veggie)
         
         # 如果当季蔬菜不足，使用所有蔬菜
-        if not seasonal_veggies:
-            seasonal_veggies = all_veggies
-        
-        # 随机选择一种当季蔬菜
-        return random.choice(seasonal_veggies) if seasonal_veggies else {"name": "时令蔬菜", "type": "蔬菜"}
+        return seasonal_veggies or all_veggies
 
     def _select_protein_by_condition(self):
-        """根据用户的疾病情况选择适合的蛋白质来源"""
-        diseases = self.user_data["diseases"]
+        """根据用户的疾病情况选择适合的蛋白质来源，有性味数据时按体质评分加权"""
+        restriction = self._disease_restriction()
+        if self.foods.has_tcm:
+            return self._weighted_choice(
+                ("蛋白质", restriction), restriction, self._get_suitable_proteins([restriction])
+            ) or self.foods.find(*fallback_foods["蛋白质"])
+
+        suitable_foods = self._get_protein_candidates()
         
+        # 还是没有选择，提供默认值
+        if not suitable_foods:
+            return self.foods.find(*fallback_foods["蛋白质"])
+        
+        # 随机选择一种蛋白质食物
+        return self.rng.choice(suitable_foods)
+
+    def _get_protein_candidates(self):
+        """适合用户疾病情况、并通过营养素限制的蛋白质食材（按疾病缓存）"""
+        restriction = self._disease_restriction()
+        return self.foods.pool(
+            ("蛋白质", restriction),
+            lambda: self._filter_by_nutrients(self._get_suitable_proteins([restriction]), restriction)
+        )
+
+    def _get_suitable_proteins(self, diseases):
+        """获取适合用户疾病情况的蛋白质食物"""
         # 蛋白质类别包括豆类、畜肉、禽肉、蛋类、河海鲜
         protein_types = ["豆类", "畜肉", "禽肉", "蛋类", "河海鲜"]
         protein_foods = []
         
         for food_type in protein_types:
-            protein_foods.extend(self.diet_helper_data['food_by_type'].get(food_type, []))
+            protein_foods.extend(self.foods.dish_foods(food_type))
         
         # 疾病限制
         if "糖尿病" in diseases:
             # 优先选择低糖分的蛋白质
             suitable_foods = [food for food in protein_foods 
-                             if food.get('type') in ["豆类", "禽肉", "蛋类"]]
+                             if food.type in ["豆类", "禽肉", "蛋类"]]
         elif "高血压" in diseases:
             # 避免高盐食品
             suitable_foods = [food for food in protein_foods 
-                             if food.get('type') not in ["河海鲜"]]
+                             if food.type not in ["河海鲜"]]
         elif "高血脂" in diseases:
             # 避免高脂肪食品
             suitable_foods = [food for food in protein_foods 
-                             if food.get('type') not in ["畜肉"]]
+                             if food.type not in ["畜肉"]]
         elif "痛风" in diseases:
             # 避免高嘌呤食品
             suitable_foods = [food for food in protein_foods 
-                             if food.get('type') not in ["河海鲜", "畜肉"]]
+                             if food.type not in ["河海鲜", "畜肉"]]
         else:
             # 无疾病限制
             suitable_foods = protein_foods
@@ -422,25 +633,40 @@ class EnhancedDietGenerator:
         # 如果没有合适的选择，使用豆类和禽肉作为默认选择
         if not suitable_foods:
             for food_type in ["豆类", "禽肉"]:
-                suitable_foods.extend(self.diet_helper_data['food_by_type'].get(food_type, []))
-        
-        # 还是没有选择，提供默认值
-        if not suitable_foods:
-            return {"name": "豆腐", "type": "豆类"}
+                suitable_foods.extend(self.foods.dish_foods(food_type))
         
-        # 随机选择一种蛋白质食物
-        return random.choice(suitable_foods)
+        return suitable_foods
+
+    def _disease_restriction(self) -> str:
+        """影响食材选择的疾病（只取优先级最高的一种）"""
+        return effective_disease(self.user_data["diseases"])
+
+    def _filter_by_nutrients(self, candidates, disease: str):
+        """按疾病的营养素限制过滤候选食材，过滤后为空时保留原候选"""
+        limits = disease_nutrient_limits.get(disease)
+        if not limits or not candidates:
+            return candidates
+        allowed = self.foods.index.mask(ranges=limits, keep_missing=True)
+        filtered = [food for food in candidates if food.id < len(allowed) and allowed[food.id]]
+        return filtered or candidates
 
     def _select_fruit(self):
-        """选择水果"""
+        """选择水果，有性味数据时在当季水果中按体质评分加权"""
+        if self.foods.has_tcm:
+            # 水果不受疾病营养素限制
+            season = self.user_data["season"]
+            return self._weighted_choice(
+                ("时令水果", season), "无", self.foods.pool(("时令水果", season), self._get_seasonal_fruits)
+            ) or self.foods.find(*fallback_foods["水果"])
+
         # 获取当季水果
-        seasonal_fruits = self._get_seasonal_fruits()
+        seasonal_fruits = self.foods.pool(("时令水果", self.user_data["season"]), self._get_seasonal_fruits)
         
         # 随机选择一种水果
         if seasonal_fruits:
-            return random.choice(seasonal_fruits)
+            return self.rng.choice(seasonal_fruits)
         else:
-            return {"name": "时令水果", "type": "水果"}
+            return self.foods.find(*fallback_foods["水果"])
 
 # 测试代码
 if __name__ == "__main__":
@@ -0,0 +1,221 @@
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from process_food_data import (base_food_name, food_name_qualifiers, parse_nutrient_value, tcm_constitution_weights,
+                               tcm_property_names)
+
+# 不单独做成一道菜的食材：调味用的蔬菜（甜椒除外的辣椒等），以及干制、脱水、粉状的记录
+seasoning_food_names = {"姜", "大蒜", "葱", "小葱", "大葱", "香菜", "香茅", "罗勒", "百里香", "苜蓿籽", "辣椒"}
+processed_food_qualifiers = {"干", "脱水", "干冻", "干烤"}
+# 名称以"干"结尾但本身就是一道菜的食材
+dish_food_exceptions = {"豆腐干"}
+
+# 数据库之外、生成时用到的食物：汤、甜点、各餐默认主食和找不到候选时的兜底食材
+soup_options = ["清汤", "番茄汤", "紫菜汤", "鸡汤", "排骨汤", "蘑菇汤"]
+dessert_options = ["水果沙拉", "酸奶", "坚果", "红豆糕", "水果拼盘"]
+default_staple_names = {
+    "早餐": ["全麦面包", "燕麦粥", "杂粮粥", "小米粥", "馒头"],
+    "午餐": ["杂粮饭", "糙米饭", "全麦面条", "米粉", "荞麦面"],
+    "晚餐": ["小米饭", "糙米饭", "薏米饭", "藜麦饭", "紫米饭"]
+}
+fallback_foods = {"蔬菜": ("时令蔬菜", "蔬菜"), "蛋白质": ("豆腐", "豆类"), "水果": ("时令水果", "水果")}
+# 默认主食和兜底食材优先使用数据库中的同名记录（见 FoodCatalog.find），数据库中没有时才用这里分配的id；
+# 构建 FoodCatalog 时按此顺序预先分配id，食物id与各引擎、各线程的调用顺序无关
+runtime_foods = list(dict.fromkeys(
+    [(name, "") for name in soup_options + dessert_options]
+    + [(name, "谷类") for names in default_staple_names.values() for name in names]
+    + list(fallback_foods.values())
+))
+
+
+class Food(NamedTuple):
+    """食物数据库中的一条记录，只保留生成引擎需要的字段（每100克的数值）"""
+    id: int
+    name: str
+    type: str
+    energy: float
+    protein: float
+    fat: float
+    carbs: float
+
+
+class Dish(NamedTuple):
+    """一道菜：引用食物id和克数，文字在输出时才渲染"""
+    slot: str
+    food_id: int
+    grams: int
+    unit: str = "g"
+    method: str = ""
+    flavor: str = ""
+    medicinal: str = ""
+
+
+class Meal(NamedTuple):
+    """一餐：主食、菜品以及热量目标和营养素比例"""
+    meal_type: str
+    staple: Dish
+    dishes: Tuple[Dish, ...]
+    calorie: int
+    ratios: Tuple[int, int, int]
+
+
+def is_dish_food(food: Food) -> bool:
+    """食材能否作为一道菜的主料（蔬菜、蛋白质候选集只保留这类食材）"""
+    name = food.name
+    base = base_food_name(name)
+    if base in dish_food_exceptions:
+        return True
+    if base in seasoning_food_names and "甜" not in name:
+        return False
+    if food_name_qualifiers(name) & processed_food_qualifiers:
+        return False
+    return not (base.endswith("粉") or base.endswith("干"))
+
+
+class FoodCatalog:
+    """以列存方式组织的食物数据库
+
+    foods[i] 为紧凑的 Food 记录，nutrients[i] 为对应的营养素数值行（float32，缺失为NaN），
+    列名见 nutrient_names；tcm[i] 为性味归经属性向量，列名见 tcm_property_names。
+    aliases 为 process_food_data.py 合并重复食物时得到的 别名 -> 标准名称。
+    runtime_foods 中的食物在构建时紧接着数据库记录分配id（营养素视为缺失）。
+    按类型分组的候选集和筛选结果都只保存食物记录的引用。
+    """
+
+    def __init__(self, records: List[Dict], tcm_weights: Optional[Dict[str, List[float]]] = None,
+                 aliases: Optional[Dict[str, str]] = None):
+        self.nutrient_names = _nutrient_names(records)
+        self._column = {name: i for i, name in enumerate(self.nutrient_names)}
+        self.nutrients = np.full((len(records), len(self.nutrient_names)), np.nan, dtype=np.float32)
+        self.tcm_property_names = tcm_property_names
+        self.tcm = np.zeros((len(records), len(tcm_property_names)), dtype=np.float32)
+        # 旧版导出数据没有性味向量，此时生成器退回按名称列表挑选
+        self.has_tcm = bool(records) and all('tcm' in record for record in records)
+
+        foods = []
+        for i, record in enumerate(records):
+            info = record.get('info', {})
+            for name, value_str in info.items():
+                value = parse_nutrient_value(value_str)
+                if value is not None:
+                    self.nutrients[i, self._column[name]] = value
+            if 'tcm' in record:
+                self.tcm[i] = record['tcm']
+            foods.append(self._make_food(i, record.get('name', ''), record.get('type') or '其他'))
+        self.foods = foods
+        # 数据库中的食物数量，之后 intern 分配的食物排在其后
+        self.record_count = len(foods)
+
+        by_type = {}
+        for food in foods:
+            by_type.setdefault(food.type, []).append(food)
+        self.by_type = {food_type: tuple(items) for food_type, items in by_type.items()}
+
+        weights = tcm_weights or tcm_constitution_weights
+        self.tcm_weights = {name: np.asarray(w, dtype=np.float32) for name, w in weights.items()}
+        self.aliases = aliases or {}
+
+        self._interned = {}
+        self._pools = {}
+        self._index = None
+        self._lock = threading.Lock()
+        for name, food_type in runtime_foods:
+            self.intern(name, food_type)
+
+    @classmethod
+    def from_helper_data(cls, diet_helper_data: Dict) -> "FoodCatalog":
+        """由 process_food_data.py 导出的数据构建，保持 food_by_type 中的顺序"""
+        records = [food for foods in diet_helper_data['food_by_type'].values() for food in foods]
+        return cls(records, diet_helper_data.get('tcm_constitution_weights'), diet_helper_data.get('food_aliases'))
+
+    def _make_food(self, food_id: int, name: str, food_type: str) -> Food:
+        row = self.nutrients[food_id]
+        values = []
+        for nutrient in ("能量", "蛋白质", "脂肪", "碳水化合物"):
+            column = self._column.get(nutrient)
+            value = row[column] if column is not None else np.nan
+            values.append(0.0 if np.isnan(value) else float(value))
+        return Food(food_id, name, food_type, *values)
+
+    def __len__(self) -> int:
+        return len(self.foods)
+
+    def __getitem__(self, food_id: int) -> Food:
+        return self.foods[food_id]
+
+    @property
+    def index(self):
+        """营养素查询索引（见 food_query.py），第一次使用时构建"""
+        if self._index is None:
+            from food_query import NutrientIndex
+            self._index = NutrientIndex(self)
+        return self._index
+
+    def column(self, nutrient: str) -> np.ndarray:
+        """某种营养素在所有食物上的取值"""
+        return self.nutrients[:, self._column[nutrient]]
+
+    def constitution_scores(self, main_type: str, sub_type: Optional[str] = None) -> np.ndarray:
+        """所有食物对某种体质的适宜度：属性矩阵与体质权重向量相乘，兼夹体质按一半计入"""
+        def build():
+            weights = self.tcm_weights[main_type].copy()
+            if sub_type and sub_type != main_type:
+                weights += 0.5 * self.tcm_weights[sub_type]
+            return self.tcm @ weights
+        return self.memo(("体质评分", main_type, sub_type), build)
+
+    def canonical(self, name: str) -> str:
+        """食物的标准名称（别名如"土豆"对应"马铃薯"），不是别名时原样返回"""
+        return self.aliases.get(name, name)
+
+    def find(self, name: str, food_type: str = "") -> Food:
+        """按名称（或别名）查找数据库中的食物，找不到时按 intern 分配"""
+        by_name = self.memo(("名称",), lambda: {food.name: food for food in reversed(self.foods[:self.record_count])})
+        food = by_name.get(self.canonical(name))
+        return food if food is not None else self.intern(name, food_type)
+
+    def intern(self, name: str, food_type: str = "") -> Food:
+        """为不在数据库中的食物（默认主食、汤、甜点等）分配id，营养素视为缺失"""
+        key = (name, food_type)
+        food = self._interned.get(key)
+        if food is not None:
+            return food
+        with self._lock:
+            food = self._interned.get(key)
+            if food is None:
+                food = Food(len(self.foods), name, food_type, 0.0, 0.0, 0.0, 0.0)
+                missing = np.full((1, len(self.nutrient_names)), np.nan, dtype=np.float32)
+                self.nutrients = np.vstack([self.nutrients, missing])
+                self.tcm = np.vstack([self.tcm, np.zeros((1, len(self.tcm_property_names)), dtype=np.float32)])
+                self.foods.append(food)
+                self._interned[key] = food
+            return food
+
+    def dish_foods(self, food_type: str) -> Tuple[Food, ...]:
+        """某类食物中可以作为一道菜主料的部分（去掉调味用、干制和粉状的记录）"""
+        return self.pool(("菜品食材", food_type),
+                         lambda: [food for food in self.by_type.get(food_type, ()) if is_dish_food(food)])
+
+    def pool(self, key, build: Callable[[], List[Food]]) -> Tuple[Food, ...]:
+        """缓存候选集：同一个 key 只构建一次，之后各生成器共享"""
+        return self.memo(key, lambda: tuple(build()))
+
+    def memo(self, key, build: Callable):
+        """缓存任意派生数据（候选集、评分、抽样权重等），build 的结果不应再被修改"""
+        value = self._pools.get(key)
+        if value is None:
+            value = build()
+            with self._lock:
+                value = self._pools.setdefault(key, value)
+        return value
+
+
+def _nutrient_names(records: List[Dict]) -> List[str]:
+    """按出现顺序收集所有营养素名称"""
+    names = {}
+    for record in records:
+        for name in record.get('info', {}):
+            names.setdefault(name, None)
+    return list(names)
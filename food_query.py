@@ -0,0 +1,108 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from food_catalog import Food, FoodCatalog
+
+# 排序依据：营养素名称，或 (分子, 分母) 形式的营养素比值，如 ("蛋白质", "能量")
+SortKey = Union[str, Tuple[str, str]]
+
+
+class NutrientIndex:
+    """食物营养素查询索引
+
+    每种营养素维护一个排好序的下标数组，范围筛选用二分查找定位，多个条件用布尔掩码组合；
+    排序索引在第一次用到某种营养素时才构建。缺失值（NaN）默认不满足任何范围条件。
+    """
+
+    def __init__(self, foods: FoodCatalog):
+        self.foods = foods
+        # 只索引数据库中的食物，运行时补充的默认食物没有营养数据
+        self.size = foods.record_count
+        type_names = sorted({food.type for food in foods.foods[:self.size]})
+        self._type_codes = {name: code for code, name in enumerate(type_names)}
+        self.type_codes = np.array([self._type_codes[food.type] for food in foods.foods[:self.size]],
+                                   dtype=np.int32)
+        self._sorted = {}
+
+    def _column(self, nutrient: str) -> np.ndarray:
+        try:
+            return self.foods.column(nutrient)[:self.size]
+        except KeyError:
+            raise ValueError(f"未知的营养素: {nutrient}")
+
+    def _sorted_column(self, nutrient: str):
+        """返回 (按取值排序的下标, 排序后的取值, 非缺失值个数)"""
+        entry = self._sorted.get(nutrient)
+        if entry is None:
+            column = self._column(nutrient)
+            order = np.argsort(column, kind="stable")  # NaN 排在最后
+            entry = (order, column[order], int(np.count_nonzero(~np.isnan(column))))
+            self._sorted[nutrient] = entry
+        return entry
+
+    # ---------- 掩码 ----------
+    def type_mask(self, types: Iterable[str]) -> np.ndarray:
+        codes = [self._type_codes[t] for t in types if t in self._type_codes]
+        return np.isin(self.type_codes, codes)
+
+    def range_mask(self, nutrient: str, low: Optional[float] = None, high: Optional[float] = None,
+                   keep_missing: bool = False) -> np.ndarray:
+        """low <= 取值 < high 的食物（每100克），low/high 为空表示不限"""
+        order, values, valid = self._sorted_column(nutrient)
+        start = 0 if low is None else int(np.searchsorted(values[:valid], low, side="left"))
+        stop = valid if high is None else int(np.searchsorted(values[:valid], high, side="left"))
+        mask = np.zeros(self.size, dtype=bool)
+        mask[order[start:stop]] = True
+        if keep_missing:
+            mask[order[valid:]] = True
+        return mask
+
+    def mask(self, types: Optional[Iterable[str]] = None,
+             ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+             keep_missing: bool = False) -> np.ndarray:
+        """组合类型限制和多个营养素范围条件"""
+        mask = self.type_mask(types) if types is not None else np.ones(self.size, dtype=bool)
+        for nutrient, (low, high) in (ranges or {}).items():
+            mask &= self.range_mask(nutrient, low, high, keep_missing=keep_missing)
+        return mask
+
+    # ---------- 查询 ----------
+    def sort_values(self, key: SortKey) -> np.ndarray:
+        """排序依据的取值，比值的分母为0或缺失时记为NaN"""
+        if isinstance(key, str):
+            return self._column(key)
+        numerator, denominator = key
+        top = self._column(numerator)
+        bottom = self._column(denominator)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(bottom > 0, top / bottom, np.nan)
+
+    def query(self, types: Optional[Iterable[str]] = None,
+              ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+              sort_by: Optional[SortKey] = None, top_k: Optional[int] = None,
+              descending: bool = True, keep_missing: bool = False) -> List[Food]:
+        """按类型和营养素范围筛选，可按营养素或营养素比值取前k个
+
+        例：query(types=["蔬菜"], ranges={"钠": (None, 50), "钾": (300, None)},
+                  sort_by=("蛋白质", "能量"), top_k=10)
+        """
+        candidates = np.flatnonzero(self.mask(types, ranges, keep_missing))
+        if sort_by is not None:
+            values = self.sort_values(sort_by)[candidates]
+            present = ~np.isnan(values)
+            candidates, values = candidates[present], values[present]
+            keys = -values if descending else values
+            if top_k is not None and top_k < len(candidates):
+                # 先用 argpartition 取出前k个，再只对这k个排序
+                part = np.argpartition(keys, top_k - 1)[:top_k]
+                candidates, keys = candidates[part], keys[part]
+            candidates = candidates[np.argsort(keys, kind="stable")]
+        elif top_k is not None:
+            candidates = candidates[:top_k]
+        return [self.foods[i] for i in candidates.tolist()]
+
+    def top_k(self, key: SortKey, k: int = 10, types: Optional[Sequence[str]] = None,
+              descending: bool = True) -> List[Food]:
+        """某种营养素（或比值）最高/最低的k种食物"""
+        return self.query(types=types, sort_by=key, top_k=k, descending=descending)
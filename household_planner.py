@@ -0,0 +1,193 @@
+import random
+from itertools import accumulate
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from enhanced_diet_generator import (EnhancedDietGenerator, constitution_temperature, load_diet_helper_data,
+                                     make_dish, meal_types, protein_cooking_methods, render_plan,
+                                     slot_gram_ranges, staple_grams)
+from food_catalog import Dish, FoodCatalog, Meal
+
+# 家庭成员之间共用的菜品类别
+shared_slots = ["主食", "蛋白质"]
+
+
+def member_name(profile: Dict, index: int) -> str:
+    return profile.get("name") or f"成员{index + 1}"
+
+
+def scale_meal(meal: Meal, factor: float) -> Meal:
+    """按成员的热量需求缩放一餐的份量和热量目标"""
+    def scale(dish: Dish) -> Dish:
+        return dish._replace(grams=int(round(dish.grams * factor)))
+    return meal._replace(staple=scale(meal.staple), dishes=tuple(scale(dish) for dish in meal.dishes),
+                         calorie=int(round(meal.calorie * factor)))
+
+
+class HouseholdPlanner:
+    """为一家人协调生成每周菜谱
+
+    主食和蛋白质在所有成员的体质、疾病限制都允许时共用一份（一起采购、一起烹饪），
+    其余菜品按各自体质单独挑选；每个人的份量先按其热量需求占全家平均值的比例缩放，
+    再由 PortionSolver 按各自的热量需求和供能比例求解。
+    共用候选集（各成员候选集的交集）按家庭成员组合只计算一次，缓存在共享的 FoodCatalog 上。
+    """
+
+    def __init__(self, profiles: List[Dict], diet_helper_data: Dict = None, rng: random.Random = None,
+                 foods: FoodCatalog = None):
+        if not profiles:
+            raise ValueError("家庭成员不能为空")
+        self.rng = rng or random
+        self.diet_helper_data = diet_helper_data or load_diet_helper_data()
+        if not self.diet_helper_data:
+            raise ValueError("无法加载食物数据库，请确保已经运行 process_food_data.py")
+        self.foods = foods or FoodCatalog.from_helper_data(self.diet_helper_data)
+
+        self.profiles = profiles
+        self.names = [member_name(profile, i) for i, profile in enumerate(profiles)]
+        if len(set(self.names)) != len(self.names):
+            raise ValueError("家庭成员名称不能重复")
+        self.members = [EnhancedDietGenerator(profile, diet_helper_data=self.diet_helper_data, rng=self.rng,
+                                              foods=self.foods)
+                        for profile in profiles]
+
+        calorie_needs = np.array([member.calorie_needs for member in self.members], dtype=float)
+        self.portion_factors = (calorie_needs / calorie_needs.mean()).tolist()
+
+        # 影响共用候选集的只有体质和疾病，顺序无关
+        self.group_key = tuple(sorted({(member.user_data["main_type"], member.user_data["sub_type"],
+                                        member._disease_restriction()) for member in self.members}))
+        self.used_staples = set()
+
+    # ---------- 共用候选集 ----------
+    def _shared_candidates(self, slot: str, meal_type: str):
+        """所有成员都可以吃的 (候选, 累积权重)，权重按成员平均体质评分计算"""
+        if slot == "主食":
+            key = ("家庭主食", meal_type, self.group_key)
+            pools = [member._get_staples(meal_type) for member in self.members]
+        else:
+            key = ("家庭蛋白质", self.group_key)
+            pools = [member._get_protein_candidates() for member in self.members]
+        return self.foods.memo(key, lambda: self._intersect(pools))
+
+    def _intersect(self, pools):
+        common = set.intersection(*({food.id for food in pool} for pool in pools))
+        candidates = [food for food in pools[0] if food.id in common]
+        if not candidates:
+            return (), ()
+        if not self.foods.has_tcm:
+            return tuple(candidates), tuple(range(1, len(candidates) + 1))
+
+        ids = [food.id for food in candidates]
+        scores = np.stack([self.foods.constitution_scores(member.user_data["main_type"],
+                                                          member.user_data["sub_type"])[ids]
+                           for member in self.members])
+        # 只要有一位成员的体质不宜（评分为负）就不共用
+        allowed = scores.min(axis=0) >= 0
+        if not allowed.any():
+            return (), ()
+        mean_scores = scores.mean(axis=0)[allowed]
+        weights = np.exp(constitution_temperature * (mean_scores - mean_scores.max()))
+        kept = [food for food, ok in zip(candidates, allowed.tolist()) if ok]
+        return tuple(kept), tuple(accumulate(weights.tolist()))
+
+    def _choose_shared(self, meal_type: str, max_attempts: int = 10) -> Dict[str, Dish]:
+        """挑选一餐的共用菜品（参考份量），没有共同候选的类别由成员各自挑选"""
+        shared = {}
+        staples, cum_weights = self._shared_candidates("主食", meal_type)
+        if staples:
+            staple = None
+            for _ in range(max_attempts):
+                staple = self.rng.choices(staples, cum_weights=cum_weights)[0]
+                if self.foods.canonical(staple.name) not in self.used_staples:
+                    break
+            self.used_staples.add(self.foods.canonical(staple.name))
+            shared["主食"] = make_dish("主食", staple, staple_grams[meal_type])
+
+        proteins, cum_weights = self._shared_candidates("蛋白质", meal_type)
+        if proteins:
+            protein = self.rng.choices(proteins, cum_weights=cum_weights)[0]
+            # 共用的菜按第一位成员（掌勺人）偏好的菜系烹饪
+            cooking_method, _ = self.members[0]._select_ingredients_by_cuisine(protein.type)
+            method = cooking_method if cooking_method in protein_cooking_methods else self.rng.choice(protein_cooking_methods)
+            shared["蛋白质"] = make_dish("蛋白质", protein, self.rng.randint(*slot_gram_ranges["蛋白质"]),
+                                         method=method)
+        return shared
+
+    # ---------- 生成 ----------
+    def generate_weekly_plans(self, days: int = 7, progress: Optional[Callable] = None) -> Dict[str, Dict]:
+        """生成每位成员的结构化计划 {成员: {DayN: {餐次: Meal}}}"""
+        plans = {name: {} for name in self.names}
+        for day in range(1, days + 1):
+            day_key = f"Day{day}"
+            for member in self.members:
+                member.weekly_record.setdefault(day_key, {"主食": [], "蛋白质": [], "蔬菜": [], "水果": []})
+            for meal_type in meal_types:
+                shared = self._choose_shared(meal_type)
+                for name, member, factor in zip(self.names, self.members, self.portion_factors):
+                    meal = member._compose_meal(meal_type, day_key, shared=shared)
+                    plans[name].setdefault(day_key, {})[meal_type] = scale_meal(meal, factor)
+            if progress:
+                progress(day, days)
+        # 以按比例缩放后的份量为起点，为所有成员批量求解克数
+        solved = self.members[0].portions.solve_plans([
+            (plans[name], member.calorie_needs, member.macro_targets)
+            for name, member in zip(self.names, self.members)
+        ])
+        return dict(zip(self.names, solved))
+
+    def generate_weekly_menus(self, days: int = 7, progress: Optional[Callable] = None) -> Dict[str, Dict]:
+        """生成每位成员的菜单 {成员: 菜单}"""
+        plans = self.generate_weekly_plans(days, progress=progress)
+        return {name: render_plan(plan, self.foods) for name, plan in plans.items()}
+
+    def shared_summary(self, plans: Dict[str, Dict]) -> Dict:
+        """统计共用菜品的比例，以及共用食材按天合计的采购克数"""
+        shared_dishes = 0
+        total_dishes = 0
+        shopping = {}
+        first = plans[self.names[0]]
+        for day_key, meals in first.items():
+            for meal_type in meals:
+                member_meals = [plans[name][day_key][meal_type] for name in self.names]
+                for slot in shared_slots:
+                    dishes = [meal.staple if slot == "主食" else
+                              next((d for d in meal.dishes if d.slot == slot), None)
+                              for meal in member_meals]
+                    if any(dish is None for dish in dishes):
+                        continue
+                    total_dishes += 1
+                    if len({dish.food_id for dish in dishes}) == 1:
+                        shared_dishes += 1
+                        name = self.foods[dishes[0].food_id].name
+                        day_list = shopping.setdefault(day_key, {})
+                        day_list[name] = day_list.get(name, 0) + sum(dish.grams for dish in dishes)
+        return {
+            "shared_ratio": round(shared_dishes / total_dishes, 3) if total_dishes else 0.0,
+            "shopping": shopping,
+        }
+
+
+# 测试代码
+if __name__ == "__main__":
+    family = [
+        {"name": "妈妈", "main_type": "痰湿内盛", "sub_type": "脾虚不运", "gender": "女", "age": 35,
+         "height": 165, "weight": 70, "activity": "中等体力", "diseases": ["高血压"],
+         "preferred_cuisine": "粤菜", "season": "夏季"},
+        {"name": "爸爸", "main_type": "胃热火郁", "sub_type": "气郁血瘀", "gender": "男", "age": 38,
+         "height": 178, "weight": 82, "activity": "重体力", "diseases": ["无"],
+         "preferred_cuisine": "川菜", "season": "夏季"},
+        {"name": "奶奶", "main_type": "脾肾阳虚", "sub_type": "脾虚不运", "gender": "女", "age": 68,
+         "height": 155, "weight": 52, "activity": "轻体力", "diseases": ["糖尿病"],
+         "preferred_cuisine": "粤菜", "season": "夏季"},
+    ]
+
+    try:
+        planner = HouseholdPlanner(family)
+        plans = planner.generate_weekly_plans()
+        print(planner.shared_summary(plans))
+        for name, plan in plans.items():
+            print(name, render_plan(plan, planner.foods)["Day1"]["午餐"])
+    except Exception as e:
+        print(f"生成家庭食谱时出错: {str(e)}")
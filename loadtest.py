@@ -0,0 +1,315 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from engines import available_engines, create_engine
+from main import medicinal_foods, seasonal_ingredients, disease_options, cuisine_options
+from metabolism import activity_levels
+
+
+# ---------- 随机用户 ----------
+def random_profile(rng: random.Random) -> Dict:
+    """在界面侧边栏的取值范围内随机生成一个用户"""
+    constitutions = list(medicinal_foods.keys())
+    real_diseases = [d for d in disease_options if d != "无"]
+    # 大多数用户没有或只有一种基础疾病
+    disease_count = rng.choices([0, 1, 2], weights=[5, 4, 1])[0]
+    return {
+        "main_type": rng.choice(constitutions),
+        "sub_type": rng.choice(constitutions),
+        "gender": rng.choice(["男", "女"]),
+        "age": rng.randint(18, 80),
+        "height": rng.randint(140, 200),
+        "weight": rng.randint(40, 150),
+        "activity": rng.choice(list(activity_levels.keys())),
+        "diseases": rng.sample(real_diseases, disease_count) or ["无"],
+        "preferred_cuisine": rng.choice(cuisine_options),
+        "season": rng.choice(list(seasonal_ingredients.keys())),
+    }
+
+
+def rss_mb(pid="self") -> Optional[float]:
+    """读取进程常驻内存（MB），非Linux系统退回到峰值内存"""
+    try:
+        with open(f"/proc/{pid}/status", 'r') as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    if pid != "self":
+        return None
+    import resource
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024, 1)
+
+
+# ---------- 压测目标 ----------
+_worker_engine = None
+
+
+def _init_worker(engine_name: str):
+    global _worker_engine
+    _worker_engine = create_engine(engine_name)
+
+
+def _generate_in_worker(profile: Dict, seed: int):
+    """在子进程中生成菜谱，返回子进程pid和内存，便于汇总内存增长"""
+    _worker_engine.generate(profile, rng=random.Random(seed))
+    return os.getpid(), rss_mb()
+
+
+class InProcessTarget:
+    """在当前进程的线程池中直接调用生成引擎（catalog 为空时加载默认的食物数据库）"""
+    name = "inprocess"
+
+    def __init__(self, engine_name: str, concurrency: int, catalog: Optional[Dict] = None):
+        self.engine = create_engine(engine_name, catalog)
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    def _call(self, profile, seed):
+        self.engine.generate(profile, rng=random.Random(seed))
+        return None
+
+    def submit(self, profile: Dict, seed: int):
+        return self.executor.submit(self._call, profile, seed)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+class ProcessPoolTarget:
+    """在进程池中调用生成引擎，每个子进程各自加载一份引擎"""
+    name = "process"
+
+    def __init__(self, engine_name: str, concurrency: int):
+        self.executor = ProcessPoolExecutor(max_workers=concurrency, initializer=_init_worker,
+                                            initargs=(engine_name,))
+
+    def submit(self, profile: Dict, seed: int):
+        return self.executor.submit(_generate_in_worker, profile, seed)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+class HttpTarget:
+    """通过HTTP调用本地接口（见 api.py）"""
+    name = "http"
+
+    def __init__(self, engine_name: str, concurrency: int, url: str, timeout: float = 30):
+        self.engine_name = engine_name
+        self.url = url.rstrip("/") + "/generate"
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    def _call(self, profile, seed):
+        body = json.dumps({"engine": self.engine_name, "profile": profile, "seed": seed},
+                          ensure_ascii=False).encode("utf-8")
+        request = urllib.request.Request(self.url, data=body,
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+        return None
+
+    def submit(self, profile: Dict, seed: int):
+        return self.executor.submit(self._call, profile, seed)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+def start_local_server(port: int, timeout: float = 30) -> subprocess.Popen:
+    """在子进程中启动 api.py，等待健康检查通过"""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "api.py")
+    process = subprocess.Popen([sys.executable, script, "--port", str(port)],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1):
+                return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("本地接口启动超时")
+
+
+# ---------- 压测驱动 ----------
+def latency_stats(latencies: List[float]) -> Dict:
+    """延迟分位数（毫秒）"""
+    if not latencies:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    p50, p95, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 95, 99])
+    return {"p50_ms": round(float(p50), 2), "p95_ms": round(float(p95), 2),
+            "p99_ms": round(float(p99), 2), "max_ms": round(max(latencies) * 1000, 2)}
+
+
+def run_load(target, concurrency: int = 4, rate: Optional[float] = None, duration: float = 10.0,
+             max_requests: Optional[int] = None, interval: float = 1.0, seed: int = 0,
+             on_snapshot=None) -> Dict:
+    """对目标施加负载
+
+    rate 为空时为闭环模式（始终保持 concurrency 个请求在途）；
+    否则为开环模式，按泊松过程以每秒 rate 个请求到达，排队时间计入延迟。
+    """
+    rng = random.Random(seed)
+    records = []  # (完成时间, 延迟, 是否成功)
+    worker_rss = {}
+    lock = threading.Lock()
+    in_flight = set()
+
+    def on_done(future, started):
+        finished = time.perf_counter()
+        ok = future.exception() is None
+        if ok and future.result():
+            pid, rss = future.result()
+            worker_rss[pid] = rss
+        with lock:
+            records.append((finished, finished - started, ok))
+
+    def submit(started):
+        future = target.submit(random_profile(rng), rng.randrange(2 ** 31))
+        future.add_done_callback(lambda f, started=started: on_done(f, started))
+        in_flight.add(future)
+
+    start = time.perf_counter()
+    stop_at = start + duration
+    rss_start = rss_mb()
+    snapshots = []
+    next_snapshot = start + interval
+    next_arrival = start
+    submitted = 0
+    reported = 0
+
+    while True:
+        now = time.perf_counter()
+        accepting = now < stop_at and (max_requests is None or submitted < max_requests)
+
+        # 提交新请求
+        if accepting:
+            if rate is None:
+                while len(in_flight) < concurrency and (max_requests is None or submitted < max_requests):
+                    submit(time.perf_counter())
+                    submitted += 1
+            else:
+                while next_arrival <= now and (max_requests is None or submitted < max_requests):
+                    submit(next_arrival)
+                    submitted += 1
+                    next_arrival += rng.expovariate(rate)
+        elif not in_flight:
+            break
+
+        # 等待完成或下一个到达/汇报时刻
+        deadlines = [next_snapshot]
+        if accepting:
+            deadlines.append(stop_at)
+            if rate is not None:
+                deadlines.append(next_arrival)
+        timeout = max(0.0, min(deadlines) - time.perf_counter())
+        done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED) if in_flight else (set(), None)
+        if not in_flight:
+            time.sleep(timeout)
+        in_flight.difference_update(done)
+
+        now = time.perf_counter()
+        if now >= next_snapshot:
+            with lock:
+                window = records[reported:]
+                reported = len(records)
+            snapshot = {
+                "elapsed_s": round(now - start, 2),
+                "completed": len(window),
+                "throughput": round(len(window) / interval, 2),
+                "errors": sum(1 for r in window if not r[2]),
+                "in_flight": len(in_flight),
+                "rss_mb": rss_mb(),
+                "worker_rss_mb": round(sum(worker_rss.values()), 1) if worker_rss else None,
+                **latency_stats([r[1] for r in window]),
+            }
+            snapshots.append(snapshot)
+            if on_snapshot:
+                on_snapshot(snapshot)
+            next_snapshot += interval
+
+    elapsed = time.perf_counter() - start
+    latencies = [r[1] for r in records]
+    errors = sum(1 for r in records if not r[2])
+    rss_end = rss_mb()
+    return {
+        "target": target.name,
+        "mode": "closed" if rate is None else "open",
+        "concurrency": concurrency,
+        "rate": rate,
+        "elapsed_s": round(elapsed, 2),
+        "requests": len(records),
+        "errors": errors,
+        "error_rate": round(errors / len(records), 4) if records else 0.0,
+        "throughput": round(len(records) / elapsed, 2) if elapsed else 0.0,
+        **latency_stats(latencies),
+        "rss_start_mb": rss_start,
+        "rss_end_mb": rss_end,
+        "rss_growth_mb": round(rss_end - rss_start, 1) if rss_start and rss_end else None,
+        "timeline": snapshots,
+    }
+
+
+def print_snapshot(snapshot: Dict):
+    print(f"[{snapshot['elapsed_s']:>7.1f}s] 吞吐 {snapshot['throughput']:>8.1f}/s  "
+          f"p50 {snapshot['p50_ms']}ms  p95 {snapshot['p95_ms']}ms  p99 {snapshot['p99_ms']}ms  "
+          f"错误 {snapshot['errors']}  在途 {snapshot['in_flight']}  内存 {snapshot['rss_mb']:.1f}MB"
+          + (f"  子进程内存 {snapshot['worker_rss_mb']}MB" if snapshot['worker_rss_mb'] else ""))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="模拟并发用户对食谱生成服务进行压测")
+    parser.add_argument("--target", default="inprocess", choices=["inprocess", "process", "http"])
+    parser.add_argument("--engine", default="enhanced", choices=available_engines())
+    parser.add_argument("--concurrency", type=int, default=4, help="并发数（线程/进程数）")
+    parser.add_argument("--rate", type=float, help="每秒到达的请求数，不指定时为闭环模式")
+    parser.add_argument("--duration", type=float, default=10.0, help="压测时长（秒）")
+    parser.add_argument("--requests", type=int, help="最多发送的请求数")
+    parser.add_argument("--interval", type=float, default=1.0, help="汇报间隔（秒）")
+    parser.add_argument("--url", help="HTTP接口地址，不指定时自动启动本地 api.py")
+    parser.add_argument("--port", type=int, default=8765, help="自动启动本地接口时使用的端口")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="将完整报告保存为JSON文件")
+    args = parser.parse_args()
+
+    server = None
+    if args.target == "inprocess":
+        target = InProcessTarget(args.engine, args.concurrency)
+    elif args.target == "process":
+        target = ProcessPoolTarget(args.engine, args.concurrency)
+    else:
+        url = args.url
+        if not url:
+            server = start_local_server(args.port)
+            url = f"http://127.0.0.1:{args.port}"
+        target = HttpTarget(args.engine, args.concurrency, url)
+
+    try:
+        report = run_load(target, concurrency=args.concurrency, rate=args.rate, duration=args.duration,
+                          max_requests=args.requests, interval=args.interval, seed=args.seed,
+                          on_snapshot=print_snapshot)
+    finally:
+        target.close()
+        if server:
+            server.terminate()
+            server.wait()
+
+    summary = {k: v for k, v in report.items() if k != "timeline"}
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
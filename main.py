@@ -3,6 +3,8 @@ import pandas as pd
 import random
 from typing import Dict, List
 
+from metabolism import user_metabolics
+
 # ---------- 数据层 ----------
 # 加载中药食同源数据库 (示例)
 medicinal_foods = {
@@ -21,38 +23,43 @@ seasonal_ingredients = {
     "冬季": ["羊肉", "黑豆", "核桃"]
 }
 
+# 侧边栏/接口可选的疾病与菜系
+disease_options = ["高血压", "糖尿病", "高血脂", "痛风", "无"]
+cuisine_options = ["粤菜", "川菜", "湘菜", "鲁菜", "苏菜", "浙菜", "闽菜", "徽菜"]
+
+# 同时患有多种疾病时，按此优先级调整食材
+disease_priority = ["糖尿病", "高血压", "高血脂", "痛风"]
+
+def select_medicinals(user_data: Dict) -> List[str]:
+    """根据主次体质选择药食同源药材"""
+    return medicinal_foods.get(user_data["main_type"], []) + medicinal_foods.get(user_data["sub_type"], [])
+
 # ---------- 核心算法 ----------
 class DietGenerator:
-    def __init__(self, user_data: Dict):
+    def __init__(self, user_data: Dict, rng: random.Random = None):
         self.user_data = user_data
-        self.bmi = user_data["weight"] / (user_data["height"]/100)**2
-        self.calorie_needs = self._calculate_calorie()
+        self.rng = rng or random
+        self.bmi, self.calorie_needs = user_metabolics(user_data, strategy="flat")
         
     def _calculate_calorie(self) -> float:
-        """根据Harris-Benedict公式计算基础代谢"""
-        if self.user_data["gender"] == "男":
-            bmr = 88.362 + 13.397*self.user_data["weight"] + 4.799*self.user_data["height"] - 5.677*self.user_data["age"]
-        else:
-            bmr = 447.593 + 9.247*self.user_data["weight"] + 3.098*self.user_data["height"] - 4.330*self.user_data["age"]
-        
-        # 根据活动量调整
-        activity_level = {"轻体力":1.2, "中等体力":1.55, "重体力":1.9}
-        return round(bmr * activity_level[self.user_data["activity"]] * 0.85, 0)  # 制造热量缺口
+        """根据Harris-Benedict公式计算基础代谢（统一制造热量缺口）"""
+        return user_metabolics(self.user_data, strategy="flat")[1]
 
     def _select_medicinal(self) -> List[str]:
         """选择药食同源药材"""
-        main_type = self.user_data["main_type"]
-        return medicinal_foods.get(main_type, []) + medicinal_foods.get(self.user_data["sub_type"], [])
+        return select_medicinals(self.user_data)
 
-    def generate_weekly_menu(self) -> Dict:
-        """生成一周菜谱"""
+    def generate_weekly_menu(self, days: int = 7, progress=None) -> Dict:
+        """生成一周菜谱，progress(已完成天数, 总天数) 用于汇报进度"""
         menu = {}
-        for day in range(1, 8):
+        for day in range(1, days + 1):
             menu[f"Day{day}"] = {
                 "早餐": self._generate_meal("早餐"),
                 "午餐": self._generate_meal("午餐"),
                 "晚餐": self._generate_meal("晚餐")
             }
+            if progress:
+                progress(day, days)
         return menu
 
     def _generate_meal(self, meal_type: str) -> Dict:
@@ -60,23 +67,23 @@ class DietGenerator:
         # 根据餐点类型调整主食和热量
         if meal_type == "早餐":
             main_food_options = ["全麦面包", "燕麦粥", "杂粮粥", "小米粥", "馒头"]
-            calorie = f"{random.randint(350, 450)}kcal"
+            calorie = f"{self.rng.randint(350, 450)}kcal"
         elif meal_type == "午餐":
             main_food_options = ["杂粮饭", "糙米饭", "全麦面条", "米粉", "荞麦面"]
-            calorie = f"{random.randint(500, 600)}kcal"
+            calorie = f"{self.rng.randint(500, 600)}kcal"
         else:  # 晚餐
             main_food_options = ["小米饭", "糙米饭", "薏米饭", "藜麦饭", "紫米饭"]
-            calorie = f"{random.randint(400, 500)}kcal"
+            calorie = f"{self.rng.randint(400, 500)}kcal"
             
         # 随机选择主食
-        main_food = random.choice(main_food_options)
+        main_food = self.rng.choice(main_food_options)
         
         # 随机选择1-3种药材
         medicinals = self._select_medicinal()
-        selected_medicinals = random.sample(medicinals, min(random.randint(1, 3), len(medicinals)))
+        selected_medicinals = self.rng.sample(medicinals, min(self.rng.randint(1, 3), len(medicinals)))
         
         # 随机生成2-3道菜品
-        dish_count = random.randint(2, 3)
+        dish_count = self.rng.randint(2, 3)
         dishes = []
         
         for i in range(dish_count):
@@ -84,21 +91,21 @@ class DietGenerator:
                 # 第一道菜总是蔬菜
                 vegetable = self._select_vegetable()
                 cooking_methods = ["清炒", "凉拌", "爆炒", "蒸", "炖"]
-                dishes.append(f"{random.choice(cooking_methods)}{vegetable}（{vegetable} {random.randint(150, 250)}g，调料适量）")
+                dishes.append(f"{self.rng.choice(cooking_methods)}{vegetable}（{vegetable} {self.rng.randint(150, 250)}g，调料适量）")
             elif i == 1:
                 # 第二道菜总是蛋白质
                 protein = self._select_protein()
                 cooking_methods = ["煮", "蒸", "炖", "烤", "煎"]
-                dishes.append(f"{random.choice(cooking_methods)}{protein}（{protein} {random.randint(80, 150)}g，药材：{', '.join(selected_medicinals[:1])} 适量）")
+                dishes.append(f"{self.rng.choice(cooking_methods)}{protein}（{protein} {self.rng.randint(80, 150)}g，药材：{', '.join(selected_medicinals[:1])} 适量）")
             else:
                 # 可能的第三道菜
-                seasonal = random.choice(seasonal_ingredients.get(self.user_data["season"], ["时令蔬菜"]))
+                seasonal = self.rng.choice(seasonal_ingredients.get(self.user_data["season"], ["时令蔬菜"]))
                 cooking_methods = ["炒", "炖", "煮", "凉拌"]
-                dishes.append(f"{random.choice(cooking_methods)}{seasonal}（{seasonal} {random.randint(100, 200)}g）")
+                dishes.append(f"{self.rng.choice(cooking_methods)}{seasonal}（{seasonal} {self.rng.randint(100, 200)}g）")
         
         # 随机调整营养素比例
-        carbs = random.randint(40, 55)
-        protein = random.randint(20, 30)
+        carbs = self.rng.randint(40, 55)
+        protein = self.rng.randint(20, 30)
         fat = 100 - carbs - protein
         
         return {
@@ -129,7 +136,7 @@ class DietGenerator:
         combined_list = veg_list + [veg for veg in seasonal_vegs if veg not in veg_list]
         
         # 随机选择一种蔬菜
-        return random.choice(combined_list)
+        return self.rng.choice(combined_list)
 
     def _select_protein(self):
         """根据基础疾病选择蛋白质"""
@@ -161,7 +168,7 @@ class DietGenerator:
                 combined.extend(category)
         
         # 随机选择一种蛋白质
-        return random.choice(combined)
+        return self.rng.choice(combined)
 
 # ---------- 使用示例 ----------
 if __name__ == "__main__":
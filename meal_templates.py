@@ -0,0 +1,314 @@
+import argparse
+import itertools
+import json
+import os
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from enhanced_diet_generator import (EnhancedDietGenerator, effective_disease, load_diet_helper_data,
+                                     meal_types)
+from food_catalog import Dish, FoodCatalog, Meal
+from main import medicinal_foods, seasonal_ingredients, cuisine_options, disease_priority
+
+TEMPLATE_LIBRARY_PATH = 'food_data/processed/meal_templates.npz'
+
+# 生成器只按优先级最高的一种疾病调整食材，因此疾病组合可归并为以下几档
+disease_buckets = disease_priority + ["无"]
+
+# 构建模板时使用的代谢参数（模板只依赖体质、季节、菜系和疾病）
+_template_body = {"gender": "女", "age": 35, "height": 165, "weight": 60, "activity": "中等体力"}
+
+# 每道菜一行的列：类别、食物、克数、单位、烹饪方法、口味、药材（食物为食物表下标，其余为字符串表下标）
+dish_columns = ["slot", "food", "grams", "unit", "method", "flavor", "medicinal"]
+
+
+# ---------- 分桶 ----------
+def bucket_key(profile: Dict) -> str:
+    """用户所属的模板分桶键"""
+    return "|".join([
+        profile["main_type"],
+        profile["sub_type"],
+        profile["season"],
+        profile["preferred_cuisine"],
+        effective_disease(profile["diseases"]),
+    ])
+
+
+def iter_buckets(main_types=None, sub_types=None, seasons=None, cuisines=None, diseases=None):
+    """枚举分桶，返回 (main_type, sub_type, season, cuisine, disease) 元组"""
+    return itertools.product(
+        main_types or list(medicinal_foods.keys()),
+        sub_types or list(medicinal_foods.keys()),
+        seasons or list(seasonal_ingredients.keys()),
+        cuisines or cuisine_options,
+        diseases or disease_buckets,
+    )
+
+
+# ---------- 营养计算 ----------
+def meal_nutrition(meal: Meal, foods: FoodCatalog) -> Dict:
+    """根据菜品克数和食物数据库计算一餐的热量与三大营养素（克）"""
+    totals = {"能量": 0.0, "蛋白质": 0.0, "脂肪": 0.0, "碳水化合物": 0.0}
+    for dish in (meal.staple,) + meal.dishes:
+        food = foods[dish.food_id]
+        scale = dish.grams / 100
+        totals["能量"] += food.energy * scale
+        totals["蛋白质"] += food.protein * scale
+        totals["脂肪"] += food.fat * scale
+        totals["碳水化合物"] += food.carbs * scale
+    return totals
+
+
+def macro_ratios(protein: float, fat: float, carbs: float):
+    """按供能比例计算 (碳水, 蛋白, 脂肪) 百分比"""
+    energy = [carbs * 4, protein * 4, fat * 9]
+    total = sum(energy)
+    if not total:
+        return 0, 0, 0
+    carbs_pct = round(energy[0] / total * 100)
+    protein_pct = round(energy[1] / total * 100)
+    return carbs_pct, protein_pct, 100 - carbs_pct - protein_pct
+
+
+# ---------- 离线构建 ----------
+def build_bucket_templates(catalog: Dict, bucket, per_meal: int, rng: random.Random,
+                           foods: FoodCatalog = None) -> Dict[str, List[Meal]]:
+    """为一个分桶生成每种餐次的模板（按主食+菜品去重），模板为 foods 上的结构化餐次"""
+    main_type, sub_type, season, cuisine, disease = bucket
+    profile = dict(_template_body, main_type=main_type, sub_type=sub_type, season=season,
+                   preferred_cuisine=cuisine, diseases=[disease])
+    generator = EnhancedDietGenerator(profile, diet_helper_data=catalog, rng=rng, foods=foods)
+
+    templates = {}
+    for meal_type in meal_types:
+        seen = set()
+        meal_templates = []
+        # 允许一定次数的重复尝试，避免候选过少时死循环
+        for _ in range(per_meal * 3):
+            meal = generator._compose_meal(meal_type, "Day1")
+            signature = (meal.staple, meal.dishes)
+            if signature in seen:
+                continue
+            seen.add(signature)
+            meal_templates.append(meal)
+            if len(meal_templates) >= per_meal:
+                break
+        templates[meal_type] = meal_templates
+    return templates
+
+
+class TemplateColumns:
+    """把模板按列编码（写法与计划归档相同）
+
+    食物按 (名称, 类型) 编入食物表，不依赖 FoodCatalog 中运行时分配的id；
+    模板按分桶、餐次的顺序连续追加，每个分桶占 len(meal_types) 个分组。
+    """
+
+    def __init__(self, foods: FoodCatalog):
+        self.foods = foods
+        self.food_keys = []
+        self.strings = [""]
+        self._food_codes = {}  # FoodCatalog 中的id -> 食物表下标
+        self._string_codes = {"": 0}
+        self.dishes = []
+        self.template_start = [0]
+        self.template_kcal = []
+        self.template_ratios = []
+        self.template_staple = []
+        self.template_protein = []
+        self.group_start = [0]
+
+    def _food_code(self, food_id: int) -> int:
+        code = self._food_codes.get(food_id)
+        if code is None:
+            food = self.foods[food_id]
+            code = self._food_codes[food_id] = len(self.food_keys)
+            self.food_keys.append([food.name, food.type])
+        return code
+
+    def _string_code(self, value: str) -> int:
+        code = self._string_codes.get(value)
+        if code is None:
+            code = self._string_codes[value] = len(self.strings)
+            self.strings.append(value)
+        return code
+
+    def add_group(self, meals: List[Meal]):
+        """追加一个分组（某个分桶的某种餐次）的全部模板"""
+        for meal in meals:
+            for dish in (meal.staple,) + meal.dishes:
+                self.dishes.append([
+                    self._string_code(dish.slot), self._food_code(dish.food_id), dish.grams,
+                    self._string_code(dish.unit), self._string_code(dish.method),
+                    self._string_code(dish.flavor), self._string_code(dish.medicinal),
+                ])
+            self.template_start.append(len(self.dishes))
+
+            totals = meal_nutrition(meal, self.foods)
+            self.template_kcal.append(round(totals["能量"]))
+            self.template_ratios.append(macro_ratios(totals["蛋白质"], totals["脂肪"], totals["碳水化合物"]))
+            proteins = [dish.food_id for dish in meal.dishes if dish.slot == "蛋白质"]
+            self.template_staple.append(self._food_code(meal.staple.food_id))
+            self.template_protein.append(self._food_code(proteins[0]) if proteins else -1)
+        self.group_start.append(len(self.template_kcal))
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "dishes": np.asarray(self.dishes, dtype=np.int32).reshape(-1, len(dish_columns)),
+            "template_start": np.asarray(self.template_start, dtype=np.int32),
+            "template_kcal": np.asarray(self.template_kcal, dtype=np.int32),
+            "template_ratios": np.asarray(self.template_ratios, dtype=np.int16).reshape(-1, 3),
+            "template_staple": np.asarray(self.template_staple, dtype=np.int32),
+            "template_protein": np.asarray(self.template_protein, dtype=np.int32),
+            "group_start": np.asarray(self.group_start, dtype=np.int32),
+        }
+
+
+def build_template_library(catalog: Dict, per_meal: int = 12, seed: int = 0, buckets=None,
+                           progress=None) -> "TemplateLibrary":
+    """离线生成模板库，buckets 为空时覆盖全部分桶"""
+    rng = random.Random(seed)
+    foods = FoodCatalog.from_helper_data(catalog)
+    buckets = list(buckets if buckets is not None else iter_buckets())
+    columns = TemplateColumns(foods)
+    for i, bucket in enumerate(buckets):
+        templates = build_bucket_templates(catalog, bucket, per_meal, rng, foods)
+        for meal_type in meal_types:
+            columns.add_group(templates[meal_type])
+        if progress:
+            progress(i + 1, len(buckets))
+    header = {"per_meal": per_meal, "seed": seed, "buckets": ["|".join(bucket) for bucket in buckets],
+              "foods": columns.food_keys, "strings": columns.strings}
+    return TemplateLibrary(header, columns.arrays())
+
+
+def save_template_library(library: "TemplateLibrary", path: str = TEMPLATE_LIBRARY_PATH):
+    """保存为压缩的 .npz 文件，表头（分桶、食物表、字符串表）以JSON字符串存在 header 列中"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    header = np.array(json.dumps(library.header, ensure_ascii=False, separators=(',', ':')))
+    np.savez_compressed(path, header=header, **library.arrays)
+
+
+def load_template_library(path: str = TEMPLATE_LIBRARY_PATH) -> Optional["TemplateLibrary"]:
+    try:
+        with np.load(path) as data:
+            arrays = {name: data[name] for name in data.files}
+        header = json.loads(str(arrays.pop("header")))
+        return TemplateLibrary(header, arrays)
+    except Exception as e:
+        print(f"加载模板库时出错: {str(e)}")
+        return None
+
+
+# ---------- 在线组装 ----------
+class TemplateLibrary:
+    """按分桶组织的餐次模板，组装一周计划时只做抽样
+
+    模板按列存放（见 TemplateColumns）。食物表在每个 FoodCatalog 上只解析一次（bind），
+    每个分组的模板在第一次抽到时还原为 Meal 并缓存，之后组装计划不再查找食物。
+    """
+
+    def __init__(self, header: Dict, arrays: Dict[str, np.ndarray]):
+        self.header = header
+        self.arrays = arrays
+        self.buckets = header["buckets"]
+        self._bucket_index = {key: i for i, key in enumerate(self.buckets)}
+        self._group_start = arrays["group_start"].tolist()
+        self._staples = arrays["template_staple"].tolist()
+        self._proteins = arrays["template_protein"].tolist()
+        # id(FoodCatalog) -> (FoodCatalog, 食物表对应的食物id, {分组: 该分组的 Meal 元组})
+        self._bindings = {}
+
+    def __contains__(self, profile: Dict) -> bool:
+        return bucket_key(profile) in self._bucket_index
+
+    def bind(self, foods: FoodCatalog) -> Tuple[FoodCatalog, List[int], Dict]:
+        """把食物表解析为 foods 中的食物id，结果按 FoodCatalog 缓存"""
+        binding = self._bindings.get(id(foods))
+        if binding is None:
+            # 保留对 FoodCatalog 的引用，避免对象回收后id被复用
+            food_ids = [foods.find(name, food_type).id for name, food_type in self.header["foods"]]
+            binding = self._bindings[id(foods)] = (foods, food_ids, {})
+        return binding
+
+    def group_meals(self, foods: FoodCatalog, group: int) -> Tuple[Meal, ...]:
+        """一个分组的全部模板（Meal 的克数和热量为构建模板时的值）"""
+        _, food_ids, cache = self.bind(foods)
+        meals = cache.get(group)
+        if meals is None:
+            # 并发请求可能重复还原同一分组，结果相同，不需要加锁
+            meals = cache[group] = tuple(self._make_meal(template, meal_types[group % len(meal_types)], food_ids)
+                                         for template in range(self._group_start[group],
+                                                               self._group_start[group + 1]))
+        return meals
+
+    def _make_meal(self, template: int, meal_type: str, food_ids: List[int]) -> Meal:
+        start, end = self.arrays["template_start"][template:template + 2].tolist()
+        strings = self.header["strings"]
+        staple, *dishes = [
+            Dish(strings[slot], food_ids[food], grams, strings[unit], strings[method], strings[flavor],
+                 strings[medicinal])
+            for slot, food, grams, unit, method, flavor, medicinal in self.arrays["dishes"][start:end].tolist()
+        ]
+        return Meal(meal_type, staple, tuple(dishes), int(self.arrays["template_kcal"][template]),
+                    tuple(self.arrays["template_ratios"][template].tolist()))
+
+    def assemble_plan(self, profile: Dict, foods: FoodCatalog, days: int = 7, rng: random.Random = None,
+                      max_attempts: int = 10, progress=None) -> Dict:
+        """从模板中抽样组装结构化计划 {DayN: {餐次: Meal}}，可再交给 PortionSolver 求解克数"""
+        plan = {}
+        for day_key, meal_type, group, template in self._sample(profile, days, rng, max_attempts, progress):
+            meals = self.group_meals(foods, group)
+            plan.setdefault(day_key, {})[meal_type] = meals[template - self._group_start[group]]
+        return plan
+
+    def _sample(self, profile: Dict, days: int, rng: random.Random, max_attempts: int, progress):
+        """按天抽样模板：一周内主食不重复，同一天内蛋白质不重复"""
+        rng = rng or random
+        first_group = self._bucket_index[bucket_key(profile)] * len(meal_types)
+        used_staples = set()
+        for day in range(1, days + 1):
+            used_proteins = set()
+            for offset, meal_type in enumerate(meal_types):
+                group = first_group + offset
+                start, end = self._group_start[group], self._group_start[group + 1]
+                template = None
+                for _ in range(max_attempts):
+                    template = rng.randrange(start, end)
+                    if self._staples[template] not in used_staples and self._proteins[template] not in used_proteins:
+                        break
+                # 尝试多次仍无法避免重复时，接受最后一次抽到的模板
+                used_staples.add(self._staples[template])
+                used_proteins.add(self._proteins[template])
+                yield f"Day{day}", meal_type, group, template
+            if progress:
+                progress(day, days)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="预先生成餐次模板库")
+    parser.add_argument("--per-meal", type=int, default=12, help="每个分桶每种餐次的模板数量")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--main-type", nargs="*", help="只构建指定的主要体质")
+    parser.add_argument("--season", nargs="*", help="只构建指定的季节")
+    parser.add_argument("--output", default=TEMPLATE_LIBRARY_PATH)
+    args = parser.parse_args()
+
+    catalog = load_diet_helper_data()
+    if not catalog:
+        raise SystemExit("无法加载食物数据库，请确保已经运行 process_food_data.py")
+
+    start = time.perf_counter()
+    buckets = list(iter_buckets(main_types=args.main_type, seasons=args.season))
+
+    def report(done, total):
+        if done % 200 == 0 or done == total:
+            print(f"已完成 {done}/{total} 个分桶")
+
+    library = build_template_library(catalog, per_meal=args.per_meal, seed=args.seed,
+                                     buckets=buckets, progress=report)
+    save_template_library(library, args.output)
+    print(f"已将模板库保存到 {args.output}，耗时 {time.perf_counter() - start:.1f} 秒")
@@ -0,0 +1,111 @@
+import random
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List
+
+from main import seasonal_ingredients
+from plan_export import export_menus, generate_cohort
+
+
+def profile_key(profile: Dict):
+    """将用户信息转换为可哈希的键（列表按排序后的元组处理）"""
+    items = []
+    for key, value in sorted(profile.items()):
+        if isinstance(value, (list, tuple, set)):
+            value = tuple(sorted(value))
+        items.append((key, value))
+    return tuple(items)
+
+
+def adjacent_profiles(profile: Dict) -> List[Dict]:
+    """用户最可能接着尝试的相邻参数组合（目前为其他季节）"""
+    return [dict(profile, season=season) for season in seasonal_ingredients if season != profile["season"]]
+
+
+class MenuJob:
+    """一次后台生成任务，记录进度并持有结果"""
+
+    def __init__(self, total_days: int):
+        self.total_days = total_days
+        self.done_days = 0
+        self.future = None
+
+    def report(self, done: int, total: int):
+        self.done_days = done
+        self.total_days = total
+
+    @property
+    def fraction(self) -> float:
+        return self.done_days / self.total_days if self.total_days else 1.0
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def result(self, timeout=None) -> Dict:
+        return self.future.result(timeout)
+
+
+class MenuService:
+    """在后台线程中生成菜谱，并缓存按输入区分的任务
+
+    前台请求和预取请求使用不同的线程池，预取不会挤占用户真正点击的生成任务。
+    引擎由调用方在主线程中创建后传入，工作线程只调用引擎本身。
+    """
+
+    def __init__(self, max_workers: int = 2, prefetch_workers: int = 1, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="menu")
+        self._prefetch_executor = ThreadPoolExecutor(max_workers=prefetch_workers,
+                                                     thread_name_prefix="menu-prefetch")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, engine, profile: Dict, seed: int, days: int = 7) -> MenuJob:
+        """提交生成任务，相同输入的任务（包括预取的）直接复用"""
+        return self._submit(self._executor, engine, profile, seed, days)
+
+    def prefetch(self, engine, profile: Dict, seed: int, days: int = 7) -> List[MenuJob]:
+        """为相邻参数组合预先生成菜谱
+
+        使用与当前菜谱相同的种子，调用方在用户只修改参数时应保持种子不变，预取的结果才能被命中。
+        """
+        return [self._submit(self._prefetch_executor, engine, adjacent, seed, days)
+                for adjacent in adjacent_profiles(profile)]
+
+    def _submit(self, executor, engine, profile, seed, days) -> MenuJob:
+        key = (engine.name, days, seed, profile_key(profile))
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and not (job.done() and job.future.exception()):
+                self._jobs.move_to_end(key)
+                return job
+
+            job = MenuJob(days)
+            job.future = executor.submit(self._run, job, engine, dict(profile), seed, days)
+            self._jobs[key] = job
+            # 淘汰最久未使用的任务
+            while len(self._jobs) > self.max_entries:
+                self._jobs.popitem(last=False)
+            return job
+
+    def _run(self, job: MenuJob, engine, profile: Dict, seed: int, days: int) -> Dict:
+        return engine.generate(profile, days=days, rng=random.Random(seed), progress=job.report)
+
+    def export(self, engine, profiles: Iterable[Dict], fmt: str, path: str, seed: int = None,
+               days: int = 7, total: int = None) -> MenuJob:
+        """在后台逐个用户生成并导出到文件，进度按已导出用户数汇报（total 为空时只记录已完成数）"""
+        job = MenuJob(total or 0)
+
+        def report(done, _):
+            job.report(done, total or done)
+
+        def run():
+            return export_menus(generate_cohort(engine, profiles, days=days, seed=seed), fmt, path, progress=report)
+
+        job.future = self._executor.submit(run)
+        return job
+
+    def shutdown(self):
+        self._prefetch_executor.shutdown(wait=False, cancel_futures=True)
+        self._executor.shutdown(wait=False)
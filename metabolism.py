@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+# ---------- 代谢参数 ----------
+# 活动量系数
+activity_levels = {"轻体力": 1.2, "中等体力": 1.55, "重体力": 1.9}
+
+# BMI分段热量调整：(BMI下限, 调整系数)，按从高到低匹配
+bmi_bands = [
+    (28, 0.8),    # 肥胖
+    (24, 0.85),   # 超重
+]
+underweight_bmi = 18.5
+underweight_adjustment = 1.1  # 偏瘦
+
+# 基础版统一使用的热量缺口系数
+flat_adjustment = 0.85
+
+
+# ---------- 向量化计算 ----------
+def calculate_bmi(weight, height):
+    """计算BMI，支持标量、数组或Series（身高单位为cm）"""
+    weight = np.asarray(weight, dtype=float)
+    height = np.asarray(height, dtype=float)
+    return weight / (height / 100) ** 2
+
+
+def calculate_bmr(gender, weight, height, age):
+    """根据Harris-Benedict公式计算基础代谢"""
+    male = np.asarray(gender) == "男"
+    weight = np.asarray(weight, dtype=float)
+    height = np.asarray(height, dtype=float)
+    age = np.asarray(age, dtype=float)
+    male_bmr = 88.362 + 13.397 * weight + 4.799 * height - 5.677 * age
+    female_bmr = 447.593 + 9.247 * weight + 3.098 * height - 4.330 * age
+    return np.where(male, male_bmr, female_bmr)
+
+
+def activity_factor(activity):
+    """将活动量映射为系数，未知活动量会抛出KeyError"""
+    activity = np.asarray(activity)
+    # 先对取值去重，只对少量唯一值查表
+    levels, inverse = np.unique(activity, return_inverse=True)
+    factors = np.array([activity_levels[level] for level in levels.tolist()], dtype=float)
+    return factors[inverse].reshape(activity.shape)
+
+
+def bmi_adjustment(bmi, strategy: str = "banded"):
+    """根据BMI计算热量调整系数
+
+    strategy="banded" 为增强版的分段调整，strategy="flat" 为基础版的统一热量缺口。
+    """
+    bmi = np.asarray(bmi, dtype=float)
+    if strategy == "flat":
+        return np.full(bmi.shape, flat_adjustment)
+    if strategy != "banded":
+        raise ValueError(f"未知的BMI调整方式: {strategy}")
+
+    conditions = [bmi > lower for lower, _ in bmi_bands] + [bmi < underweight_bmi]
+    choices = [factor for _, factor in bmi_bands] + [underweight_adjustment]
+    return np.select(conditions, choices, default=1.0)
+
+
+def calculate_calorie_needs(gender, weight, height, age, activity, strategy: str = "banded"):
+    """计算每日热量需求（千卡），输入全为标量时返回float，否则返回数组"""
+    bmi = calculate_bmi(weight, height)
+    bmr = calculate_bmr(gender, weight, height, age)
+    needs = np.round(bmr * activity_factor(activity) * bmi_adjustment(bmi, strategy), 0)
+    return float(needs) if needs.ndim == 0 else needs
+
+
+def compute_metabolic_frame(users: pd.DataFrame, strategy: str = "banded") -> pd.DataFrame:
+    """批量计算BMI、基础代谢和热量需求
+
+    users 需包含 gender/age/height/weight/activity 列，返回带有
+    bmi/bmr/activity_factor/bmi_adjustment/calorie_needs 列的新DataFrame。
+    """
+    result = users.copy()
+    bmi = calculate_bmi(users["weight"].to_numpy(), users["height"].to_numpy())
+    bmr = calculate_bmr(users["gender"].to_numpy(), users["weight"].to_numpy(),
+                        users["height"].to_numpy(), users["age"].to_numpy())
+    factor = activity_factor(users["activity"].to_numpy())
+    adjustment = bmi_adjustment(bmi, strategy)
+
+    result["bmi"] = bmi
+    result["bmr"] = bmr
+    result["activity_factor"] = factor
+    result["bmi_adjustment"] = adjustment
+    result["calorie_needs"] = np.round(bmr * factor * adjustment, 0)
+    return result
+
+
+def user_metabolics(user_data: dict, strategy: str = "banded"):
+    """计算单个用户的 (BMI, 每日热量需求)"""
+    bmi = float(calculate_bmi(user_data["weight"], user_data["height"]))
+    calorie_needs = calculate_calorie_needs(
+        user_data["gender"], user_data["weight"], user_data["height"],
+        user_data["age"], user_data["activity"], strategy
+    )
+    return bmi, calorie_needs
@@ -0,0 +1,323 @@
+import argparse
+import glob
+import json
+import os
+import random
+import time
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from enhanced_diet_generator import meal_types
+from food_catalog import FoodCatalog
+from main import medicinal_foods, seasonal_ingredients, disease_options, cuisine_options
+from metabolism import user_metabolics
+
+PLAN_ARCHIVE_PATH = 'food_data/processed/plan_archive'
+
+# 每道菜一行的列及其类型；user 为该行用户在本块用户表中的下标
+row_columns = {
+    "user": np.int32,
+    "day": np.int16,
+    "meal": np.int8,
+    "slot": np.int8,
+    "food": np.int32,
+    "grams": np.int16,
+    "method": np.int16,
+    "kcal": np.float32,
+}
+
+# 每个用户一行的列；diseases 为按 disease_options 顺序编码的位掩码
+user_columns = {
+    "user_id": np.int64,
+    "main_type": np.int8,
+    "sub_type": np.int8,
+    "season": np.int8,
+    "cuisine": np.int8,
+    "diseases": np.uint8,
+    "calorie_needs": np.float32,
+}
+
+# 固定的字典，可增长的字典（食物、烹饪方法、菜品类别）保存在 dictionary.json 中
+fixed_dictionaries = {
+    "meal": meal_types,
+    "main_type": list(medicinal_foods.keys()),
+    "sub_type": list(medicinal_foods.keys()),
+    "season": list(seasonal_ingredients.keys()),
+    "cuisine": cuisine_options,
+}
+
+
+def disease_bits(diseases: Iterable[str]) -> int:
+    bits = 0
+    for disease in diseases:
+        if disease in disease_options:
+            bits |= 1 << disease_options.index(disease)
+    return bits
+
+
+class PlanArchiveWriter:
+    """把结构化计划按列追加写入归档目录
+
+    每个块是一个压缩的 .npz 文件（每道菜一行，外加该块涉及的用户表），
+    食物、烹饪方法等字符串统一编码为整数，对照表写在 dictionary.json 中。
+    食物按 (名称, 类型) 编码，不依赖 FoodCatalog 中运行时分配的id，不同进程写入的块可以合并查询。
+    已存在的归档会在原有块之后继续追加。
+    """
+
+    def __init__(self, path: str, foods: FoodCatalog, chunk_rows: int = 500_000):
+        self.path = path
+        self.foods = foods
+        self.chunk_rows = chunk_rows
+        os.makedirs(path, exist_ok=True)
+
+        dictionary = _load_dictionary(path)
+        self.food_keys = [tuple(key) for key in dictionary.get("foods", [])]
+        self.methods = dictionary.get("methods", [""])
+        self.slots = dictionary.get("slots", [])
+        self._food_codes = {key: code for code, key in enumerate(self.food_keys)}
+        self._method_codes = {method: code for code, method in enumerate(self.methods)}
+        self._slot_codes = {slot: code for code, slot in enumerate(self.slots)}
+        self._catalog_codes = {}  # FoodCatalog 中的id -> 归档中的食物编码
+
+        self.chunk_index = len(_chunk_paths(path))
+        self._reset_buffers()
+
+    def _reset_buffers(self):
+        self._rows = {name: [] for name in row_columns}
+        self._users = {name: [] for name in user_columns}
+
+    def _food_code(self, food_id: int) -> int:
+        code = self._catalog_codes.get(food_id)
+        if code is None:
+            food = self.foods[food_id]
+            key = (food.name, food.type)
+            code = self._food_codes.get(key)
+            if code is None:
+                code = self._food_codes[key] = len(self.food_keys)
+                self.food_keys.append(key)
+            self._catalog_codes[food_id] = code
+        return code
+
+    @staticmethod
+    def _code(value: str, codes: Dict[str, int], values: List[str]) -> int:
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(values)
+            values.append(value)
+        return code
+
+    def append(self, user_id: int, profile: Dict, plan: Dict):
+        """追加一个用户的计划 {DayN: {餐次: Meal}}"""
+        users = self._users
+        local_user = len(users["user_id"])
+        users["user_id"].append(user_id)
+        for column in ("main_type", "sub_type", "season"):
+            users[column].append(fixed_dictionaries[column].index(profile[column]))
+        users["cuisine"].append(fixed_dictionaries["cuisine"].index(profile["preferred_cuisine"]))
+        users["diseases"].append(disease_bits(profile["diseases"]))
+        users["calorie_needs"].append(user_metabolics(profile)[1])
+
+        rows = self._rows
+        for day_key, meals in plan.items():
+            day = int(day_key[3:])
+            for meal_type, meal in meals.items():
+                meal_code = meal_types.index(meal_type)
+                for dish in (meal.staple,) + meal.dishes:
+                    energy = self.foods[dish.food_id].energy
+                    rows["user"].append(local_user)
+                    rows["day"].append(day)
+                    rows["meal"].append(meal_code)
+                    rows["slot"].append(self._code(dish.slot, self._slot_codes, self.slots))
+                    rows["food"].append(self._food_code(dish.food_id))
+                    rows["grams"].append(dish.grams)
+                    rows["method"].append(self._code(dish.method, self._method_codes, self.methods))
+                    rows["kcal"].append(energy * dish.grams / 100 if energy else np.nan)
+
+        if len(rows["user"]) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        """把缓冲区写成一个新块，并更新字典"""
+        if not self._rows["user"]:
+            return
+        arrays = {f"row_{name}": np.asarray(values, dtype=row_columns[name])
+                  for name, values in self._rows.items()}
+        arrays.update({f"user_{name}": np.asarray(values, dtype=user_columns[name])
+                       for name, values in self._users.items()})
+        chunk_path = os.path.join(self.path, f"chunk-{self.chunk_index:05d}.npz")
+        np.savez_compressed(chunk_path, **arrays)
+        self.chunk_index += 1
+        self._reset_buffers()
+        self._save_dictionary()
+
+    def _save_dictionary(self):
+        dictionary = dict(fixed_dictionaries, foods=self.food_keys, methods=self.methods, slots=self.slots,
+                          diseases=disease_options)
+        temp_path = os.path.join(self.path, "dictionary.json.tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(dictionary, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(temp_path, os.path.join(self.path, "dictionary.json"))
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PlanArchiveReader:
+    """按列扫描归档
+
+    每个块只读取查询用到的列（.npz 中的各列按需解压），用户条件先在块内的小用户表上求值，
+    再通过每行的用户下标映射为行掩码。
+    """
+
+    def __init__(self, path: str = PLAN_ARCHIVE_PATH):
+        self.path = path
+        self.dictionary = _load_dictionary(path)
+        if not self.dictionary:
+            raise ValueError(f"{path} 不是有效的计划归档")
+        self.chunk_paths = _chunk_paths(path)
+        self.food_names = [name for name, _ in self.dictionary["foods"]]
+
+    def iter_chunks(self, row_fields: Iterable[str] = (), user_fields: Iterable[str] = ()) -> Iterator[Dict]:
+        """逐块返回所需的列 {"row_xxx": 数组, "user_xxx": 数组}"""
+        keys = [f"row_{name}" for name in row_fields] + [f"user_{name}" for name in user_fields]
+        for chunk_path in self.chunk_paths:
+            with np.load(chunk_path) as chunk:
+                yield {key: chunk[key] for key in keys}
+
+    def user_count(self) -> int:
+        return sum(len(chunk["user_user_id"]) for chunk in self.iter_chunks(user_fields=("user_id",)))
+
+    def food_codes(self, name: str, exact: bool = False) -> np.ndarray:
+        """名称匹配（默认为包含关系）的食物编码"""
+        return np.array([code for code, food_name in enumerate(self.food_names)
+                         if (food_name == name if exact else name in food_name)], dtype=np.int32)
+
+    def _code(self, dictionary: str, value: str) -> int:
+        try:
+            return self.dictionary[dictionary].index(value)
+        except ValueError:
+            raise ValueError(f"未知的取值: {value}")
+
+    def _user_mask(self, chunk: Dict, main_type=None, sub_type=None, season=None, cuisine=None,
+                   disease=None) -> np.ndarray:
+        mask = np.ones(len(chunk["user_main_type"]), dtype=bool)
+        for column, value in (("main_type", main_type), ("sub_type", sub_type), ("season", season),
+                              ("cuisine", cuisine)):
+            if value is not None:
+                mask &= chunk[f"user_{column}"] == self._code(column, value)
+        if disease is not None:
+            mask &= (chunk["user_diseases"] & (1 << self._code("diseases", disease))) != 0
+        return mask
+
+    def serving_frequency(self, food: str, main_type: Optional[str] = None, season: Optional[str] = None,
+                          slot: Optional[str] = None, exact: bool = False, **user_filters) -> Dict:
+        """某种食材在一类用户的计划中出现的频率
+
+        例：serving_frequency("苦瓜", main_type="胃热火郁", season="夏季")
+        返回出现次数、出现过的用户数，以及这类用户的总用户数和总餐数。
+        """
+        codes = self.food_codes(food, exact=exact)
+        slot_code = self._code("slots", slot) if slot is not None else None
+        staple_code = self.dictionary["slots"].index("主食") if "主食" in self.dictionary["slots"] else -1
+        servings = users_served = segment_users = segment_meals = 0
+        grams = 0
+
+        for chunk in self.iter_chunks(row_fields=("user", "food", "slot", "grams"),
+                                      user_fields=("main_type", "sub_type", "season", "cuisine", "diseases")):
+            user_mask = self._user_mask(chunk, main_type=main_type, season=season, **user_filters)
+            if not user_mask.any():
+                continue
+            in_segment = user_mask[chunk["row_user"]]
+            # 每餐恰好有一道主食，用主食行数统计餐数
+            segment_meals += int(np.count_nonzero(in_segment & (chunk["row_slot"] == staple_code)))
+            segment_users += int(np.count_nonzero(user_mask))
+
+            hit = in_segment & np.isin(chunk["row_food"], codes)
+            if slot_code is not None:
+                hit &= chunk["row_slot"] == slot_code
+            servings += int(np.count_nonzero(hit))
+            grams += int(chunk["row_grams"][hit].sum(dtype=np.int64))
+            users_served += len(np.unique(chunk["row_user"][hit]))
+
+        return {
+            "food": food,
+            "servings": servings,
+            "grams": grams,
+            "users_served": users_served,
+            "segment_users": segment_users,
+            "segment_meals": segment_meals,
+            "servings_per_meal": round(servings / segment_meals, 4) if segment_meals else 0.0,
+            "user_share": round(users_served / segment_users, 4) if segment_users else 0.0,
+        }
+
+    def top_foods(self, k: int = 10, slot: Optional[str] = None, **user_filters) -> List[Dict]:
+        """一类用户最常吃的k种食材（按出现次数）"""
+        counts = np.zeros(len(self.food_names), dtype=np.int64)
+        slot_code = self._code("slots", slot) if slot is not None else None
+        for chunk in self.iter_chunks(row_fields=("user", "food", "slot"),
+                                      user_fields=("main_type", "sub_type", "season", "cuisine", "diseases")):
+            hit = self._user_mask(chunk, **user_filters)[chunk["row_user"]]
+            if slot_code is not None:
+                hit &= chunk["row_slot"] == slot_code
+            counts += np.bincount(chunk["row_food"][hit], minlength=len(counts))
+        top = np.argsort(-counts, kind="stable")[:k]
+        return [{"food": self.food_names[code], "servings": int(counts[code])} for code in top.tolist()
+                if counts[code]]
+
+
+def _chunk_paths(path: str) -> List[str]:
+    return sorted(glob.glob(os.path.join(path, "chunk-*.npz")))
+
+
+def _load_dictionary(path: str) -> Dict:
+    try:
+        with open(os.path.join(path, "dictionary.json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="计划归档：批量生成写入，或按条件统计")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="为随机用户生成计划并追加到归档")
+    build_parser.add_argument("--users", type=int, default=1000)
+    build_parser.add_argument("--days", type=int, default=7)
+    build_parser.add_argument("--seed", type=int, default=0)
+    build_parser.add_argument("--path", default=PLAN_ARCHIVE_PATH)
+
+    query_parser = subparsers.add_parser("query", help="统计某种食材出现的频率")
+    query_parser.add_argument("food")
+    query_parser.add_argument("--main-type")
+    query_parser.add_argument("--season")
+    query_parser.add_argument("--slot")
+    query_parser.add_argument("--path", default=PLAN_ARCHIVE_PATH)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "build":
+        from engines import create_engine
+        from loadtest import random_profile
+
+        engine = create_engine("enhanced")
+        rng = random.Random(args.seed)
+        first_id = PlanArchiveReader(args.path).user_count() if _chunk_paths(args.path) else 0
+        with PlanArchiveWriter(args.path, engine.foods) as writer:
+            for i in range(args.users):
+                profile = random_profile(rng)
+                plan = engine.generate_plan(profile, days=args.days, rng=random.Random(rng.randrange(2 ** 31)))
+                writer.append(first_id + i, profile, plan)
+        print(f"已追加 {args.users} 个用户的计划到 {args.path}，耗时 {time.perf_counter() - start:.1f} 秒")
+    else:
+        reader = PlanArchiveReader(args.path)
+        result = reader.serving_frequency(args.food, main_type=args.main_type, season=args.season, slot=args.slot)
+        result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        print(json.dumps(result, ensure_ascii=False, indent=2))
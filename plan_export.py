@@ -0,0 +1,196 @@
+import csv
+import html
+import io
+import os
+import random
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# 导出的一条记录：(用户名称, 用户信息, 菜单, 身体指标摘要)
+ExportItem = Tuple[str, Dict, Dict, Optional[Dict]]
+
+export_formats = ["csv", "xlsx", "html"]
+
+export_mime_types = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "html": "text/html",
+}
+
+# 表格导出每道菜一行
+table_header = ["用户", "主要体质", "次要体质", "季节", "基础疾病", "每日热量需求(kcal)",
+                "天", "餐次", "主食", "菜品", "餐次热量", "营养素比例"]
+
+
+def menu_rows(name: str, profile: Dict, menu: Dict, summary: Optional[Dict] = None) -> Iterator[List]:
+    """把一个用户的菜单展开为表格行"""
+    calorie_needs = round(summary["calorie_needs"]) if summary else ""
+    user_columns = [name, profile["main_type"], profile["sub_type"], profile["season"],
+                    "、".join(profile["diseases"]), calorie_needs]
+    for day, meals in menu.items():
+        for meal_type, meal in meals.items():
+            for dish in meal["菜品"] or [""]:
+                yield user_columns + [day, meal_type, meal["主食"], dish, meal["热量"], meal["营养素"]]
+
+
+class CsvExporter:
+    """逐个用户写入CSV，写完的行不在内存中保留"""
+    binary = False
+
+    def __init__(self, stream):
+        self.writer = csv.writer(stream)
+        self.writer.writerow(table_header)
+
+    def write(self, name: str, profile: Dict, menu: Dict, summary: Optional[Dict] = None):
+        self.writer.writerows(menu_rows(name, profile, menu, summary))
+
+    def close(self):
+        pass
+
+
+class XlsxExporter:
+    """逐行写入Excel（openpyxl 的只写模式，行数据直接写入临时文件）"""
+    binary = True
+
+    def __init__(self, stream):
+        try:
+            from openpyxl import Workbook
+        except ImportError:
+            raise ImportError("导出Excel需要安装 openpyxl：pip install openpyxl")
+        self.stream = stream
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet("膳食计划")
+        self.sheet.append(table_header)
+
+    def write(self, name: str, profile: Dict, menu: Dict, summary: Optional[Dict] = None):
+        for row in menu_rows(name, profile, menu, summary):
+            self.sheet.append(row)
+
+    def close(self):
+        self.workbook.save(self.stream)
+
+
+_html_head = """<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: "PingFang SC", "Microsoft YaHei", sans-serif; margin: 2em; color: #222; }}
+h1 {{ font-size: 1.6em; }}
+section.user {{ page-break-after: always; }}
+section.user:last-of-type {{ page-break-after: auto; }}
+table {{ border-collapse: collapse; width: 100%; margin-bottom: 1.5em; font-size: 0.9em; }}
+th, td {{ border: 1px solid #999; padding: 4px 8px; vertical-align: top; text-align: left; }}
+th {{ background: #f0f0f0; }}
+ul {{ margin: 0; padding-left: 1.2em; }}
+.profile {{ color: #555; }}
+@media print {{ body {{ margin: 0; }} }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+"""
+
+
+class HtmlExporter:
+    """可直接打印的自包含HTML（样式内嵌，每位用户一页）"""
+    binary = False
+
+    def __init__(self, stream, title: str = "中医食疗膳食计划"):
+        self.stream = stream
+        stream.write(_html_head.format(title=html.escape(title)))
+
+    def write(self, name: str, profile: Dict, menu: Dict, summary: Optional[Dict] = None):
+        e = html.escape
+        parts = [f'<section class="user">\n<h2>{e(name)}</h2>\n',
+                 f'<p class="profile">体质：{e(profile["main_type"])}（兼{e(profile["sub_type"])}）'
+                 f' · 季节：{e(profile["season"])} · 基础疾病：{e("、".join(profile["diseases"]))}']
+        if summary:
+            parts.append(f' · BMI：{summary["bmi"]:.1f} · 每日热量需求：{summary["calorie_needs"]:.0f} 千卡')
+            if summary.get("medicinals"):
+                parts.append(f'<br>推荐药食同源食材：{e(", ".join(summary["medicinals"]))}')
+        parts.append('</p>\n')
+        for day, meals in menu.items():
+            parts.append(f'<h3>{e(day)}</h3>\n<table>\n<tr><th>餐次</th><th>主食</th><th>菜品</th>'
+                         f'<th>热量</th><th>营养素比例</th></tr>\n')
+            for meal_type, meal in meals.items():
+                dishes = "".join(f"<li>{e(dish)}</li>" for dish in meal["菜品"])
+                parts.append(f'<tr><td>{e(meal_type)}</td><td>{e(meal["主食"])}</td><td><ul>{dishes}</ul></td>'
+                             f'<td>{e(meal["热量"])}</td><td>{e(meal["营养素"])}</td></tr>\n')
+            parts.append('</table>\n')
+        parts.append('</section>\n')
+        self.stream.write("".join(parts))
+
+    def close(self):
+        self.stream.write("</body>\n</html>\n")
+
+
+_exporters = {"csv": CsvExporter, "xlsx": XlsxExporter, "html": HtmlExporter}
+
+
+def export_menus(items: Iterable[ExportItem], fmt: str, path: str, progress=None) -> int:
+    """把菜单流逐个写入文件，返回导出的用户数
+
+    items 可以是生成器（如 generate_cohort），每次只持有一个用户的菜单；
+    progress(已导出用户数, None) 用于汇报进度。
+    """
+    exporter_cls = _exporters.get(fmt)
+    if exporter_cls is None:
+        raise ValueError(f"不支持的导出格式: {fmt}")
+    if exporter_cls.binary:
+        stream = open(path, 'wb')
+    else:
+        # CSV 带 BOM，Excel 直接打开时不会乱码
+        stream = open(path, 'w', encoding='utf-8-sig' if fmt == "csv" else 'utf-8', newline='')
+    count = 0
+    try:
+        with stream:
+            exporter = exporter_cls(stream)
+            for name, profile, menu, summary in items:
+                exporter.write(name, profile, menu, summary)
+                count += 1
+                if progress:
+                    progress(count, None)
+            exporter.close()
+    except BaseException:
+        # 不留下写了一半的文件
+        os.remove(path)
+        raise
+    return count
+
+
+def export_bytes(items: Iterable[ExportItem], fmt: str) -> bytes:
+    """导出到内存（用于界面的下载按钮，只适合少量用户）"""
+    exporter_cls = _exporters.get(fmt)
+    if exporter_cls is None:
+        raise ValueError(f"不支持的导出格式: {fmt}")
+    if exporter_cls.binary:
+        buffer = io.BytesIO()
+        exporter = exporter_cls(buffer)
+    else:
+        buffer = io.StringIO(newline='')
+        exporter = exporter_cls(buffer)
+    for name, profile, menu, summary in items:
+        exporter.write(name, profile, menu, summary)
+    exporter.close()
+    if exporter_cls.binary:
+        return buffer.getvalue()
+    return buffer.getvalue().encode('utf-8-sig' if fmt == "csv" else 'utf-8')
+
+
+def available_export_formats() -> List[str]:
+    """当前环境可用的导出格式（Excel 需要 openpyxl）"""
+    try:
+        import openpyxl  # noqa: F401
+        return list(export_formats)
+    except ImportError:
+        return [fmt for fmt in export_formats if fmt != "xlsx"]
+
+
+def generate_cohort(engine, profiles: Iterable[Dict], days: int = 7, seed: Optional[int] = None) -> Iterator[ExportItem]:
+    """逐个用户生成菜单，不预先生成整批"""
+    rng = random.Random(seed)
+    for i, profile in enumerate(profiles):
+        name = profile.get("name") or f"用户{i + 1}"
+        menu = engine.generate(profile, days=days, rng=random.Random(rng.randrange(2 ** 31)))
+        yield name, profile, menu, engine.summarize(profile)
@@ -0,0 +1,444 @@
+import argparse
+import json
+import random
+import re
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from enhanced_diet_generator import (disease_nutrient_limits, dessert_options, meal_types, seasonal_fruit_names,
+                                     seasonal_vegetable_names, soup_options, staple_grams)
+from food_catalog import FoodCatalog, is_dish_food
+from main import seasonal_ingredients, disease_options
+from metabolism import user_metabolics
+from plan_archive import PlanArchiveReader, disease_bits, fixed_dictionaries
+from portion_solver import macro_targets
+from process_food_data import base_food_name
+
+# 评估时使用的菜品类别编码
+slots = ["主食", "蔬菜", "蛋白质", "时令蔬菜", "水果", "汤", "甜点"]
+_slot_codes = {slot: code for code, slot in enumerate(slots)}
+
+# 统计重复率的类别（时令蔬菜并入蔬菜）
+diversity_categories = ["主食", "蔬菜", "蛋白质", "水果"]
+_slot_category = np.array([0, 1, 2, 1, 3, -1, -1])
+
+# 需要检查疾病营养素限制和体质宜忌的类别
+_checked_slots = np.isin(np.arange(len(slots)), [_slot_codes[s] for s in ("蔬菜", "蛋白质", "时令蔬菜")])
+_constitution_slots = np.isin(np.arange(len(slots)), [_slot_codes[s] for s in ("蔬菜", "蛋白质", "时令蔬菜", "水果")])
+_produce_slots = np.isin(np.arange(len(slots)), [_slot_codes[s] for s in ("蔬菜", "时令蔬菜", "水果")])
+
+# 菜单文本中的烹饪方法前缀（较长的优先匹配）
+_cooking_methods = sorted({"清炒", "凉拌", "爆炒", "蒸", "炖", "煮", "烤", "煎", "炒"}, key=len, reverse=True)
+_grams_pattern = re.compile(r"(\d+)(g|ml)")
+_staple_pattern = re.compile(r"^(.*)（(\d+)(?:g|ml)）$")
+
+
+class DishTable(NamedTuple):
+    """一批计划的列存表示：每道菜一行，每个计划一行用户信息
+
+    food 为 FoodCatalog 中的id（-1 表示数据库中没有），name 为 names 中的下标，
+    用于统计重复（同名的不同记录算作同一种食材）。
+    """
+    plan: np.ndarray
+    day: np.ndarray
+    meal: np.ndarray
+    slot: np.ndarray
+    food: np.ndarray
+    name: np.ndarray
+    grams: np.ndarray
+    names: List[str]
+    calorie_needs: np.ndarray
+    main_type: np.ndarray
+    sub_type: np.ndarray
+    season: np.ndarray
+    diseases: np.ndarray
+
+
+class DishTableBuilder:
+    """把结构化计划或渲染后的菜单逐个追加为列存表"""
+
+    def __init__(self, foods: FoodCatalog):
+        self.foods = foods
+        self._rows = {name: [] for name in ("plan", "day", "meal", "slot", "food", "name", "grams")}
+        self._plans = {name: [] for name in ("calorie_needs", "main_type", "sub_type", "season", "diseases")}
+        self.names = []
+        self._name_codes = {}
+        self._lookup = {}
+        self._exact = {}
+        self._base = {}
+        # 只在数据库中的食物里查找，运行时补充的食物没有营养数据
+        searchable = foods.foods[:foods.index.size]
+        for food in searchable:
+            self._exact.setdefault(food.name, food.id)
+        # 去掉括号限定词后同名的记录，优先可作为菜品主料的（生鲜、非干制粉状）
+        for food in sorted(searchable, key=lambda food: not is_dish_food(food)):
+            self._base.setdefault(base_food_name(food.name), food.id)
+
+    def _name_code(self, name: str) -> int:
+        code = self._name_codes.get(name)
+        if code is None:
+            code = self._name_codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+    def _find_food(self, name: str) -> int:
+        """按名称查找食物：先按标准名称（含别名）精确匹配，再匹配去掉括号限定词后同名的记录
+
+        找不到时返回 -1，不按子串猜测（"鱼"、"米粉"这类泛称不会对应到鲱鱼、糙米粉等具体记录）。
+        """
+        food_id = self._lookup.get(name)
+        if food_id is None:
+            canonical = self.foods.canonical(name)
+            food_id = self._exact.get(canonical, self._base.get(canonical, -1))
+            self._lookup[name] = food_id
+        return food_id
+
+    def _add_profile(self, profile: Dict, calorie_needs: Optional[float]) -> int:
+        plans = self._plans
+        index = len(plans["calorie_needs"])
+        plans["calorie_needs"].append(calorie_needs if calorie_needs is not None else user_metabolics(profile)[1])
+        for column in ("main_type", "sub_type", "season"):
+            plans[column].append(fixed_dictionaries[column].index(profile[column]))
+        plans["diseases"].append(disease_bits(profile["diseases"]))
+        return index
+
+    def _add_row(self, plan, day, meal, slot, food, name, grams):
+        rows = self._rows
+        rows["plan"].append(plan)
+        rows["day"].append(day)
+        rows["meal"].append(meal)
+        rows["slot"].append(_slot_codes.get(slot, _slot_codes["汤"]))
+        rows["food"].append(food)
+        rows["name"].append(self._name_code(name))
+        rows["grams"].append(grams)
+
+    def add_plan(self, profile: Dict, plan: Dict, calorie_needs: Optional[float] = None):
+        """追加结构化计划 {DayN: {餐次: Meal}}，克数和食物都是精确的"""
+        index = self._add_profile(profile, calorie_needs)
+        foods = self.foods
+        for day_key, meals in plan.items():
+            day = int(day_key[3:])
+            for meal_type, meal in meals.items():
+                meal_code = meal_types.index(meal_type)
+                for dish in (meal.staple,) + meal.dishes:
+                    food = foods[dish.food_id]
+                    # 运行时补充的食物（汤、甜点、默认主食）没有营养数据
+                    food_id = dish.food_id if food.id < foods.index.size else -1
+                    self._add_row(index, day, meal_code, dish.slot, food_id, food.name, dish.grams)
+
+    def add_menu(self, profile: Dict, menu: Dict, calorie_needs: Optional[float] = None):
+        """追加渲染后的菜单（所有引擎的 generate 输出）
+
+        菜品名称和克数从文本中解析，类别按位置推断（第一道为蔬菜、第二道为蛋白质）；
+        主食不带克数时（基础版、旧版模板），按各餐主食的参考生重计算。
+        """
+        index = self._add_profile(profile, calorie_needs)
+        for day_key, meals in menu.items():
+            day = int(day_key[3:])
+            for meal_type, meal in meals.items():
+                meal_code = meal_types.index(meal_type)
+                staple, grams = parse_staple(meal["主食"], meal_type)
+                self._add_row(index, day, meal_code, "主食", self._find_food(staple), staple, grams)
+                for position, text in enumerate(meal["菜品"]):
+                    slot, name, grams = parse_dish(text, position)
+                    self._add_row(index, day, meal_code, slot, self._find_food(name), name, grams)
+
+    def build(self) -> DishTable:
+        rows, plans = self._rows, self._plans
+        return DishTable(
+            plan=np.asarray(rows["plan"], dtype=np.int32),
+            day=np.asarray(rows["day"], dtype=np.int16),
+            meal=np.asarray(rows["meal"], dtype=np.int8),
+            slot=np.asarray(rows["slot"], dtype=np.int8),
+            food=np.asarray(rows["food"], dtype=np.int32),
+            name=np.asarray(rows["name"], dtype=np.int32),
+            grams=np.asarray(rows["grams"], dtype=np.float32),
+            names=list(self.names),
+            calorie_needs=np.asarray(plans["calorie_needs"], dtype=np.float64),
+            main_type=np.asarray(plans["main_type"], dtype=np.int8),
+            sub_type=np.asarray(plans["sub_type"], dtype=np.int8),
+            season=np.asarray(plans["season"], dtype=np.int8),
+            diseases=np.asarray(plans["diseases"], dtype=np.uint8),
+        )
+
+
+def parse_staple(text: str, meal_type: str):
+    """从主食文本中解析 (名称, 克数)，如 "糙米饭（150g）"；不带克数时使用参考生重"""
+    match = _staple_pattern.match(text)
+    if match:
+        return match.group(1), float(match.group(2))
+    return text, float(staple_grams[meal_type])
+
+
+def parse_dish(text: str, position: int):
+    """从菜品文本中解析 (类别, 食材名称, 克数)
+
+    支持两种格式："清炒苦瓜（苦瓜 200g，调料适量）"（基础版）和 "清炒苦瓜（200g，鲜味）"、
+    "水果：苹果（120g）"、"蘑菇汤（250ml）"（增强版/模板版）。
+    """
+    match = _grams_pattern.findall(text)
+    grams = float(match[-1][0]) if match else 0.0
+
+    if text.startswith("水果："):
+        return "水果", text[3:text.rfind("（")], grams
+    inner = re.search(r"（([^（）]+) \d+g", text)
+    if inner:
+        name = inner.group(1)
+    else:
+        name = text[:text.rfind("（")] if "（" in text else text
+        name = next((name[len(m):] for m in _cooking_methods if name.startswith(m) and len(name) > len(m)), name)
+
+    if name in soup_options:
+        return "汤", name, grams
+    if name in dessert_options:
+        return "甜点", name, grams
+    return ("蔬菜", "蛋白质")[position] if position < 2 else "时令蔬菜", name, grams
+
+
+def table_from_archive(reader: PlanArchiveReader, foods: FoodCatalog) -> DishTable:
+    """把计划归档读取为 DishTable（每个用户一个计划），食物按 (名称, 类型) 对应到 FoodCatalog"""
+    ids = {}
+    for food in foods.foods[:foods.index.size]:
+        ids.setdefault((food.name, food.type), food.id)
+    food_map = np.array([ids.get(tuple(key), -1) for key in reader.dictionary["foods"]], dtype=np.int32)
+    names = sorted({name for name, _ in reader.dictionary["foods"]})
+    name_codes = {name: code for code, name in enumerate(names)}
+    name_map = np.array([name_codes[name] for name, _ in reader.dictionary["foods"]], dtype=np.int32)
+    slot_map = np.array([_slot_codes.get(slot, _slot_codes["汤"]) for slot in reader.dictionary["slots"]],
+                        dtype=np.int8)
+
+    parts = {key: [] for key in DishTable._fields if key != "names"}
+    offset = 0
+    for chunk in reader.iter_chunks(row_fields=("user", "day", "meal", "slot", "food", "grams"),
+                                    user_fields=("main_type", "sub_type", "season", "diseases",
+                                                 "calorie_needs")):
+        parts["plan"].append(chunk["row_user"] + offset)
+        parts["day"].append(chunk["row_day"])
+        parts["meal"].append(chunk["row_meal"])
+        parts["slot"].append(slot_map[chunk["row_slot"]])
+        parts["food"].append(food_map[chunk["row_food"]])
+        parts["name"].append(name_map[chunk["row_food"]])
+        parts["grams"].append(chunk["row_grams"].astype(np.float32))
+        for column in ("main_type", "sub_type", "season", "diseases", "calorie_needs"):
+            parts[column].append(chunk[f"user_{column}"])
+        offset += len(chunk["user_main_type"])
+    columns = {key: np.concatenate(values) for key, values in parts.items()}
+    columns["calorie_needs"] = columns["calorie_needs"].astype(np.float64)
+    return DishTable(names=names, **columns)
+
+
+# ---------- 评估 ----------
+class PlanEvaluator:
+    """对一批计划逐项打分，所有指标都按列批量计算
+
+    每个计划一行，指标包括：
+    - kcal_deviation: 每天实际热量与热量需求的平均相对偏差
+    - macro_error: 整体供能比例与目标比例的平均偏差（百分点）
+    - repeat_<类别>: 一周内该类别的重复率（1 - 不同食材数/出现次数）
+    - violations / violation_rate: 违反疾病营养素限制或体质不宜（评分为负）的菜品数及比例
+    - seasonal_adherence: 蔬菜和水果中当季食材的比例
+    - nutrient_coverage: 有营养数据的菜品比例（缺失的菜品不计入热量）
+    """
+
+    def __init__(self, foods: FoodCatalog):
+        self.foods = foods
+        self.size = foods.index.size
+
+        def column(nutrient):
+            try:
+                return np.append(foods.column(nutrient)[:self.size].astype(np.float64), np.nan)
+            except KeyError:
+                return np.full(self.size + 1, np.nan)
+        # 末尾多一行 NaN，food 为 -1 的菜品正好取到它
+        self._energy = column("能量")
+        self._macros = np.stack([column(n) for n in ("碳水化合物", "蛋白质", "脂肪")], axis=1)
+        self._limits = [(disease_options.index(disease), column(nutrient), high)
+                        for disease, limits in disease_nutrient_limits.items()
+                        for nutrient, (_, high) in limits.items()]
+
+        constitutions = fixed_dictionaries["main_type"]
+        if foods.has_tcm:
+            scores = [np.append(foods.constitution_scores(main, sub)[:self.size], 0.0)
+                      for main in constitutions for sub in constitutions]
+            self._scores = np.stack(scores)
+        else:
+            self._scores = None
+
+        self._target_table = np.array([macro_targets([disease_options[bit] for bit in range(len(disease_options))
+                                                      if bits >> bit & 1])
+                                       for bits in range(1 << len(disease_options))], dtype=np.float64)
+
+    def _season_matrix(self, names: List[str]) -> np.ndarray:
+        """(季节, 名称) 是否为当季食材"""
+        seasons = fixed_dictionaries["season"]
+        matrix = np.zeros((len(seasons), len(names)), dtype=bool)
+        for i, season in enumerate(seasons):
+            keywords = (seasonal_vegetable_names.get(season, []) + seasonal_fruit_names.get(season, [])
+                        + seasonal_ingredients.get(season, []))
+            matrix[i] = [any(keyword in name for keyword in keywords) for name in names]
+        return matrix
+
+    def evaluate(self, table: DishTable) -> pd.DataFrame:
+        plans = len(table.calorie_needs)
+        plan, slot = table.plan.astype(np.int64), table.slot.astype(np.int64)
+        food = np.where(table.food >= 0, table.food, self.size)
+
+        # 热量与供能比例
+        energy = self._energy[food]
+        known = ~np.isnan(energy)
+        kcal = np.where(known, energy, 0.0) * table.grams / 100
+        days = int(table.day.max()) if len(table.day) else 1
+        day_index = plan * days + (table.day.astype(np.int64) - 1)
+        daily = np.bincount(day_index, weights=kcal, minlength=plans * days).reshape(plans, days)
+        has_day = np.bincount(day_index, minlength=plans * days).reshape(plans, days) > 0
+        deviation = np.abs(daily / table.calorie_needs[:, None] - 1)
+        with np.errstate(invalid="ignore"):
+            kcal_deviation = np.where(has_day, deviation, 0).sum(axis=1) / has_day.sum(axis=1)
+
+        macro_kcal = np.nan_to_num(self._macros[food]) * (table.grams / 100)[:, None] * [4.0, 4.0, 9.0]
+        totals = np.stack([np.bincount(plan, weights=macro_kcal[:, k], minlength=plans) for k in range(3)], axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ratios = totals / totals.sum(axis=1, keepdims=True) * 100
+        macro_error = np.abs(ratios - self._target_table[table.diseases]).mean(axis=1)
+
+        # 多样性：每个 (计划, 类别) 的出现次数和不同食材数
+        category = _slot_category[slot]
+        counted = category >= 0
+        key = plan[counted] * len(diversity_categories) + category[counted]
+        servings = np.bincount(key, minlength=plans * len(diversity_categories))
+        pairs = np.sort(key * len(table.names) + table.name[counted])
+        distinct_pairs = pairs[np.r_[True, pairs[1:] != pairs[:-1]]] if len(pairs) else pairs
+        distinct = np.bincount(distinct_pairs // len(table.names), minlength=plans * len(diversity_categories))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            repeat = (1 - distinct / servings).reshape(plans, len(diversity_categories))
+
+        # 疾病营养素限制与体质宜忌
+        plan_diseases = table.diseases[plan]
+        violated = np.zeros(len(plan), dtype=bool)
+        checked = _checked_slots[slot]
+        for bit, values, high in self._limits:
+            violated |= checked & ((plan_diseases >> bit) & 1 == 1) & (values[food] >= high)
+        constitution_checked = _constitution_slots[slot] & (table.food >= 0)
+        if self._scores is not None:
+            combo = table.main_type.astype(np.int64) * len(fixed_dictionaries["main_type"]) + table.sub_type
+            violated |= constitution_checked & (self._scores[combo[plan], food] < 0)
+        checked_rows = np.bincount(plan, weights=checked | constitution_checked, minlength=plans)
+        violations = np.bincount(plan, weights=violated, minlength=plans)
+
+        # 时令
+        produce = _produce_slots[slot]
+        in_season = self._season_matrix(table.names)[table.season[plan], table.name] & produce
+        produce_rows = np.bincount(plan, weights=produce, minlength=plans)
+        seasonal = np.bincount(plan, weights=in_season, minlength=plans)
+
+        rows_per_plan = np.bincount(plan, minlength=plans)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result = pd.DataFrame({
+                "kcal_deviation": kcal_deviation,
+                "macro_error": macro_error,
+                **{f"repeat_{name}": repeat[:, i] for i, name in enumerate(diversity_categories)},
+                "violations": violations.astype(int),
+                "violation_rate": violations / checked_rows,
+                "seasonal_adherence": seasonal / produce_rows,
+                "nutrient_coverage": np.bincount(plan, weights=known, minlength=plans) / rows_per_plan,
+            })
+        return result
+
+
+def summarize(scores: pd.DataFrame) -> Dict:
+    """一批计划各项指标的平均值"""
+    summary = scores.mean(numeric_only=True).round(4).to_dict()
+    summary["plans"] = len(scores)
+    return summary
+
+
+def speed_quality_report(quality: Dict[str, Dict], timings: Dict[str, Dict]) -> pd.DataFrame:
+    """按引擎合并质量指标和性能数据（如 loadtest.py 的报告），每个引擎一行"""
+    rows = []
+    for engine in sorted(set(quality) | set(timings)):
+        timing = {key: value for key, value in timings.get(engine, {}).items() if not isinstance(value, (list, dict))}
+        rows.append({"engine": engine, **timing, **quality.get(engine, {})})
+    return pd.DataFrame(rows).set_index("engine")
+
+
+def benchmark_engines(engine_names: Iterable[str], plans: int = 200, days: int = 7, seed: int = 0,
+                      foods: FoodCatalog = None):
+    """用相同的随机用户分别调用各引擎，返回 (质量汇总, 生成耗时)
+
+    支持结构化计划的引擎（CAP_REPLAN）计时 generate_plan + render，并直接评估计划中的食物和克数；
+    其余引擎计时 generate，从渲染后的菜单解析菜品（主食不带克数时按参考生重计算）。
+    每个引擎先不计时地生成一次，排除懒加载和首次建索引的开销。
+    """
+    from engines import CAP_REPLAN, create_engine, load_catalog
+    from loadtest import latency_stats, random_profile
+
+    catalog = load_catalog()
+    foods = foods or FoodCatalog.from_helper_data(catalog)
+    rng = random.Random(seed)
+    profiles = [random_profile(rng) for _ in range(plans)]
+
+    quality, timings = {}, {}
+    for name in engine_names:
+        engine = create_engine(name, catalog)
+        structured = engine.has_capability(CAP_REPLAN)
+        # 结构化计划中的食物id属于引擎自己的 FoodCatalog
+        engine_foods = engine.foods if structured else foods
+        builder = DishTableBuilder(engine_foods)
+        # 预热：加载模板库、构建候选集缓存等
+        engine.generate(profiles[0], days=days, rng=random.Random(-1))
+        latencies = []
+        for i, profile in enumerate(profiles):
+            begin = time.perf_counter()
+            if structured:
+                plan = engine.generate_plan(profile, days=days, rng=random.Random(i))
+                engine.render(plan)
+            else:
+                menu = engine.generate(profile, days=days, rng=random.Random(i))
+            latencies.append(time.perf_counter() - begin)
+            calorie_needs = engine.summarize(profile)["calorie_needs"]
+            if structured:
+                builder.add_plan(profile, plan, calorie_needs)
+            else:
+                builder.add_menu(profile, menu, calorie_needs)
+
+        quality[name] = summarize(PlanEvaluator(engine_foods).evaluate(builder.build()))
+        timings[name] = {"throughput": round(plans / sum(latencies), 2), **latency_stats(latencies)}
+    return quality, timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="评估各引擎生成计划的质量，并与性能数据合并为报告")
+    parser.add_argument("--engines", nargs="*", help="要评估的引擎，默认全部")
+    parser.add_argument("--plans", type=int, default=200, help="每个引擎生成的计划数")
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--archive", help="改为评估计划归档目录（见 plan_archive.py）")
+    parser.add_argument("--timings", nargs="*", default=[],
+                        help="引擎=压测报告JSON（loadtest.py --output），替换内置计时")
+    parser.add_argument("--output", help="将报告保存为CSV文件")
+    args = parser.parse_args()
+
+    if args.archive:
+        from engines import load_catalog
+        foods = FoodCatalog.from_helper_data(load_catalog())
+        start = time.perf_counter()
+        table = table_from_archive(PlanArchiveReader(args.archive), foods)
+        scores = PlanEvaluator(foods).evaluate(table)
+        print(json.dumps(summarize(scores), ensure_ascii=False, indent=2))
+        print(f"评估 {len(scores)} 个计划耗时 {time.perf_counter() - start:.2f} 秒")
+    else:
+        from engines import available_engines
+        quality, timings = benchmark_engines(args.engines or available_engines(), plans=args.plans,
+                                             days=args.days, seed=args.seed)
+        for item in args.timings:
+            engine, path = item.split("=", 1)
+            with open(path, 'r', encoding='utf-8') as f:
+                timings[engine] = json.load(f)
+        report = speed_quality_report(quality, timings)
+        with pd.option_context("display.max_columns", None, "display.width", 200):
+            print(report)
+        if args.output:
+            report.to_csv(args.output)
@@ -0,0 +1,219 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from food_catalog import FoodCatalog, Meal
+
+# 各餐热量占全天的比例
+meal_energy_shares = {"早餐": 0.3, "午餐": 0.4, "晚餐": 0.3}
+
+# 默认供能比例（碳水, 蛋白, 脂肪）%，部分疾病单独调整
+default_macro_ratios = (50, 25, 25)
+disease_macro_ratios = {
+    "糖尿病": (45, 25, 30),
+    "高血脂": (55, 25, 20)
+}
+
+# 求解时各类菜品的克数上下限，不在表中的菜品（汤、甜点等）保持原克数
+portion_bounds = {
+    "主食": (30, 250),
+    "蔬菜": (100, 400),
+    "蛋白质": (50, 250),
+    "时令蔬菜": (80, 300),
+    "水果": (50, 250)
+}
+
+# 单道菜的热量上限（千卡）：能量密度高的食材（干制品、调味类蔬菜等）上限克数相应降低
+portion_energy_caps = {
+    "蔬菜": 100,
+    "时令蔬菜": 80,
+    "水果": 120
+}
+
+# 求解后某餐热量仍低于目标超过此比例时，由主食和蛋白质在上限内补足
+deficit_tolerance = 0.05
+deficit_slots = ("主食", "蛋白质")
+
+# 每克营养素的供能（千卡），顺序与供能比例一致：碳水、蛋白、脂肪
+_macro_nutrients = ("碳水化合物", "蛋白质", "脂肪")
+_macro_kcal = np.array([4.0, 4.0, 9.0])
+
+
+def macro_targets(diseases: Iterable[str]) -> Tuple[int, int, int]:
+    """按基础疾病选择供能比例"""
+    for disease, ratios in disease_macro_ratios.items():
+        if disease in diseases:
+            return ratios
+    return default_macro_ratios
+
+
+class PortionSolver:
+    """按热量需求和供能比例求解一天内各道菜的克数
+
+    每天的问题为有界最小二乘：
+        min ||W(Ax - b)||² + μ·Σ((x - x0)/x0)²,  low <= x <= high
+    A 的行为各餐热量和全天三大营养素供能（来自营养素矩阵），b 为对应目标，W 把各行换算为相对误差；
+    正则项让克数尽量接近生成时的随机克数，保留菜谱的多样性。
+    克数上限取类别上限和 portion_energy_caps 按能量密度换算的克数中较小的一个；
+    求解后仍明显低于目标的餐次，差额按剩余空间分给主食和蛋白质。
+    多天、多个用户的问题补齐到相同的菜品数后一次批量求解：每一轮对所有问题同时解正规方程，
+    越界的变量固定到边界后再解，通常两三轮即可收敛。
+    """
+
+    def __init__(self, foods: FoodCatalog, regularization: float = 0.05, max_passes: int = 8):
+        self.foods = foods
+        self.regularization = regularization
+        self.max_passes = max_passes
+
+    def _energy_columns(self, food_ids: np.ndarray) -> np.ndarray:
+        """每100克的 (能量, 碳水, 蛋白, 脂肪)，缺失视为0"""
+        values = np.zeros((len(food_ids), 4))
+        for j, nutrient in enumerate(("能量",) + _macro_nutrients):
+            try:
+                values[:, j] = self.foods.column(nutrient)[food_ids]
+            except KeyError:
+                pass
+        return np.nan_to_num(values)
+
+    # ---------- 对外接口 ----------
+    def solve_plan(self, plan: Dict, calorie_needs: float, ratios: Sequence[int] = default_macro_ratios,
+                   days: Optional[Iterable[str]] = None, frozen: Iterable[Tuple[str, str]] = ()) -> Dict:
+        """求解一个用户计划中各天的克数，返回新的计划
+
+        days 限定只求解其中几天；frozen 中的 (天, 餐次) 保持原克数，只作为已知热量参与计算。
+        """
+        return self.solve_plans([(plan, calorie_needs, ratios)], days=days, frozen=frozen)[0]
+
+    def solve_plans(self, items: List[Tuple[Dict, float, Sequence[int]]], days: Optional[Iterable[str]] = None,
+                    frozen: Iterable[Tuple[str, str]] = ()) -> List[Dict]:
+        """批量求解多个用户的计划 [(plan, calorie_needs, ratios), ...]"""
+        days = set(days) if days is not None else None
+        frozen = set(frozen)
+        problems = []  # (用户下标, 天, 餐次列表)
+        for index, (plan, _, _) in enumerate(items):
+            for day_key, meals in plan.items():
+                if days is None or day_key in days:
+                    problems.append((index, day_key, list(meals.items())))
+        if not problems:
+            return [dict(plan) for plan, _, _ in items]
+
+        targets = [(items[index][1], items[index][2]) for index, _, _ in problems]
+        solved = self._solve_days([meals for _, _, meals in problems], targets,
+                                  [{meal_type for day, meal_type in frozen if day == day_key}
+                                   for _, day_key, _ in problems])
+
+        results = [{day_key: dict(meals) for day_key, meals in plan.items()} for plan, _, _ in items]
+        for (index, day_key, _), meals in zip(problems, solved):
+            results[index][day_key] = meals
+        return results
+
+    # ---------- 批量求解 ----------
+    def _solve_days(self, days: List[List[Tuple[str, Meal]]], targets: List[Tuple[float, Sequence[int]]],
+                    frozen: List[set]) -> List[Dict[str, Meal]]:
+        batch = len(days)
+        width = max(sum(1 + len(meal.dishes) for _, meal in meals) for meals in days)
+
+        food_ids = np.zeros((batch, width), dtype=np.int64)
+        x0 = np.ones((batch, width))
+        low = np.ones((batch, width))
+        high = np.ones((batch, width))
+        meal_of = np.full((batch, width), -1)
+        energy_cap = np.full((batch, width), np.inf)
+        fillable = np.zeros((batch, width), dtype=bool)
+        b = np.zeros((batch, 6))
+        for i, (meals, (calorie_needs, ratios)) in enumerate(zip(days, targets)):
+            j = 0
+            for k, (meal_type, meal) in enumerate(meals):
+                for dish in (meal.staple,) + meal.dishes:
+                    food_ids[i, j] = dish.food_id
+                    x0[i, j] = max(dish.grams, 1) / 100
+                    bounds = portion_bounds.get(dish.slot)
+                    if bounds is None or meal_type in frozen[i]:
+                        low[i, j] = high[i, j] = x0[i, j]
+                    else:
+                        low[i, j], high[i, j] = bounds[0] / 100, bounds[1] / 100
+                        energy_cap[i, j] = portion_energy_caps.get(dish.slot, np.inf)
+                        fillable[i, j] = dish.slot in deficit_slots
+                    meal_of[i, j] = k
+                    j += 1
+                b[i, k] = calorie_needs * meal_energy_shares.get(meal_type, 1 / len(meals))
+            b[i, 3:] = calorie_needs * np.asarray(ratios, dtype=float) / 100
+
+        # 每100克的 (能量, 碳水, 蛋白, 脂肪)，补齐的位置为0
+        values = self._energy_columns(food_ids.ravel()).reshape(batch, width, 4)
+        values[meal_of < 0] = 0
+        meal_onehot = (meal_of[:, None, :] == np.arange(3)[None, :, None]).astype(float)
+        density = values[:, :, 0]
+        # 按能量密度收紧上限，下限不超过上限
+        high = np.minimum(high, np.where(density > 0, energy_cap / np.maximum(density, 1e-9), np.inf))
+        low = np.minimum(low, high)
+        A = np.empty((batch, 6, width))
+        A[:, :3, :] = meal_onehot * values[:, None, :, 0]
+        A[:, 3:, :] = (values[:, :, 1:] * _macro_kcal).transpose(0, 2, 1)
+
+        x = self._bounded_least_squares(A / b[:, :, None], np.ones((batch, 6)), x0, low, high)
+        x = self._fill_meal_deficits(x, density, meal_onehot, b[:, :3], high, fillable)
+
+        # 各餐的实际热量与三大营养素供能 (batch, 餐次, 4)
+        meal_totals = np.einsum("bkw,bwn->bkn", meal_onehot, values * x[:, :, None] * np.r_[1.0, _macro_kcal])
+        grams = np.rint(x * 100).astype(int).tolist()
+        meal_totals = meal_totals.tolist()
+        return [self._rebuild(meals, grams[i], meal_totals[i]) for i, meals in enumerate(days)]
+
+    def _bounded_least_squares(self, A, b, x0, low, high) -> np.ndarray:
+        """批量有界最小二乘（固定越界变量的有效集法）"""
+        batch, width = x0.shape
+        penalty = self.regularization / x0 ** 2
+        M = np.einsum("bki,bkj->bij", A, A)
+        M[:, np.arange(width), np.arange(width)] += penalty
+        rhs = np.einsum("bki,bk->bi", A, b) + penalty * x0
+
+        free = low < high
+        fixed_value = np.where(free, 0.0, low)
+        eye = np.eye(width, dtype=bool)
+        x = x0
+        for _ in range(self.max_passes):
+            both_free = free[:, :, None] & free[:, None, :]
+            system = np.where(both_free, M, np.where(eye, 1.0, 0.0))
+            reduced = np.where(free, rhs - np.einsum("bij,bj->bi", M, fixed_value), fixed_value)
+            x = np.linalg.solve(system, reduced[:, :, None])[:, :, 0]
+
+            below = free & (x < low)
+            above = free & (x > high)
+            if not (below.any() or above.any()):
+                break
+            fixed_value = np.where(below, low, np.where(above, high, fixed_value))
+            free &= ~(below | above)
+        return np.clip(x, low, high)
+
+    @staticmethod
+    def _fill_meal_deficits(x, density, meal_onehot, meal_targets, high, fillable) -> np.ndarray:
+        """热量明显不足的餐次，按剩余空间（上限与当前克数之差对应的热量）比例增加主食和蛋白质"""
+        meal_energy = np.einsum("bkw,bw->bk", meal_onehot, density * x)
+        deficit = meal_targets - meal_energy
+        deficit = np.where(deficit > deficit_tolerance * meal_targets, deficit, 0.0)
+        headroom = np.where(fillable, np.maximum(high - x, 0.0), 0.0)
+        meal_headroom = np.einsum("bkw,bw->bk", meal_onehot, headroom * density)
+        fraction = np.divide(deficit, meal_headroom, out=np.zeros_like(deficit), where=meal_headroom > 0)
+        fraction = np.minimum(fraction, 1.0)
+        return x + headroom * np.einsum("bkw,bk->bw", meal_onehot, fraction)
+
+    @staticmethod
+    def _rebuild(meals: List[Tuple[str, Meal]], grams: List[int], totals: List[List[float]]) -> Dict[str, Meal]:
+        """写回克数，并用求解后的实际热量和供能比例替换餐次的目标值"""
+        result = {}
+        j = 0
+        for (meal_type, meal), (kcal, carbs, protein, fat) in zip(meals, totals):
+            count = 1 + len(meal.dishes)
+            staple = meal.staple._replace(grams=grams[j])
+            dishes = tuple(dish._replace(grams=g) for dish, g in zip(meal.dishes, grams[j + 1:j + count]))
+            updated = meal._replace(staple=staple, dishes=dishes)
+            macro_total = carbs + protein + fat
+            if kcal > 0 and macro_total > 0:
+                carbs_pct = round(carbs / macro_total * 100)
+                protein_pct = round(protein / macro_total * 100)
+                updated = updated._replace(calorie=int(round(kcal)),
+                                           ratios=(carbs_pct, protein_pct, 100 - carbs_pct - protein_pct))
+            result[meal_type] = updated
+            j += count
+        return result
@@ -1,6 +1,10 @@
 import json
 import random
 import os
+import re
+import unicodedata
+
+import numpy as np
 
 def load_food_data():
     """加载食物数据库并进行预处理"""
@@ -40,6 +44,15 @@ def categorize_foods(foods):
     
     return categories
 
+def parse_nutrient_value(value_str):
+    """从"37千卡"、"1.5克"这类字符串中提取数值，缺失时返回None"""
+    # 去掉单位和其他字符，只保留数值
+    numeric_value = ''.join(c for c in str(value_str) if c.isdigit() or c == '.')
+    try:
+        return float(numeric_value) if numeric_value else None
+    except ValueError:
+        return None
+
 def analyze_nutrition_data(foods):
     """分析食物的营养数据"""
     nutrition_stats = {
@@ -55,16 +68,9 @@ def analyze_nutrition_data(foods):
         # 提取营养素数值
         for nutrient in nutrition_stats.keys():
             if nutrient in info:
-                value_str = info[nutrient]
-                # 提取数字
-                try:
-                    # 去掉单位和其他字符，只保留数值
-                    numeric_value = ''.join(c for c in value_str if c.isdigit() or c == '.')
-                    if numeric_value:
-                        value = float(numeric_value)
-                        nutrition_stats[nutrient].append((food['name'], value))
-                except:
-                    pass
+                value = parse_nutrient_value(info[nutrient])
+                if value is not None:
+                    nutrition_stats[nutrient].append((food['name'], value))
     
     # 对每种营养素进行排序
     for nutrient in nutrition_stats:
@@ -98,8 +104,338 @@ def create_cuisine_cooking_methods():
     
     return cuisine_methods, cuisine_flavors
 
+# ---------- 中医食性（四性五味、归经） ----------
+# 属性向量的各维度：食性（寒-1 ~ 热+1）、五味、归经
+tcm_natures = {"寒": -2, "凉": -1, "平": 0, "温": 1, "热": 2}
+tcm_flavors = ["酸", "苦", "甘", "辛", "咸"]
+tcm_meridians = ["肝", "心", "脾", "肺", "肾", "胃", "大肠", "膀胱"]
+tcm_property_names = ["食性"] + tcm_flavors + tcm_meridians
+
+# 常见食材的性味归经：关键词 -> (食性, 五味, 归经)，匹配规则见 tcm_keyword_for
+tcm_food_properties = {
+    "苦瓜": ("寒", "苦", "心脾肺"), "黄瓜": ("凉", "甘", "脾胃大肠"), "冬瓜": ("凉", "甘", "肺大肠膀胱"),
+    "丝瓜": ("凉", "甘", "肺肝胃"), "西葫芦": ("凉", "甘", "肺胃"), "菠菜": ("凉", "甘", "肝胃大肠"),
+    "莴笋": ("凉", "甘苦", "胃大肠"), "芹菜": ("凉", "甘苦", "肝胃"), "萝卜": ("凉", "辛甘", "肺胃"),
+    "胡萝卜": ("平", "甘", "肺脾肝"), "黄花菜": ("凉", "甘", "肝"), "金针菜": ("凉", "甘", "肝"),
+    "茄子": ("凉", "甘", "脾胃大肠"), "西红柿": ("凉", "甘酸", "肝胃"), "番茄": ("凉", "甘酸", "肝胃"),
+    "油菜": ("凉", "辛", "肝脾肺"), "南瓜": ("温", "甘", "脾胃"), "山药": ("平", "甘", "脾肺肾"),
+    "红薯": ("平", "甘", "脾肾"), "甘薯": ("平", "甘", "脾肾"), "土豆": ("平", "甘", "胃大肠"),
+    "马铃薯": ("平", "甘", "胃大肠"), "藕": ("寒", "甘", "心脾胃"), "韭菜": ("温", "辛", "肝胃肾"),
+    "姜": ("温", "辛", "肺脾胃"), "洋葱": ("温", "辛甘", "肺"), "香菜": ("温", "辛", "肺胃"),
+    "芫荽": ("温", "辛", "肺胃"), "葱": ("温", "辛", "肺胃"), "蒜": ("温", "辛", "脾胃肺"),
+    "白菜": ("平", "甘", "胃大肠"), "卷心菜": ("平", "甘", "脾胃"), "花椰菜": ("凉", "甘", "胃肝肺"),
+    "西兰花": ("凉", "甘", "胃肝肺"), "笋": ("寒", "甘", "胃肺"), "荠菜": ("凉", "甘", "肝胃"),
+    "豌豆": ("平", "甘", "脾胃"), "扁豆": ("平", "甘", "脾胃"), "绿豆": ("寒", "甘", "心胃"),
+    "红豆": ("平", "甘酸", "心"), "赤小豆": ("平", "甘酸", "心"), "黑豆": ("平", "甘", "脾肾"),
+    "黄豆": ("平", "甘", "脾大肠"), "大豆": ("平", "甘", "脾大肠"), "豆腐": ("凉", "甘", "脾胃大肠"),
+    "薏米": ("凉", "甘", "脾胃肺"), "薏苡仁": ("凉", "甘", "脾胃肺"), "小米": ("凉", "甘咸", "脾胃肾"),
+    "糙米": ("平", "甘", "脾胃"), "大米": ("平", "甘", "脾胃"), "粳米": ("平", "甘", "脾胃"),
+    "糯米": ("温", "甘", "脾胃肺"), "燕麦": ("平", "甘", "脾胃"), "荞麦": ("凉", "甘", "脾胃大肠"),
+    "玉米": ("平", "甘", "胃膀胱"), "高粱": ("温", "甘", "脾胃"), "小麦": ("凉", "甘", "心脾肾"),
+    "大麦": ("凉", "甘咸", "脾胃"), "黑米": ("平", "甘", "脾胃"), "紫米": ("平", "甘", "脾胃"),
+    "羊肉": ("热", "甘", "脾肾"), "牛肉": ("平", "甘", "脾胃"), "猪肉": ("平", "甘咸", "脾胃肾"),
+    "鸡": ("温", "甘", "脾胃"), "鸭": ("凉", "甘咸", "脾胃肺肾"), "鹅": ("平", "甘", "脾肺"),
+    "鸡蛋": ("平", "甘", "肺脾胃"), "鸭蛋": ("凉", "甘", "心肺"), "鲫鱼": ("平", "甘", "脾胃大肠"),
+    "鲤鱼": ("平", "甘", "脾肾"), "带鱼": ("温", "甘", "肝脾"), "鲈鱼": ("平", "甘", "肝脾肾"),
+    "虾": ("温", "甘", "肝肾"), "蟹": ("寒", "咸", "肝胃"), "海带": ("寒", "咸", "肝胃肾"),
+    "紫菜": ("寒", "甘咸", "肺"), "银耳": ("平", "甘", "肺胃肾"), "木耳": ("平", "甘", "胃大肠"),
+    "香菇": ("平", "甘", "胃肝"), "蘑菇": ("凉", "甘", "胃大肠"), "西瓜": ("寒", "甘", "心胃膀胱"),
+    "梨": ("凉", "甘酸", "肺胃"), "苹果": ("凉", "甘酸", "脾肺"), "香蕉": ("寒", "甘", "肺大肠"),
+    "桃": ("温", "甘酸", "肝大肠"), "荔枝": ("温", "甘酸", "心脾肝"), "龙眼": ("温", "甘", "心脾"),
+    "桂圆": ("温", "甘", "心脾"), "葡萄": ("平", "甘酸", "肺脾肾"), "柿": ("寒", "甘", "心肺大肠"),
+    "猕猴桃": ("寒", "甘酸", "胃膀胱"), "柚": ("寒", "甘酸", "肺胃"), "橙": ("凉", "甘酸", "肺胃"),
+    "橘": ("温", "甘酸", "肺胃"), "草莓": ("凉", "甘酸", "肺脾"), "樱桃": ("温", "甘", "脾肝"),
+    "杏": ("温", "甘酸", "肺"), "山楂": ("温", "酸甘", "脾胃肝"), "枣": ("温", "甘", "脾胃"),
+    "核桃": ("温", "甘", "肾肺大肠"), "栗": ("温", "甘", "脾胃肾"), "花生": ("平", "甘", "脾肺"),
+    "芝麻": ("平", "甘", "肝肾"), "百合": ("寒", "甘", "心肺"), "莲子": ("平", "甘", "脾肾心"),
+    "枸杞": ("平", "甘", "肝肾"), "茯苓": ("平", "甘", "心肺脾肾"), "陈皮": ("温", "苦辛", "肺脾"),
+    "荷叶": ("平", "苦", "肝脾胃"), "辣椒": ("热", "辛", "心脾"), "花椒": ("温", "辛", "脾胃肾"),
+    "胡椒": ("热", "辛", "胃大肠"), "肉桂": ("热", "辛甘", "肾脾心肝"), "茶": ("凉", "苦甘", "心肺胃"),
+    "酒": ("热", "辛苦", "心肝肺胃"), "醋": ("温", "酸苦", "肝胃"), "盐": ("寒", "咸", "胃肾大肠"),
+    "蜂蜜": ("平", "甘", "肺脾大肠"), "红糖": ("温", "甘", "肝脾"), "牛奶": ("平", "甘", "心肺胃"),
+    "酸奶": ("平", "甘酸", "心肺胃")
+}
+
+# 只用于这些类型的关键词（如"鸡"不用于豆类的"素鸡"、调味品的"鸡精"），这些关键词也可作为名称前缀匹配（如"鸡胸肉"）
+tcm_keyword_types = {
+    "鸡": ("禽肉",), "鸭": ("禽肉",), "鹅": ("禽肉",),
+    "羊肉": ("畜肉",), "牛肉": ("畜肉",), "猪肉": ("畜肉",),
+    "鲫鱼": ("河海鲜",), "鲤鱼": ("河海鲜",), "带鱼": ("河海鲜",), "鲈鱼": ("河海鲜",),
+    "虾": ("河海鲜",), "蟹": ("河海鲜",),
+    "梨": ("水果",), "桃": ("水果",), "杏": ("水果",), "枣": ("水果",), "柿": ("水果",),
+    "柚": ("水果",), "橙": ("水果",), "橘": ("水果",), "栗": ("水果", "坚果"),
+    "姜": ("蔬菜", "调味品类"), "蒜": ("蔬菜", "调味品类"), "葱": ("蔬菜", "调味品类"),
+    "茶": ("茶类",), "酒": ("酒类",), "盐": ("调味品类",), "醋": ("调味品类",)
+}
+
+# 名称中含有这些词时不使用该关键词（甜椒不是辣椒，杨桃不是桃，姜黄、洋姜不是姜）
+tcm_keyword_exclusions = {
+    "辣椒": ["甜"], "鸡": ["素"], "鸭": ["素"], "牛肉": ["素"], "猪肉": ["素"],
+    "姜": ["姜黄", "洋姜"], "桃": ["杨桃"], "梨": ["凤梨"], "杏": ["杏仁"], "茶": ["茶树菇"]
+}
+
+# 关键词后只跟这些表示加工形态的字时仍视为同一种食物（如"玉米面"、"豆腐干"、"桂圆肉"）
+tcm_form_suffixes = "面粉米粒糁片干皮丝花脑肉叶茎缨"
+
+# 没有匹配到关键词时按食物类别取默认性味
+tcm_type_defaults = {
+    "蔬菜": ("凉", "甘", "脾胃"), "水果": ("凉", "甘酸", "肺胃"), "谷类": ("平", "甘", "脾胃"),
+    "薯类": ("平", "甘", "脾胃"), "豆类": ("平", "甘", "脾"), "畜肉": ("温", "甘", "脾肾"),
+    "禽肉": ("温", "甘", "脾胃"), "蛋类": ("平", "甘", "心肾"), "河海鲜": ("平", "甘咸", "肝肾"),
+    "菌类": ("平", "甘", "胃"), "藻类": ("寒", "咸", "肾"), "坚果": ("温", "甘", "肾肺"),
+    "调味品类": ("温", "辛", "脾胃"), "油类": ("平", "甘", "脾"), "茶类": ("凉", "苦甘", "心肺"),
+    "酒类": ("热", "辛苦", "心肝"), "零食饮料": ("平", "甘", "脾")
+}
+
+# 体质对各属性维度的偏好权重，与 tcm_property_names 一一对应
+tcm_constitution_weights = {
+    #            食性   酸    苦    甘    辛    咸    肝    心    脾    肺    肾    胃   大肠  膀胱
+    "胃热火郁": [-1.0, 0.0, 0.6, 0.2, -0.6, 0.0, 0.0, 0.2, 0.0, 0.0, 0.0, 0.5, 0.3, 0.0],
+    "痰湿内盛": [0.0, 0.0, 0.3, 0.0, 0.2, -0.3, 0.0, 0.0, 0.6, 0.4, 0.0, 0.0, 0.0, 0.8],
+    "气郁血瘀": [0.3, 0.1, 0.0, 0.0, 0.6, 0.0, 0.7, 0.4, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0],
+    "脾虚不运": [0.5, 0.0, -0.4, 0.6, 0.0, 0.0, 0.0, 0.0, 0.8, 0.0, 0.0, 0.5, 0.0, 0.0],
+    "脾肾阳虚": [1.0, 0.0, 0.0, 0.3, 0.4, 0.2, 0.0, 0.0, 0.5, 0.0, 0.8, 0.0, 0.0, 0.0]
+}
+
+def tcm_property_vector(nature, flavors, meridians):
+    """将性味归经转换为属性向量"""
+    vector = [tcm_natures[nature] / 2]
+    vector += [1.0 if flavor in flavors else 0.0 for flavor in tcm_flavors]
+    vector += [1.0 if meridian in meridians else 0.0 for meridian in tcm_meridians]
+    return vector
+
+def base_food_name(name):
+    """去掉括号中的限定词，如"辣椒（红、尖）"变为"辣椒\""""
+    return re.sub(r"[（(][^）)]*[）)]", "", name or "").strip()
+
+def tcm_keyword_for(food, keywords=None):
+    """为食物选择性味关键词，没有合适的返回None
+
+    去掉括号限定词后的名称等于关键词，或以关键词结尾（如"水蜜桃"、"大白菜"）才匹配；
+    关键词后只跟加工形态的字（如"玉米面"）也匹配，限定了类型的关键词可以作为任意名称的前缀
+    （如"鸡胸肉"）。较长的关键词优先，类型不符或名称含排除词的关键词跳过。
+    """
+    name = food.get('name', '')
+    base = base_food_name(name)
+    food_type = food.get('type')
+    for keyword in keywords or sorted(tcm_food_properties, key=len, reverse=True):
+        types = tcm_keyword_types.get(keyword)
+        if types is not None and food_type not in types:
+            continue
+        if any(word in name for word in tcm_keyword_exclusions.get(keyword, ())):
+            continue
+        if base == keyword or base.endswith(keyword):
+            return keyword
+        if base.startswith(keyword):
+            rest = base[len(keyword):]
+            if types is not None or all(char in tcm_form_suffixes for char in rest):
+                return keyword
+    return None
+
+def annotate_tcm_properties(foods):
+    """为每种食物标注属性向量（写入 food['tcm']），返回匹配到关键词的食物数量"""
+    keywords = sorted(tcm_food_properties, key=len, reverse=True)
+    default_vector = tcm_property_vector("平", "甘", "脾")
+    type_vectors = {food_type: tcm_property_vector(*props) for food_type, props in tcm_type_defaults.items()}
+    keyword_vectors = {keyword: tcm_property_vector(*tcm_food_properties[keyword]) for keyword in keywords}
+
+    matched = 0
+    for food in foods:
+        keyword = tcm_keyword_for(food, keywords)
+        if keyword:
+            food['tcm'] = keyword_vectors[keyword]
+            matched += 1
+        else:
+            food['tcm'] = type_vectors.get(food.get('type'), default_vector)
+    return matched
+
+# 合并重复食物时比较的营养素，也用于给缺少类型的食物推断类型
+canonical_nutrients = ["能量", "蛋白质", "脂肪", "碳水化合物", "粗纤维", "钙", "钾", "钠", "铁", "维生素C"]
+# 按营养素判断重复时至少需要的非缺失数值个数，太少的记录容易偶然相同
+min_signature_values = 4
+# 只有一方把对方列为别名时，能量和三大营养素都在此相对误差内才合并
+alias_nutrient_tolerance = 0.1
+
+def normalize_food_name(name):
+    """统一全角/半角、大小写和空白，括号中的限定词（熟、冷冻等）保留"""
+    return re.sub(r"\s+", "", unicodedata.normalize("NFKC", name or "")).lower()
+
+def nickname_aliases(food):
+    """从 nickname 中取出简短的别名，跳过"无"和带逗号的描述（如"芹菜，未加工（U）"）"""
+    aliases = []
+    for alias in (food.get('nickname') or '').split('、'):
+        alias = alias.strip()
+        if alias and alias != '无' and '，' not in alias and ',' not in alias and '（U）' not in alias:
+            aliases.append(alias)
+    return aliases
+
+def parse_nutrients(food):
+    """解析一条记录的全部营养素数值，缺失的不包含在结果中"""
+    values = {}
+    for nutrient, value_str in food.get('info', {}).items():
+        value = parse_nutrient_value(value_str)
+        if value is not None:
+            values[nutrient] = value
+    return values
+
+def nutrient_signature(values):
+    """营养素数值（保留两位小数）组成的元组，非缺失数值太少时返回None"""
+    if len(values) < min_signature_values:
+        return None
+    return tuple(sorted((nutrient, round(value, 2)) for nutrient, value in values.items()))
+
+def _nutrients_close(a, b):
+    for nutrient in ("能量", "蛋白质", "脂肪", "碳水化合物"):
+        x, y = a.get(nutrient), b.get(nutrient)
+        if x is None or y is None or abs(x - y) > max(alias_nutrient_tolerance * max(x, y), 0.5):
+            return False
+    return True
+
+def _find(parent, i):
+    root = i
+    while parent[root] != root:
+        root = parent[root]
+    while parent[i] != root:
+        parent[i], i = root, parent[i]
+    return root
+
+def _union(parent, i, j):
+    i, j = _find(parent, i), _find(parent, j)
+    if i != j:
+        parent[max(i, j)] = min(i, j)
+
+def food_name_qualifiers(name):
+    """括号中的限定词集合，如"花椰菜（冷冻、熟）" -> {"冷冻", "熟"}"""
+    return frozenset(q.strip() for group in re.findall(r"[（(]([^）)]*)[）)]", unicodedata.normalize("NFKC", name or ""))
+                     for q in re.split(r"[、,，]", group) if q.strip())
+
+def canonicalize_foods(foods):
+    """合并重复的食物记录，返回 (去重后的记录, 别名 -> 标准名称)
+
+    三种情况视为同一种食物：规范化后名称相同；类型和括号限定词相同且营养素数值完全相同；
+    不带限定词的两条记录一方的别名是另一方的名称（双方互列，或两条记录及两组的首条记录营养素都相近）。
+    带限定词的记录（熟、冷冻、烘焙、品种等）只按前两条规则合并，不会经别名连到其他变体上。
+    每种规则按键分桶，记录只与桶中的第一条合并（并查集），整体为线性时间，不做两两比较。
+    每组保留营养素数值最全的一条作为标准记录（记录的 duplicates 为合并掉的条数，
+    nutrient_variants 为组内不同营养素数值的个数），缺少类型的从组内其他记录继承，
+    仍然没有类型的按营养素组成归入最接近的类型。
+    """
+    nutrients = [parse_nutrients(food) for food in foods]
+    qualifiers = [food_name_qualifiers(food.get('name')) for food in foods]
+    parent = list(range(len(foods)))
+    first_by_name = {}
+    first_by_signature = {}
+    for i, food in enumerate(foods):
+        name = normalize_food_name(food.get('name'))
+        if name:
+            _union(parent, i, first_by_name.setdefault(name, i))
+        signature = nutrient_signature(nutrients[i])
+        if signature is not None:
+            key = (food.get('type'), qualifiers[i], signature)
+            _union(parent, i, first_by_signature.setdefault(key, i))
+
+    for i, food in enumerate(foods):
+        if qualifiers[i]:
+            continue
+        for alias in nickname_aliases(food):
+            j = first_by_name.get(normalize_food_name(alias))
+            if j is None or qualifiers[j] or foods[j].get('type') != food.get('type'):
+                continue
+            if food.get('name') in nickname_aliases(foods[j]):
+                _union(parent, i, j)
+                continue
+            # 两组的首条记录也要相近，避免经过多次别名把不同的食物连成一组
+            root_i, root_j = _find(parent, i), _find(parent, j)
+            if _nutrients_close(nutrients[i], nutrients[j]) and _nutrients_close(nutrients[root_i], nutrients[root_j]):
+                _union(parent, i, j)
+
+    groups = {}
+    for i in range(len(foods)):
+        groups.setdefault(_find(parent, i), []).append(i)
+
+    canonical_foods = []
+    canonical_nutrient_values = []
+    name_owners = {}
+    nickname_owners = {}
+    for members in groups.values():
+        best = max(members, key=lambda i: (len(nutrients[i]), bool(foods[i].get('type')), -i))
+        record = dict(foods[best])
+        if not record.get('type'):
+            record.pop('type', None)
+            record_type = next((foods[i]['type'] for i in members if foods[i].get('type')), None)
+            if record_type:
+                record['type'] = record_type
+        if len(members) > 1:
+            record['duplicates'] = len(members) - 1
+            record['nutrient_variants'] = len({nutrient_signature(nutrients[i]) or tuple(sorted(nutrients[i].items()))
+                                               for i in members})
+        canonical_foods.append(record)
+        canonical_nutrient_values.append(nutrients[best])
+
+        canonical = record['name']
+        for i in members:
+            if foods[i]['name'] != canonical:
+                name_owners.setdefault(foods[i]['name'], set()).add(canonical)
+            for alias in nickname_aliases(foods[i]):
+                if alias != canonical:
+                    nickname_owners.setdefault(alias, set()).add(canonical)
+
+    canonical_names = {food['name'] for food in canonical_foods}
+    aliases = {}
+    # 被合并记录的名称优先，其次是 nickname 中的别名
+    for owners_by_alias in (name_owners, nickname_owners):
+        for alias, owners in owners_by_alias.items():
+            # 多种食物共用的别名（如"菜花"同时出现在冷冻、熟的花椰菜中）不作映射
+            if len(owners) == 1 and alias not in canonical_names:
+                aliases.setdefault(alias, next(iter(owners)))
+
+    assign_missing_types(canonical_foods, canonical_nutrient_values)
+    return canonical_foods, aliases
+
+def _nutrient_profile(nutrients):
+    """每种食物的营养素组成特征（取对数后标准化，缺失取均值）"""
+    values = np.array([[values.get(nutrient, np.nan) for nutrient in canonical_nutrients] for values in nutrients],
+                      dtype=np.float32)
+    values = np.log1p(values)
+    present = ~np.isnan(values)
+    counts = np.maximum(present.sum(axis=0), 1)
+    filled = np.where(present, values, 0.0)
+    mean = filled.sum(axis=0) / counts
+    std = np.sqrt((np.where(present, values - mean, 0.0) ** 2).sum(axis=0) / counts)
+    values = (filled - mean) / np.where(std > 0, std, 1.0)
+    # 缺失的数值取均值，标准化后为0
+    return np.where(present, values, 0.0).astype(np.float32)
+
+def assign_missing_types(foods, nutrients=None, neighbors=5, chunk_size=256):
+    """为没有类型的食物指定类型：营养素组成最接近的 neighbors 种已分类食物中最多的类型，返回指定的数量"""
+    missing = [i for i, food in enumerate(foods) if not food.get('type')]
+    typed = [i for i, food in enumerate(foods) if food.get('type')]
+    if not missing or not typed:
+        return 0
+    profile = _nutrient_profile(nutrients or [parse_nutrients(food) for food in foods])
+    type_names = sorted({foods[i]['type'] for i in typed})
+    labels = np.array([type_names.index(foods[i]['type']) for i in typed])
+    reference = profile[typed]
+    reference_norms = (reference ** 2).sum(axis=1)
+    k = min(neighbors, len(typed))
+    # 分块计算距离，待分类的记录很多时也不会占用过多内存
+    for start in range(0, len(missing), chunk_size):
+        rows = missing[start:start + chunk_size]
+        distances = reference_norms[None, :] - 2 * profile[rows] @ reference.T
+        nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        for i, votes in zip(rows, labels[nearest]):
+            foods[i]['type'] = type_names[np.bincount(votes, minlength=len(type_names)).argmax()]
+    return len(missing)
+
 def enhance_diet_generator(food_data):
     """增强饮食生成器的功能"""
+    # 0. 合并重复食物
+    total = len(food_data)
+    food_data, food_aliases = canonicalize_foods(food_data)
+    conflicts = sum(1 for food in food_data if food.get('nutrient_variants', 1) > 1)
+    print(f"合并重复食物：{total}条记录合并为{len(food_data)}种，别名{len(food_aliases)}个，"
+          f"其中{conflicts}种的重复记录营养素数值不同，保留数值最全的一条")
+    
     # 1. 分类食物
     categorized_foods = categorize_foods(food_data)
     
@@ -109,6 +445,10 @@ def enhance_diet_generator(food_data):
     # 3. 获取烹饪方法
     cuisine_methods, cuisine_flavors = create_cuisine_cooking_methods()
     
+    # 4. 标注中医性味归经
+    matched = annotate_tcm_properties(food_data)
+    print(f"已为{len(food_data)}种食物标注性味归经，其中{matched}种按名称匹配")
+    
     # 将食物按类型组织
     food_by_type = {}
     for food in food_data:
@@ -141,7 +481,10 @@ def enhance_diet_generator(food_data):
         "cuisine_flavors": cuisine_flavors,
         "food_by_type": food_by_type,
         "food_categories": food_categories,
-        "food_type_to_category": food_type_to_category
+        "food_type_to_category": food_type_to_category,
+        "food_aliases": food_aliases,
+        "tcm_property_names": tcm_property_names,
+        "tcm_constitution_weights": tcm_constitution_weights
     }
 
 def export_diet_generator_helper(food_data):
@@ -0,0 +1,35 @@
+# 测试共用的小型食物数据库和示例用户
+
+
+def food_record(name, food_type, energy, protein, fat, carbs):
+    """process_food_data.py 导出格式的食物记录（每100克）"""
+    return {"name": name, "type": food_type,
+            "info": {"能量": f"{energy}千卡", "蛋白质": f"{protein}克", "脂肪": f"{fat}克", "碳水化合物": f"{carbs}克",
+                     "钠": "50毫克", "胆固醇": "0毫克"}}
+
+
+# 小型食物数据库，结构与 diet_helper_data.json 相同
+sample_catalog = {
+    "food_by_type": {
+        "谷类": [food_record("米饭", "谷类", 116, 2.6, 0.3, 25.9), food_record("小米粥", "谷类", 46, 1.4, 0.7, 8.4),
+                 food_record("全麦面包", "谷类", 246, 8.5, 3.4, 46.1), food_record("荞麦面", "谷类", 340, 10.2, 2.2, 70.2)],
+        "蔬菜": [food_record(name, "蔬菜", 25, 2.0, 0.3, 4.0) for name in ("菠菜", "韭菜", "冬瓜", "苦瓜", "白萝卜", "白菜")],
+        "豆类": [food_record("豆腐", "豆类", 84, 6.6, 5.3, 3.4), food_record("黄豆", "豆类", 390, 35.0, 16.0, 34.2)],
+        "畜肉": [food_record("猪肉（瘦）", "畜肉", 143, 20.3, 6.2, 1.5), food_record("牛肉", "畜肉", 106, 19.8, 2.3, 1.2)],
+        "水果": [food_record(name, "水果", 50, 0.5, 0.2, 12.0) for name in ("苹果", "梨", "草莓", "西瓜", "橙子")],
+    },
+    "cuisine_methods": {},
+    "cuisine_flavors": {},
+}
+
+sample_profiles = [
+    {"main_type": main_type, "sub_type": "脾虚不运", "gender": gender, "age": 35, "height": 165, "weight": 62,
+     "activity": "中等体力", "diseases": diseases, "preferred_cuisine": "粤菜", "season": season}
+    for main_type, gender, diseases, season in [
+        ("痰湿内盛", "女", ["高血压"], "夏季"),
+        ("气郁血瘀", "男", ["无"], "春季"),
+        ("胃热火郁", "女", ["糖尿病"], "秋季"),
+        ("脾肾阳虚", "男", ["高血脂"], "冬季"),
+    ]
+]
+
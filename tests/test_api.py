@@ -0,0 +1,77 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from api import make_server
+from loadtest import InProcessTarget, run_load
+from sample_data import sample_catalog, sample_profiles
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    server = make_server(port=0, catalog=sample_catalog)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def call(url, body=None):
+    data = body if body is None or isinstance(body, bytes) else json.dumps(body, ensure_ascii=False).encode("utf-8")
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as error:
+        return error.code, json.loads(error.read())
+
+
+def test_get_endpoints(base_url):
+    assert call(f"{base_url}/health") == (200, {"status": "ok"})
+    status, payload = call(f"{base_url}/engines")
+    assert status == 200 and "enhanced" in payload["engines"]
+    assert call(f"{base_url}/missing")[0] == 404
+
+
+def test_generate(base_url):
+    status, payload = call(f"{base_url}/generate", {"engine": "enhanced", "profile": sample_profiles[0],
+                                                    "days": 2, "seed": 1})
+    assert status == 200
+    assert list(payload["menu"]) == ["Day1", "Day2"]
+    assert payload["summary"]["calorie_needs"] > 0
+    # 相同的 seed 得到相同的菜单
+    assert call(f"{base_url}/generate", {"engine": "enhanced", "profile": sample_profiles[0],
+                                         "days": 2, "seed": 1})[1] == payload
+
+
+@pytest.mark.parametrize("body", [
+    [],
+    b"not json",
+    {"engine": "enhanced"},
+    {"engine": "enhanced", "profile": []},
+    {"engine": "x", "profile": sample_profiles[0]},
+    {"engine": "enhanced", "profile": {"main_type": "痰湿内盛"}},
+])
+def test_bad_requests(base_url, body):
+    status, payload = call(f"{base_url}/generate", body)
+    assert status == 400
+    assert "error" in payload
+
+
+def test_post_to_unknown_path(base_url):
+    assert call(f"{base_url}/other", {"profile": sample_profiles[0]})[0] == 404
+
+
+def test_run_load_in_process():
+    target = InProcessTarget("enhanced", concurrency=2, catalog=sample_catalog)
+    try:
+        report = run_load(target, concurrency=2, duration=30, max_requests=6, interval=0.5)
+    finally:
+        target.close()
+    assert report["requests"] == 6
+    assert report["errors"] == 0
+    assert report["p50_ms"] is not None
@@ -0,0 +1,82 @@
+from process_food_data import canonicalize_foods, food_name_qualifiers
+
+
+def record(name, food_type="蔬菜", nickname="无", energy=25, protein=2.0, fat=0.3, carbs=5.0, **extra):
+    info = {"能量": f"{energy}千卡", "蛋白质": f"{protein}克", "脂肪": f"{fat}克", "碳水化合物": f"{carbs}克"}
+    info.update({name: f"{value}毫克" for name, value in extra.items()})
+    food = {"name": name, "nickname": nickname, "info": info}
+    if food_type:
+        food["type"] = food_type
+    return food
+
+
+def grouped(foods):
+    canonical, aliases = canonicalize_foods(foods)
+    return {food["name"]: food for food in canonical}, aliases
+
+
+def test_exact_duplicates_merge_and_keep_most_complete_record():
+    foods, _ = grouped([record("芹菜", energy=14), record("芹菜", energy=17, 钙=80), record("菠菜")])
+    assert set(foods) == {"芹菜", "菠菜"}
+    assert foods["芹菜"]["info"]["能量"] == "17千卡"
+    assert foods["芹菜"]["duplicates"] == 1
+    assert foods["芹菜"]["nutrient_variants"] == 2
+
+
+def test_mutual_synonyms_merge_into_alias():
+    foods, aliases = grouped([
+        record("马铃薯", "薯类", nickname="土豆", energy=77, carbs=17.5, 钙=8),
+        record("土豆", "薯类", nickname="马铃薯", energy=81, carbs=17.2),
+    ])
+    assert set(foods) == {"马铃薯"}
+    assert aliases["土豆"] == "马铃薯"
+
+
+def test_qualified_variants_stay_distinct():
+    foods, aliases = grouped([
+        record("马铃薯", "薯类", nickname="土豆", energy=77, carbs=17.5),
+        record("土豆", "薯类", nickname="马铃薯", energy=77, carbs=17.2),
+        record("马铃薯（赤褐色）", "薯类", nickname="土豆", energy=79, carbs=18.1),
+        record("土豆（红色）", "薯类", nickname="马铃薯", energy=76, carbs=17.0),
+        record("土豆（红色、烘焙）", "薯类", nickname="马铃薯", energy=89, carbs=19.6),
+        record("花椰菜", nickname="菜花", energy=25),
+        record("菜花", nickname="花椰菜", energy=26),
+        record("花椰菜（冷冻）", nickname="菜花", energy=24),
+        record("花椰菜（熟）", nickname="菜花", energy=23),
+    ])
+    assert set(foods) == {"马铃薯", "马铃薯（赤褐色）", "土豆（红色）", "土豆（红色、烘焙）",
+                          "花椰菜", "花椰菜（冷冻）", "花椰菜（熟）"}
+    assert aliases["菜花"] == "花椰菜"
+
+
+def test_identical_nutrients_need_same_type_and_qualifiers():
+    foods, _ = grouped([
+        record("番杏", nickname="新西兰菠菜", energy=14, 钙=97),
+        record("新西兰菠菜", energy=14, 钙=97),
+        record("普洱茶", "茶类", energy=14, 钙=97),
+        record("番杏（熟）", energy=14, 钙=97),
+    ])
+    assert len(foods) == 3
+    assert "普洱茶" in foods and "番杏（熟）" in foods
+
+
+def test_one_way_alias_chain_does_not_collapse_groups():
+    foods, _ = grouped([
+        record("甲菜", nickname="乙菜", energy=100, protein=10, fat=1, carbs=10),
+        record("乙菜", nickname="丙菜", energy=109, protein=10.9, fat=1.09, carbs=10.9),
+        record("丙菜", energy=118, protein=11.8, fat=1.18, carbs=11.8),
+    ])
+    # 乙菜与甲菜相近而合并；丙菜与乙菜相近，但与甲菜所在组的首条记录相差超过容差
+    assert set(foods) == {"甲菜", "丙菜"} or set(foods) == {"乙菜", "丙菜"}
+
+
+def test_untyped_record_gets_nearest_type():
+    fruits = [record(f"水果{i}", "水果", energy=50 + i, protein=0.5, fat=0.2, carbs=12 + i) for i in range(6)]
+    grains = [record(f"谷物{i}", "谷类", energy=350 + i, protein=10, fat=2, carbs=75) for i in range(6)]
+    foods, _ = grouped(fruits + grains + [record("史密斯奶奶苹果", None, energy=58, protein=0.4, fat=0.2, carbs=13.6)])
+    assert foods["史密斯奶奶苹果"]["type"] == "水果"
+
+
+def test_name_qualifiers():
+    assert food_name_qualifiers("花椰菜（冷冻、熟）") == {"冷冻", "熟"}
+    assert food_name_qualifiers("花椰菜") == frozenset()
@@ -0,0 +1,39 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+from engines import EnhancedEngine
+from food_catalog import FoodCatalog, runtime_foods
+from sample_data import sample_catalog as catalog, sample_profiles as profiles
+
+
+def generate(engine, index):
+    return engine.generate(profiles[index % len(profiles)], days=3, rng=random.Random(index))
+
+
+def test_runtime_food_ids_do_not_depend_on_call_order():
+    first = FoodCatalog.from_helper_data(catalog)
+    second = FoodCatalog.from_helper_data(catalog)
+    second.intern("时令水果", "水果")
+    first.intern("馒头", "谷类")
+    for name, food_type in reversed(runtime_foods):
+        assert first.intern(name, food_type) == second.intern(name, food_type)
+    assert first.index.size == first.record_count
+
+
+def test_same_seed_gives_same_menu_on_fresh_and_shared_catalogs():
+    expected = [generate(EnhancedEngine(catalog), i) for i in range(8)]
+    shared = EnhancedEngine(catalog)
+    # 共享的引擎先以相反的顺序生成一遍，候选集缓存和食物id都已存在
+    for i in reversed(range(8)):
+        generate(shared, i)
+    assert [generate(shared, i) for i in range(8)] == expected
+
+
+def test_same_seed_gives_same_plan_across_threads():
+    engine = EnhancedEngine(catalog)
+    expected = [engine.generate_plan(profiles[i % len(profiles)], days=3, rng=random.Random(i)) for i in range(16)]
+    fresh = EnhancedEngine(catalog)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        plans = list(pool.map(lambda i: fresh.generate_plan(profiles[i % len(profiles)], days=3,
+                                                             rng=random.Random(i)), range(16)))
+    assert plans == expected
@@ -0,0 +1,81 @@
+import random
+
+import pytest
+
+import engines
+from engines import (CAP_HOUSEHOLD, CAP_REPLAN, available_engines, create_engine, get_engine_class,
+                     register_engine)
+from sample_data import sample_catalog, sample_profiles
+
+profile = sample_profiles[0]
+
+
+@pytest.fixture(autouse=True)
+def no_template_library(monkeypatch):
+    # 不读取磁盘上的模板库，模板版退回增强版生成
+    monkeypatch.setattr(engines, "load_template_library", lambda: None)
+
+
+def test_registered_engines():
+    assert available_engines()[:3] == ["basic", "enhanced", "template"]
+    for name in available_engines():
+        assert get_engine_class(name).name == name
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        get_engine_class("x")
+    with pytest.raises(ValueError):
+        create_engine("x", sample_catalog)
+
+
+def test_engine_without_name_is_rejected():
+    with pytest.raises(ValueError):
+        register_engine(type("NamelessEngine", (engines.DietEngine,), {}))
+
+
+@pytest.mark.parametrize("name", available_engines())
+def test_create_and_generate(name):
+    engine = create_engine(name, sample_catalog)
+    assert engine.name == name
+    menu = engine.generate(profile, days=2, rng=random.Random(0))
+    assert list(menu) == ["Day1", "Day2"]
+    for meals in menu.values():
+        for meal in meals.values():
+            assert {"主食", "菜品", "热量", "营养素"} <= set(meal)
+    summary = engine.summarize(profile)
+    assert summary["calorie_needs"] > 0
+
+
+@pytest.mark.parametrize("name", available_engines())
+def test_capabilities_match_implemented_methods(name):
+    engine = create_engine(name, sample_catalog)
+    rng = random.Random(1)
+
+    if engine.has_capability(CAP_REPLAN):
+        plan = engine.generate_plan(profile, days=2, rng=rng)
+        new_plan = engine.replan(profile, plan, "Day1", meal_type="午餐", slot=0, rng=rng)
+        assert engine.render(new_plan)["Day2"] == engine.render(plan)["Day2"]
+    else:
+        with pytest.raises(NotImplementedError):
+            engine.generate_plan(profile, days=2, rng=rng)
+        with pytest.raises(NotImplementedError):
+            engine.replan(profile, {}, "Day1", rng=rng)
+        with pytest.raises(NotImplementedError):
+            engine.render({})
+
+    family = [dict(sample_profiles[0], name="甲"), dict(sample_profiles[1], name="乙")]
+    if engine.has_capability(CAP_HOUSEHOLD):
+        result = engine.generate_household(family, days=1, rng=rng)
+        assert set(result["menus"]) == {"甲", "乙"}
+        assert 0 <= result["shared"]["shared_ratio"] <= 1
+    else:
+        with pytest.raises(NotImplementedError):
+            engine.generate_household(family, days=1, rng=rng)
+
+
+def test_basic_engine_has_no_structured_capabilities():
+    basic = get_engine_class("basic")
+    assert CAP_REPLAN not in basic.capabilities and CAP_HOUSEHOLD not in basic.capabilities
+    for name in ("enhanced", "template"):
+        assert {CAP_REPLAN, CAP_HOUSEHOLD} <= get_engine_class(name).capabilities
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from food_catalog import FoodCatalog
+from food_query import NutrientIndex
+from sample_data import food_record, sample_catalog
+
+
+def without(record, nutrient):
+    info = {name: value for name, value in record["info"].items() if name != nutrient}
+    return dict(record, info=info)
+
+
+# 示例数据库再加上缺少钠的记录和能量为0的记录
+records = [record for foods in sample_catalog["food_by_type"].values() for record in foods] + [
+    without(food_record("海带", "藻类", 13, 1.2, 0.1, 2.1), "钠"),
+    food_record("矿泉水", "饮料", 0, 0.0, 0.0, 0.0),
+]
+foods = FoodCatalog(records)
+index = NutrientIndex(foods)
+
+
+def brute_mask(nutrient, low=None, high=None, keep_missing=False):
+    column = foods.column(nutrient)[:index.size]
+    missing = np.isnan(column)
+    with np.errstate(invalid="ignore"):
+        mask = ~missing
+        if low is not None:
+            mask &= column >= low
+        if high is not None:
+            mask &= column < high
+    return mask | (missing if keep_missing else False)
+
+
+def test_index_covers_only_database_records():
+    assert index.size == len(records)
+    assert len(foods) > index.size
+
+
+@pytest.mark.parametrize("low, high", [(None, 84), (84, None), (84, 143), (25, 25), (0, 1), (None, None)])
+def test_range_mask_is_half_open(low, high):
+    assert index.range_mask("能量", low, high).tolist() == brute_mask("能量", low, high).tolist()
+
+
+def names(mask):
+    return {foods[i].name for i in np.flatnonzero(mask)}
+
+
+def test_range_bounds_on_exact_values():
+    assert "豆腐" in names(index.range_mask("能量", 84, None))
+    assert "豆腐" not in names(index.range_mask("能量", None, 84))
+
+
+@pytest.mark.parametrize("keep_missing", [False, True])
+def test_missing_values(keep_missing):
+    mask = index.range_mask("钠", None, 100, keep_missing=keep_missing)
+    assert mask.tolist() == brute_mask("钠", None, 100, keep_missing).tolist()
+    kelp = next(food.id for food in foods.foods if food.name == "海带")
+    assert mask[kelp] == keep_missing
+
+
+def test_combined_mask_with_types():
+    mask = index.mask(types=["蔬菜", "藻类"], ranges={"钠": (None, 100), "能量": (10, None)}, keep_missing=True)
+    expected = np.isin([food.type for food in foods.foods[:index.size]], ["蔬菜", "藻类"])
+    expected &= brute_mask("钠", None, 100, True) & brute_mask("能量", 10, None, True)
+    assert mask.tolist() == expected.tolist()
+
+
+def test_ratio_sort_skips_zero_denominator():
+    values = index.sort_values(("蛋白质", "能量"))
+    water = next(food.id for food in foods.foods if food.name == "矿泉水")
+    assert np.isnan(values[water])
+    result = index.query(sort_by=("蛋白质", "能量"))
+    assert "矿泉水" not in [food.name for food in result]
+    assert len(result) == index.size - 1
+
+
+@pytest.mark.parametrize("key", ["能量", "蛋白质", ("蛋白质", "能量")])
+@pytest.mark.parametrize("descending", [True, False])
+@pytest.mark.parametrize("k", [1, 3, 7])
+def test_top_k_matches_full_sort(key, descending, k):
+    values = index.sort_values(key)
+    present = np.flatnonzero(~np.isnan(values))
+    full = sorted(present.tolist(), key=lambda i: -values[i] if descending else values[i])
+    result = index.top_k(key, k=k, descending=descending)
+    # 取值相同的食物顺序不限，比较取值
+    assert [values[food.id] for food in result] == [values[i] for i in full[:k]]
+    keys = [values[food.id] for food in result]
+    assert keys == sorted(keys, reverse=descending)
+
+
+def test_unknown_nutrient():
+    with pytest.raises(ValueError):
+        index.range_mask("维生素Z", 0, 1)
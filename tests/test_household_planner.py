@@ -0,0 +1,90 @@
+import random
+
+import pytest
+
+from food_catalog import Dish, FoodCatalog, Meal
+from household_planner import HouseholdPlanner, scale_meal
+from sample_data import sample_catalog, sample_profiles
+
+mother = dict(sample_profiles[1], name="妈妈", gender="女", weight=55, activity="轻体力")
+father = dict(sample_profiles[1], name="爸爸", gender="男", height=180, weight=80, activity="重体力")
+
+
+def make_planner(profiles, seed=0):
+    # 共用候选集缓存在 FoodCatalog 上，每个测试使用新的数据库
+    return HouseholdPlanner(profiles, diet_helper_data=sample_catalog, rng=random.Random(seed),
+                            foods=FoodCatalog.from_helper_data(sample_catalog))
+
+
+def dish_in(meal, slot):
+    return meal.staple if slot == "主食" else next(dish for dish in meal.dishes if dish.slot == slot)
+
+
+def test_shared_dishes_use_the_same_food():
+    planner = make_planner([mother, father])
+    plans = planner.generate_weekly_plans(days=3)
+    for day_key, meals in plans["妈妈"].items():
+        for meal_type, meal in meals.items():
+            other = plans["爸爸"][day_key][meal_type]
+            for slot in ("主食", "蛋白质"):
+                assert dish_in(meal, slot).food_id == dish_in(other, slot).food_id
+    assert planner.shared_summary(plans)["shared_ratio"] == 1.0
+
+
+def test_members_choose_individually_without_common_candidates():
+    planner = make_planner([mother, father], seed=3)
+    tofu, beef = (next(food for food in planner.foods.foods if food.name == name) for name in ("豆腐", "牛肉"))
+    planner.members[0]._get_protein_candidates = lambda: (tofu,)
+    planner.members[1]._get_protein_candidates = lambda: (beef,)
+    plans = planner.generate_weekly_plans(days=2)
+    for meals in plans["妈妈"].values():
+        assert all(dish_in(meal, "蛋白质").food_id == tofu.id for meal in meals.values())
+    for meals in plans["爸爸"].values():
+        assert all(dish_in(meal, "蛋白质").food_id == beef.id for meal in meals.values())
+    # 主食仍然共用
+    summary = planner.shared_summary(plans)
+    assert summary["shared_ratio"] == 0.5
+
+
+def test_portions_follow_calorie_needs():
+    planner = make_planner([mother, father], seed=1)
+    needs = [member.calorie_needs for member in planner.members]
+    assert needs[1] > needs[0]
+    assert planner.portion_factors[1] > 1 > planner.portion_factors[0]
+    plans = planner.generate_weekly_plans(days=3)
+    for day_key in plans["妈妈"]:
+        totals = [sum(meal.calorie for meal in plans[name][day_key].values()) for name in ("妈妈", "爸爸")]
+        assert totals[1] > totals[0]
+
+
+def test_scale_meal():
+    meal = Meal("午餐", Dish("主食", 0, 80), (Dish("蛋白质", 1, 100),), 600, (50, 25, 25))
+    scaled = scale_meal(meal, 1.5)
+    assert (scaled.staple.grams, scaled.dishes[0].grams, scaled.calorie) == (120, 150, 900)
+
+
+def test_member_names_must_be_unique():
+    with pytest.raises(ValueError):
+        make_planner([mother, dict(father, name="妈妈")])
+    with pytest.raises(ValueError):
+        make_planner([])
+    # 未命名的成员按顺序编号
+    planner = make_planner([dict(mother, name=""), dict(father, name="")])
+    assert planner.names == ["成员1", "成员2"]
+
+
+def test_shared_summary_totals():
+    planner = make_planner([mother, father])
+    rice, tofu, beef = (next(food.id for food in planner.foods.foods if food.name == name)
+                        for name in ("米饭", "豆腐", "牛肉"))
+
+    def meal(staple_grams, protein, protein_grams):
+        return Meal("午餐", Dish("主食", rice, staple_grams), (Dish("蛋白质", protein, protein_grams),), 0, (0, 0, 0))
+
+    plans = {
+        "妈妈": {"Day1": {"午餐": meal(100, tofu, 80)}, "Day2": {"午餐": meal(90, tofu, 70)}},
+        "爸爸": {"Day1": {"午餐": meal(150, tofu, 120)}, "Day2": {"午餐": meal(130, beef, 100)}},
+    }
+    summary = planner.shared_summary(plans)
+    assert summary["shared_ratio"] == 0.75
+    assert summary["shopping"] == {"Day1": {"米饭": 250, "豆腐": 200}, "Day2": {"米饭": 220}}
@@ -0,0 +1,90 @@
+import random
+
+import numpy as np
+import pytest
+
+from engines import TemplateEngine
+from enhanced_diet_generator import effective_disease, meal_types, render_dish
+from food_catalog import FoodCatalog
+from meal_templates import bucket_key, build_template_library, load_template_library, save_template_library
+from sample_data import sample_catalog, sample_profiles
+
+profile = sample_profiles[0]
+bucket = (profile["main_type"], profile["sub_type"], profile["season"], profile["preferred_cuisine"],
+          effective_disease(profile["diseases"]))
+
+
+@pytest.fixture(scope="module")
+def library():
+    return build_template_library(sample_catalog, per_meal=6, seed=1, buckets=[bucket])
+
+
+def render(foods, meal):
+    return [render_dish(dish, foods) for dish in (meal.staple,) + meal.dishes]
+
+
+def test_disease_combinations_share_a_bucket():
+    assert effective_disease(["无"]) == "无"
+    assert bucket_key(dict(profile, diseases=["高血压"])) == "|".join(bucket)
+    assert bucket_key(dict(profile, diseases=["高血压", "无"])) == bucket_key(dict(profile, diseases=["高血压"]))
+
+
+def test_library_round_trip(tmp_path, library):
+    path = str(tmp_path / "templates.npz")
+    save_template_library(library, path)
+    loaded = load_template_library(path)
+    assert loaded is not None
+    assert loaded.header == library.header
+    for name, column in library.arrays.items():
+        assert np.array_equal(loaded.arrays[name], column)
+    assert profile in loaded
+    assert dict(profile, season="冬季") not in loaded
+    assert load_template_library(str(tmp_path / "missing.npz")) is None
+
+
+def test_templates_are_resolved_by_name_on_other_catalogs(library):
+    # 食物id只在同一个 FoodCatalog 内有效，模板按 (名称, 类型) 还原
+    first = FoodCatalog.from_helper_data(sample_catalog)
+    reordered = dict(sample_catalog, food_by_type=dict(reversed(list(sample_catalog["food_by_type"].items()))))
+    second = FoodCatalog.from_helper_data(reordered)
+    assert [food.name for food in first.foods] != [food.name for food in second.foods]
+    for group in range(len(meal_types)):
+        assert [render(first, meal) for meal in library.group_meals(first, group)] == \
+               [render(second, meal) for meal in library.group_meals(second, group)]
+    # 同一个 FoodCatalog 只解析一次
+    assert library.bind(first) is library.bind(first)
+    assert library.group_meals(first, 0) is library.group_meals(first, 0)
+
+
+def test_assemble_plan_avoids_repeated_staples(library):
+    foods = FoodCatalog.from_helper_data(sample_catalog)
+    plan = library.assemble_plan(profile, foods, days=3, rng=random.Random(0))
+    assert list(plan) == ["Day1", "Day2", "Day3"]
+    for meals in plan.values():
+        assert list(meals) == meal_types
+        assert all(meal.meal_type == meal_type for meal_type, meal in meals.items())
+    staples = [meal.staple.food_id for meals in plan.values() for meal in meals.values()]
+    candidates = {meal.staple.food_id for group in range(len(meal_types))
+                  for meal in library.group_meals(foods, group)}
+    if len(candidates) >= len(staples):
+        assert len(set(staples)) == len(staples)
+
+
+def test_template_engine_solves_templates(library):
+    engine = TemplateEngine(sample_catalog, library=library)
+    plan = engine.generate_plan(profile, days=2, rng=random.Random(2))
+    menu = engine.generate(profile, days=2, rng=random.Random(2))
+    assert menu == engine.render(plan)
+    # 克数按用户重新求解，不再是模板中的原始克数
+    unsolved = library.assemble_plan(profile, engine.foods, days=2, rng=random.Random(2))
+    assert plan != unsolved
+    for day_key, meals in plan.items():
+        for meal_type, meal in meals.items():
+            template = unsolved[day_key][meal_type]
+            assert [dish.food_id for dish in meal.dishes] == [dish.food_id for dish in template.dishes]
+
+
+def test_template_engine_falls_back_outside_the_library(library):
+    engine = TemplateEngine(sample_catalog, library=library)
+    other = dict(profile, season="冬季")
+    assert list(engine.generate_plan(other, days=2, rng=random.Random(0))) == ["Day1", "Day2"]
@@ -0,0 +1,48 @@
+import threading
+
+from menu_service import MenuService
+
+
+class FakeEngine:
+    name = "fake"
+
+    def __init__(self):
+        self.calls = []
+        self.threads = set()
+
+    def generate(self, profile, days=7, rng=None, progress=None):
+        self.calls.append(profile["season"])
+        self.threads.add(threading.current_thread().name)
+        return {"season": profile["season"], "value": rng.random()}
+
+
+profile = {"main_type": "气郁血瘀", "sub_type": "脾虚不运", "season": "春季", "diseases": ["无"]}
+
+
+def test_prefetched_season_is_reused_with_same_seed():
+    engine = FakeEngine()
+    service = MenuService()
+    try:
+        service.submit(engine, profile, seed=7).result()
+        prefetched = service.prefetch(engine, profile, seed=7)
+        for job in prefetched:
+            job.result()
+
+        summer = service.submit(engine, dict(profile, season="夏季"), seed=7)
+        assert summer in prefetched
+        assert sorted(engine.calls) == sorted(["春季", "夏季", "秋季", "冬季"])
+    finally:
+        service.shutdown()
+
+
+def test_engine_object_runs_in_worker_threads():
+    engine = FakeEngine()
+    service = MenuService()
+    try:
+        first = service.submit(engine, profile, seed=1).result()
+        again = service.submit(engine, profile, seed=1).result()
+        assert first == again
+        assert len(engine.calls) == 1
+        assert all(name.startswith("menu") for name in engine.threads)
+    finally:
+        service.shutdown()
@@ -0,0 +1,73 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from metabolism import (activity_levels, bmi_adjustment, calculate_bmr, calculate_calorie_needs,
+                        compute_metabolic_frame, user_metabolics)
+
+
+def reference_calorie_needs(user, strategy):
+    """逐个用户的标量计算，与向量化结果对照"""
+    weight, height, age = user["weight"], user["height"], user["age"]
+    if user["gender"] == "男":
+        bmr = 88.362 + 13.397 * weight + 4.799 * height - 5.677 * age
+    else:
+        bmr = 447.593 + 9.247 * weight + 3.098 * height - 4.330 * age
+    bmi = weight / (height / 100) ** 2
+    if strategy == "flat":
+        adjustment = 0.85
+    elif bmi > 28:
+        adjustment = 0.8
+    elif bmi > 24:
+        adjustment = 0.85
+    elif bmi < 18.5:
+        adjustment = 1.1
+    else:
+        adjustment = 1.0
+    return round(bmr * activity_levels[user["activity"]] * adjustment)
+
+
+def random_users(seed, count=200):
+    rng = random.Random(seed)
+    return pd.DataFrame([{
+        "gender": rng.choice(["男", "女"]),
+        "age": rng.randint(18, 80),
+        "height": rng.randint(145, 195),
+        "weight": rng.randint(40, 120),
+        "activity": rng.choice(list(activity_levels)),
+    } for _ in range(count)])
+
+
+@pytest.mark.parametrize("strategy", ["banded", "flat"])
+def test_vectorised_matches_scalar_reference(strategy):
+    users = random_users(0)
+    frame = compute_metabolic_frame(users, strategy=strategy)
+    expected = [reference_calorie_needs(user, strategy) for user in users.to_dict("records")]
+    assert frame["calorie_needs"].tolist() == pytest.approx(expected, abs=1)
+    assert list(frame.columns[:len(users.columns)]) == list(users.columns)
+    for user, needs in zip(users.to_dict("records")[:20], expected):
+        assert user_metabolics(user, strategy)[1] == pytest.approx(needs, abs=1)
+
+
+def test_scalar_input_returns_float():
+    needs = calculate_calorie_needs("女", 60, 165, 30, "轻体力")
+    assert isinstance(needs, float)
+    assert isinstance(calculate_calorie_needs(["女", "男"], 60, 165, 30, "轻体力"), np.ndarray)
+
+
+def test_bmi_band_edges():
+    assert bmi_adjustment([18.4, 18.5, 24.0, 24.1, 28.0, 28.1]).tolist() == [1.1, 1.0, 1.0, 0.85, 0.85, 0.8]
+    with pytest.raises(ValueError):
+        bmi_adjustment(22.0, strategy="unknown")
+
+
+def test_unknown_activity_raises():
+    with pytest.raises(KeyError):
+        calculate_calorie_needs("男", 70, 175, 30, "躺平")
+
+
+def test_bmr_broadcasts_gender():
+    bmr = calculate_bmr(np.array(["男", "女"]), 70, 175, 30)
+    assert bmr[0] > bmr[1]
@@ -0,0 +1,96 @@
+import random
+
+import numpy as np
+import pytest
+
+from engines import EnhancedEngine
+from enhanced_diet_generator import meal_types
+from food_catalog import FoodCatalog
+from plan_archive import PlanArchiveReader, PlanArchiveWriter, fixed_dictionaries
+from plan_quality import DishTableBuilder, table_from_archive
+from sample_data import sample_catalog, sample_profiles
+
+
+@pytest.fixture(scope="module")
+def plans():
+    engine = EnhancedEngine(sample_catalog)
+    return engine.foods, [(user_id, profile, engine.generate_plan(profile, days=2, rng=random.Random(user_id)))
+                          for user_id, profile in enumerate(sample_profiles * 2)]
+
+
+def write_archive(path, foods, items, chunk_rows=40):
+    with PlanArchiveWriter(str(path), foods, chunk_rows=chunk_rows) as writer:
+        for user_id, profile, plan in items:
+            writer.append(user_id, profile, plan)
+
+
+def plan_rows(foods, items):
+    """计划中的每道菜 (用户, 天, 餐次, 类别, 名称, 克数, 烹饪方法)"""
+    return sorted((user_id, int(day_key[3:]), meal_type, dish.slot, foods[dish.food_id].name, dish.grams, dish.method)
+                  for user_id, _, plan in items for day_key, meals in plan.items()
+                  for meal_type, meal in meals.items() for dish in (meal.staple,) + meal.dishes)
+
+
+def archive_rows(reader):
+    dictionary = reader.dictionary
+    rows = []
+    for chunk in reader.iter_chunks(row_fields=("user", "day", "meal", "slot", "food", "grams", "method"),
+                                    user_fields=("user_id",)):
+        for user, day, meal, slot, food, grams, method in zip(*(chunk[f"row_{name}"].tolist() for name in (
+                "user", "day", "meal", "slot", "food", "grams", "method"))):
+            rows.append((chunk["user_user_id"][user].item(), day, meal_types[meal], dictionary["slots"][slot],
+                         dictionary["foods"][food][0], grams, dictionary["methods"][method]))
+    return sorted(rows)
+
+
+def test_round_trip_across_chunks_and_sessions(tmp_path, plans):
+    foods, items = plans
+    write_archive(tmp_path, foods, items[:5])
+    # 另一个进程的 FoodCatalog，食物按 (名称, 类型) 编码，可继续追加
+    write_archive(tmp_path, FoodCatalog.from_helper_data(sample_catalog), items[5:])
+
+    reader = PlanArchiveReader(str(tmp_path))
+    assert len(reader.chunk_paths) > 2
+    assert reader.user_count() == len(items)
+    assert archive_rows(reader) == plan_rows(foods, items)
+
+    users = {}
+    for chunk in reader.iter_chunks(user_fields=("user_id", "main_type", "season")):
+        for user_id, main_type, season in zip(*(chunk[f"user_{name}"].tolist() for name in
+                                                ("user_id", "main_type", "season"))):
+            users[user_id] = (fixed_dictionaries["main_type"][main_type], fixed_dictionaries["season"][season])
+    assert users == {user_id: (profile["main_type"], profile["season"]) for user_id, profile, _ in items}
+
+
+def test_serving_frequency_matches_plans(tmp_path, plans):
+    foods, items = plans
+    write_archive(tmp_path, foods, items)
+    reader = PlanArchiveReader(str(tmp_path))
+    rows = plan_rows(foods, items)
+
+    summer = {user_id for user_id, profile, _ in items if profile["season"] == "夏季"}
+    result = reader.serving_frequency("苦瓜", season="夏季", exact=True)
+    hits = [row for row in rows if row[0] in summer and row[4] == "苦瓜"]
+    assert result["servings"] == len(hits)
+    assert result["grams"] == sum(row[5] for row in hits)
+    assert result["segment_users"] == len(summer)
+    assert result["segment_meals"] == sum(1 for row in rows if row[0] in summer and row[3] == "主食")
+
+    top = reader.top_foods(k=1, slot="主食")[0]
+    staples = [row[4] for row in rows if row[3] == "主食"]
+    assert top["servings"] == max(staples.count(name) for name in staples)
+
+
+def test_table_from_archive_matches_builder(tmp_path, plans):
+    foods, items = plans
+    write_archive(tmp_path, foods, items)
+    table = table_from_archive(PlanArchiveReader(str(tmp_path)), foods)
+
+    builder = DishTableBuilder(foods)
+    for _, profile, plan in items:
+        builder.add_plan(profile, plan)
+    expected = builder.build()
+    order = np.lexsort((table.slot, table.meal, table.day, table.plan))
+    expected_order = np.lexsort((expected.slot, expected.meal, expected.day, expected.plan))
+    assert table.food[order].tolist() == expected.food[expected_order].tolist()
+    assert table.grams[order].tolist() == expected.grams[expected_order].tolist()
@@ -0,0 +1,82 @@
+import csv
+import io
+import os
+
+import pytest
+
+from engines import EnhancedEngine
+from plan_export import (available_export_formats, export_bytes, export_menus, generate_cohort, menu_rows,
+                         table_header)
+from sample_data import sample_catalog, sample_profiles
+
+menu = {
+    "Day1": {
+        "早餐": {"主食": "小米粥", "菜品": ["清炒菠菜（150g，鲜味）", "水果：苹果（100g）"],
+                 "热量": "500kcal", "营养素": "碳水50% 蛋白25% 脂肪25%"},
+        "午餐": {"主食": "米饭", "菜品": [], "热量": "600kcal", "营养素": "碳水55% 蛋白20% 脂肪25%"},
+    }
+}
+profile = dict(sample_profiles[0], diseases=["高血压", "糖尿病"])
+summary = {"bmi": 22.77, "calorie_needs": 1854.4, "medicinals": ["茯苓", "<薏苡仁>"]}
+
+
+def items(count=3):
+    return [(f"用户{i + 1}", profile, menu, summary) for i in range(count)]
+
+
+def test_menu_rows_one_row_per_dish():
+    rows = list(menu_rows("张三", profile, menu, summary))
+    assert len(rows) == 3
+    assert all(len(row) == len(table_header) for row in rows)
+    assert rows[0][:6] == ["张三", profile["main_type"], profile["sub_type"], profile["season"], "高血压、糖尿病", 1854]
+    # 没有菜品的餐次也保留一行
+    assert rows[2][7:10] == ["午餐", "米饭", ""]
+
+
+def test_csv_file_and_bytes_agree(tmp_path):
+    path = str(tmp_path / "plans.csv")
+    progress = []
+    assert export_menus(iter(items()), "csv", path, progress=lambda done, total: progress.append(done)) == 3
+    assert progress == [1, 2, 3]
+    with open(path, 'rb') as f:
+        content = f.read()
+    assert content == export_bytes(items(), "csv")
+    rows = list(csv.reader(io.StringIO(content.decode("utf-8-sig"))))
+    assert rows[0] == table_header
+    assert len(rows) == 1 + 3 * 3
+
+
+def test_html_is_escaped_and_closed():
+    page = export_bytes(items(2), "html").decode("utf-8")
+    assert page.count('<section class="user">') == 2
+    assert "&lt;薏苡仁&gt;" in page and "<薏苡仁>" not in page
+    assert page.rstrip().endswith("</html>")
+
+
+def test_failed_export_removes_partial_file(tmp_path):
+    path = str(tmp_path / "plans.html")
+
+    def broken():
+        yield from items(1)
+        raise RuntimeError("生成失败")
+
+    with pytest.raises(RuntimeError):
+        export_menus(broken(), "html", path)
+    assert not os.path.exists(path)
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        export_bytes(items(), "pdf")
+    assert "csv" in available_export_formats() and "pdf" not in available_export_formats()
+
+
+def test_generate_cohort_is_lazy_and_seeded():
+    engine = EnhancedEngine(sample_catalog)
+    cohort = generate_cohort(engine, sample_profiles, days=1, seed=4)
+    name, first_profile, first_menu, first_summary = next(cohort)
+    assert name == "用户1" and first_profile is sample_profiles[0]
+    assert first_summary["calorie_needs"] > 0
+    again = list(generate_cohort(engine, sample_profiles, days=1, seed=4))
+    assert again[0][2] == first_menu
+    assert len(again) == len(sample_profiles)
@@ -0,0 +1,68 @@
+import pytest
+
+from enhanced_diet_generator import render_plan
+from food_catalog import Dish, FoodCatalog, Meal
+from plan_quality import DishTableBuilder, PlanEvaluator, parse_dish, parse_staple, summarize
+from sample_data import food_record
+
+
+@pytest.mark.parametrize("text, position, expected", [
+    ("清炒苦瓜（苦瓜 200g，调料适量）", 0, ("蔬菜", "苦瓜", 200.0)),
+    ("清炒苦瓜（200g，鲜味）", 0, ("蔬菜", "苦瓜", 200.0)),
+    ("蒸牛肉（后腿）（150g，药材：山楂 适量）", 1, ("蛋白质", "牛肉（后腿）", 150.0)),
+    ("水果：苹果（120g）", 2, ("水果", "苹果", 120.0)),
+    ("炒芦笋（90g）", 2, ("时令蔬菜", "芦笋", 90.0)),
+])
+def test_parse_dish(text, position, expected):
+    assert parse_dish(text, position) == expected
+
+
+def test_parse_staple():
+    assert parse_staple("馒头（富强粉）（120g）", "早餐") == ("馒头（富强粉）", 120.0)
+    # 基础版和旧版模板的主食不带克数，使用参考生重
+    assert parse_staple("糙米饭", "午餐") == ("糙米饭", 80.0)
+
+
+foods = FoodCatalog([
+    food_record("米饭", "谷类", 116, 2.6, 0.3, 25.9),
+    food_record("菠菜", "蔬菜类", 28, 2.6, 0.3, 4.5),
+    food_record("牛肉（后腿）", "肉类", 106, 19.8, 2.3, 1.2),
+    food_record("苹果", "水果类", 53, 0.4, 0.2, 13.7),
+    food_record("糙米粉", "谷类", 363, 7.2, 2.8, 76.5),
+    food_record("鲱鱼", "河海鲜", 158, 18.0, 9.0, 0.0),
+])
+profile = {"main_type": "气郁血瘀", "sub_type": "脾虚不运", "season": "春季", "diseases": ["无"],
+           "gender": "男", "age": 30, "height": 175, "weight": 70}
+plan = {"Day1": {meal_type: Meal(meal_type, Dish("主食", 0, 150), (
+    Dish("蔬菜", 1, 200, method="清炒", flavor="鲜"),
+    Dish("蛋白质", 2, 120, method="蒸", medicinal="山楂"),
+    Dish("水果", 3, 100),
+), 600, (50, 25, 25)) for meal_type in ("早餐", "午餐", "晚餐")}}
+
+
+def test_rendered_menu_and_plan_give_the_same_dishes():
+    from_plan, from_menu = DishTableBuilder(foods), DishTableBuilder(foods)
+    from_plan.add_plan(profile, plan, 2000)
+    from_menu.add_menu(profile, render_plan(plan, foods), 2000)
+    a, b = from_plan.build(), from_menu.build()
+    assert a.food.tolist() == b.food.tolist()
+    assert a.slot.tolist() == b.slot.tolist()
+    assert a.grams.tolist() == b.grams.tolist()
+
+
+def test_find_food_does_not_guess_from_substrings():
+    builder = DishTableBuilder(foods)
+    assert builder._find_food("米饭") == 0
+    # 去掉括号限定词后同名
+    assert builder._find_food("牛肉") == 2
+    # 泛称不对应到具体记录
+    assert builder._find_food("鱼") == -1
+    assert builder._find_food("米粉") == -1
+
+
+def test_evaluate_one_plan():
+    builder = DishTableBuilder(foods)
+    builder.add_plan(profile, plan, 2000)
+    result = summarize(PlanEvaluator(foods).evaluate(builder.build()))
+    assert result["plans"] == 1
+    assert result["repeat_蔬菜"] == pytest.approx(2 / 3, abs=1e-3)
@@ -0,0 +1,92 @@
+import random
+
+import pytest
+
+from food_catalog import Dish, FoodCatalog, Meal
+from portion_solver import (PortionSolver, deficit_slots, deficit_tolerance, meal_energy_shares, portion_bounds,
+                            portion_energy_caps)
+from sample_data import food_record
+
+
+records = [
+    food_record("米饭", "谷类", 116, 2.6, 0.3, 25.9),
+    food_record("燕麦", "谷类", 367, 13.5, 6.7, 61.6),
+    food_record("菠菜", "蔬菜类", 28, 2.6, 0.3, 4.5),
+    food_record("辣椒（干）", "蔬菜类", 298, 15.0, 12.0, 57.7),
+    food_record("鸡胸肉", "肉类", 133, 24.6, 1.9, 2.5),
+    food_record("豆腐", "豆类", 84, 6.6, 5.3, 3.4),
+    food_record("苹果", "水果类", 53, 0.4, 0.2, 13.7),
+    food_record("葡萄干", "水果类", 344, 2.5, 0.4, 83.4),
+    food_record("紫菜蛋花汤", "汤类", 30, 2.0, 1.5, 2.0),
+]
+catalog = FoodCatalog(records)
+by_type = {"主食": (0, 1), "蔬菜": (2, 3), "蛋白质": (4, 5), "水果": (6, 7)}
+
+
+def random_plan(rng, days=3):
+    plan = {}
+    for day in range(1, days + 1):
+        meals = {}
+        for meal_type in meal_energy_shares:
+            dishes = [Dish(slot, rng.choice(by_type[slot]), rng.randint(50, 250)) for slot in ("蔬菜", "蛋白质", "水果")]
+            dishes.append(Dish("汤品", 8, 200, "ml"))
+            staple = Dish("主食", rng.choice(by_type["主食"]), rng.randint(50, 200))
+            meals[meal_type] = Meal(meal_type, staple, tuple(dishes), 0, (0, 0, 0))
+        plan[f"Day{day}"] = meals
+    return plan
+
+
+def dish_energy(dish):
+    return catalog[dish.food_id].energy * dish.grams / 100
+
+
+def meal_energy(meal):
+    return sum(dish_energy(dish) for dish in (meal.staple,) + meal.dishes)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_grams_stay_within_bounds_and_energy_caps(seed):
+    rng = random.Random(seed)
+    solver = PortionSolver(catalog)
+    plan = solver.solve_plan(random_plan(rng), rng.uniform(1400, 2800))
+    for meals in plan.values():
+        for meal in meals.values():
+            for dish in (meal.staple,) + meal.dishes:
+                bounds = portion_bounds.get(dish.slot)
+                if bounds is None:
+                    assert dish.grams == 200
+                    continue
+                cap = portion_energy_caps.get(dish.slot)
+                if cap is not None:
+                    assert dish_energy(dish) <= cap + 2
+                    assert dish.grams <= bounds[1] + 1
+                else:
+                    assert bounds[0] - 1 <= dish.grams <= bounds[1] + 1
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_meal_deficit_is_filled_by_staple_and_protein(seed):
+    rng = random.Random(seed)
+    calorie_needs = 2600
+    plan = PortionSolver(catalog).solve_plan(random_plan(rng), calorie_needs)
+    for meals in plan.values():
+        for meal_type, meal in meals.items():
+            target = calorie_needs * meal_energy_shares[meal_type]
+            fillable = [dish for dish in (meal.staple,) + meal.dishes if dish.slot in deficit_slots]
+            at_upper = all(dish.grams >= portion_bounds[dish.slot][1] - 1 for dish in fillable)
+            assert meal_energy(meal) >= target * (1 - deficit_tolerance) - 5 or at_upper
+
+
+def test_frozen_meals_keep_their_grams():
+    rng = random.Random(11)
+    plan = random_plan(rng, days=2)
+    solved = PortionSolver(catalog).solve_plan(plan, 2000, days=["Day2"], frozen=[("Day2", "午餐")])
+    assert solved["Day1"] == plan["Day1"]
+    assert solved["Day2"]["午餐"].staple.grams == plan["Day2"]["午餐"].staple.grams
+    assert [dish.grams for dish in solved["Day2"]["午餐"].dishes] == [dish.grams for dish in plan["Day2"]["午餐"].dishes]
+
+
+def test_same_plan_solves_identically():
+    plan = random_plan(random.Random(3))
+    solver = PortionSolver(catalog)
+    assert solver.solve_plan(plan, 1800) == solver.solve_plan(plan, 1800)
@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+from engines import EnhancedEngine
+from sample_data import sample_catalog, sample_profiles
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return EnhancedEngine(sample_catalog)
+
+
+def meal_energy(foods, meal):
+    return sum(foods[dish.food_id].energy * dish.grams / 100 for dish in (meal.staple,) + meal.dishes)
+
+
+def staple_names(foods, plan):
+    return [foods.canonical(foods[meal.staple.food_id].name) for meals in plan.values() for meal in meals.values()]
+
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.parametrize("slot", [0, 1, "主食", None])
+def test_replan_keeps_other_meals_and_shows_real_energy(engine, seed, slot):
+    profile = sample_profiles[seed % len(sample_profiles)]
+    plan = engine.generate_plan(profile, days=3, rng=random.Random(seed))
+    new_plan = engine.replan(profile, plan, "Day2", meal_type="午餐", slot=slot, rng=random.Random(seed + 100))
+
+    for day_key, meals in plan.items():
+        for meal_type, meal in meals.items():
+            if (day_key, meal_type) != ("Day2", "午餐"):
+                assert new_plan[day_key][meal_type].staple == meal.staple
+                assert new_plan[day_key][meal_type].dishes == meal.dishes
+    meal = new_plan["Day2"]["午餐"]
+    assert meal.calorie == pytest.approx(meal_energy(engine.foods, meal), abs=2)
+    if isinstance(slot, int):
+        old = plan["Day2"]["午餐"]
+        assert [dish.slot for dish in meal.dishes] == [dish.slot for dish in old.dishes]
+        assert all(new.food_id == prev.food_id for i, (new, prev) in enumerate(zip(meal.dishes, old.dishes))
+                   if i != slot)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_replanned_staple_does_not_repeat_within_the_week(engine, seed):
+    profile = sample_profiles[seed % len(sample_profiles)]
+    plan = engine.generate_plan(profile, days=2, rng=random.Random(seed))
+    new_plan = engine.replan(profile, plan, "Day1", meal_type="早餐", slot="主食", rng=random.Random(seed))
+    staples = staple_names(engine.foods, new_plan)
+    assert staples.count(staples[0]) == 1
+
+
+def test_replan_whole_day_only_changes_that_day(engine):
+    profile = sample_profiles[1]
+    plan = engine.generate_plan(profile, days=3, rng=random.Random(4))
+    new_plan = engine.replan(profile, plan, "Day3", rng=random.Random(5))
+    assert new_plan["Day1"] == plan["Day1"] and new_plan["Day2"] == plan["Day2"]
+    for meal in new_plan["Day3"].values():
+        assert meal.calorie == pytest.approx(meal_energy(engine.foods, meal), abs=2)
+
+
+def test_replan_rejects_invalid_targets(engine):
+    profile = sample_profiles[0]
+    plan = engine.generate_plan(profile, days=1, rng=random.Random(0))
+    with pytest.raises(ValueError):
+        engine.replan(profile, plan, "Day5")
+    with pytest.raises(ValueError):
+        engine.replan(profile, plan, "Day1", slot=0)
+    with pytest.raises(ValueError):
+        engine.replan(profile, plan, "Day1", meal_type="午餐", slot=9)
@@ -0,0 +1,45 @@
+import pytest
+
+from food_catalog import Food, is_dish_food
+from process_food_data import tcm_keyword_for
+
+
+@pytest.mark.parametrize("name, food_type, keyword", [
+    ("辣椒", "蔬菜", "辣椒"),
+    ("辣椒（甜、红色）", "蔬菜", None),
+    ("素鸡", "豆类", None),
+    ("鸡精", "调味品类", None),
+    ("菊芋（洋姜）", "蔬菜", None),
+    ("姜黄粉", "调味品类", None),
+    ("姜（子姜）", "蔬菜", "姜"),
+    ("杨桃", "水果", None),
+    ("水蜜桃", "水果", "桃"),
+    ("释迦凤梨", "水果", None),
+    ("杏仁露", "零食饮料", None),
+    ("杏脯", "零食饮料", None),
+    ("杏鲍菇", "菌类", None),
+    ("葡萄柚（白色）", "水果", "柚"),
+    ("玉米面（全谷物）", "谷类", "玉米"),
+    ("豆腐干（臭干）", "豆类", "豆腐"),
+    ("大白菜", "蔬菜", "白菜"),
+])
+def test_keyword_matching(name, food_type, keyword):
+    assert tcm_keyword_for({"name": name, "type": food_type}) == keyword
+
+
+@pytest.mark.parametrize("name, food_type, expected", [
+    ("姜（干）", "蔬菜", False),
+    ("姜", "蔬菜", False),
+    ("大蒜", "蔬菜", False),
+    ("南瓜粉", "蔬菜", False),
+    ("菠菜（脱水）", "蔬菜", False),
+    ("海参（干）", "河海鲜", False),
+    ("大豆粉", "豆类", False),
+    ("辣椒（甜、红色）", "蔬菜", True),
+    ("蒜苗", "蔬菜", True),
+    ("豆腐干（臭干）", "豆类", True),
+    ("鲟鱼（熟、干热）", "河海鲜", True),
+    ("菠菜", "蔬菜", True),
+])
+def test_dish_food_filter(name, food_type, expected):
+    assert is_dish_food(Food(0, name, food_type, 0.0, 0.0, 0.0, 0.0)) is expected